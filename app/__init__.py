@@ -1,10 +1,15 @@
 from flask import Flask
 from dotenv import load_dotenv
 import os
+import logging
 
 def create_app():
     # Load environment variables from .env file
     load_dotenv()
+
+    # JSON logs through a background writer thread (see app/utils/log.py)
+    from .utils.log import setup_logging
+    setup_logging()
     
     # මෙම පේළිය මගින් 'app' variable එක නිර්මාණය කරයි
     app = Flask(__name__)
@@ -15,11 +20,29 @@ def create_app():
     # Import and register blueprints
     from .api.chat import chat_bp
     from .auth.routes import auth_bp
+    from .api.leave import leave_bp
+    from .api.reports import reports_bp
     
     # 'app' variable එක දැන් register_blueprint සඳහා භාවිතා කරයි
     app.register_blueprint(chat_bp, url_prefix='/api/chat')
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
+    app.register_blueprint(leave_bp, url_prefix='/api/leave')
+    app.register_blueprint(reports_bp, url_prefix='/api/reports')
+
+    # Request IDs, latency metrics and the Prometheus /metrics endpoint
+    from .utils.metrics import init_app as init_metrics
+    init_metrics(app)
+    
+    if os.getenv("MONGO_ENSURE_INDEXES", "0") == "1":
+        from .utils.indexes import ensure_indexes
+        ensure_indexes()
+
+    # Notifications are normally sent by a separate worker process
+    # (python -m app.utils.notification_worker); NOTIFY_WORKER=thread runs it here.
+    if os.getenv("NOTIFY_WORKER", "") == "thread":
+        from .utils.notification_worker import start_in_thread
+        start_in_thread()
     
-    print("✅ Flask App created and Blueprints registered.")
+    logging.getLogger(__name__).info("Flask app created and blueprints registered")
     
     return app
\ No newline at end of file
@@ -0,0 +1,176 @@
+# app/agents/checkpointer.py
+import os
+import asyncio
+import contextvars
+from functools import partial
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+)
+from pymongo import DESCENDING
+
+
+class MongoDBSaver(BaseCheckpointSaver):
+    """Stores LangGraph checkpoints in a MongoDB collection.
+
+    One document per checkpoint, keyed by (thread_id, thread_ts). The checkpoint
+    and its metadata are stored with the saver's serializer so that LangChain
+    messages (including ToolMessages) survive between chat turns.
+    """
+
+    def __init__(self, collection, *, serde=None):
+        super().__init__(serde=serde)
+        self.collection = collection
+        self.is_setup = False
+
+    def setup(self):
+        if self.is_setup:
+            return
+        self.collection.create_index(
+            [("thread_id", 1), ("thread_ts", DESCENDING)], unique=True
+        )
+        self.is_setup = True
+
+    def _to_tuple(self, doc) -> CheckpointTuple:
+        config = {"configurable": {"thread_id": doc["thread_id"], "thread_ts": doc["thread_ts"]}}
+        parent_config = None
+        if doc.get("parent_ts"):
+            parent_config = {"configurable": {"thread_id": doc["thread_id"], "thread_ts": doc["parent_ts"]}}
+        return CheckpointTuple(
+            config=config,
+            checkpoint=self.serde.loads(doc["checkpoint"]),
+            metadata=self.serde.loads(doc["metadata"]),
+            parent_config=parent_config,
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        self.setup()
+        thread_id = config["configurable"]["thread_id"]
+        query = {"thread_id": thread_id}
+        if ts := config["configurable"].get("thread_ts"):
+            query["thread_ts"] = ts
+        doc = self.collection.find_one(query, sort=[("thread_ts", DESCENDING)])
+        return self._to_tuple(doc) if doc else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        self.setup()
+        query = {}
+        if config:
+            query["thread_id"] = config["configurable"]["thread_id"]
+        if before:
+            query["thread_ts"] = {"$lt": before["configurable"]["thread_ts"]}
+        # Only the indexed metadata fields can be filtered in the database;
+        # anything else is checked after deserializing.
+        for key in ("source", "step"):
+            if filter and key in filter:
+                query[f"meta.{key}"] = filter[key]
+
+        cursor = self.collection.find(query).sort("thread_ts", DESCENDING)
+        remaining = limit
+        for doc in cursor:
+            item = self._to_tuple(doc)
+            if filter and not all(item.metadata.get(k) == v for k, v in filter.items()):
+                continue
+            if remaining is not None:
+                if remaining <= 0:
+                    break
+                remaining -= 1
+            yield item
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+    ) -> RunnableConfig:
+        self.setup()
+        thread_id = config["configurable"]["thread_id"]
+        self.collection.replace_one(
+            {"thread_id": thread_id, "thread_ts": checkpoint["id"]},
+            {
+                "thread_id": thread_id,
+                "thread_ts": checkpoint["id"],
+                "parent_ts": config["configurable"].get("thread_ts"),
+                "checkpoint": self.serde.dumps(checkpoint),
+                "metadata": self.serde.dumps(metadata),
+                "meta": {"source": metadata.get("source"), "step": metadata.get("step")},
+            },
+            upsert=True,
+        )
+        return {"configurable": {"thread_id": thread_id, "thread_ts": checkpoint["id"]}}
+
+    # The async methods run the sync ones on the default executor, with the
+    # caller's context so their MongoDB commands count towards its request.
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.get_running_loop().run_in_executor(
+            None, contextvars.copy_context().run, self.get_tuple, config
+        )
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        loop = asyncio.get_running_loop()
+        items = await loop.run_in_executor(
+            None, contextvars.copy_context().run,
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+    ) -> RunnableConfig:
+        return await asyncio.get_running_loop().run_in_executor(
+            None, contextvars.copy_context().run, partial(self.put, config, checkpoint, metadata)
+        )
+
+
+def create_checkpointer():
+    """Builds the checkpointer selected by the CHECKPOINTER env var.
+
+    - 'mongo' (default): persistent, shared between workers.
+    - 'memory': in-process only, for tests and local debugging.
+    - 'sqlite': file or ':memory:' database from CHECKPOINTER_SQLITE_PATH.
+    """
+    backend = os.getenv("CHECKPOINTER", "mongo").lower()
+
+    if backend == "memory":
+        from langgraph.checkpoint.memory import MemorySaver
+        return MemorySaver()
+
+    if backend == "sqlite":
+        import sqlite3
+        from langgraph.checkpoint.sqlite import SqliteSaver
+
+        class _SqliteSaver(SqliteSaver):
+            # SqliteSaver is sync-only; the streaming and async chat paths
+            # need the async API, so run the sync calls in the executor.
+            aget_tuple = MongoDBSaver.aget_tuple
+            alist = MongoDBSaver.alist
+            aput = MongoDBSaver.aput
+
+        path = os.getenv("CHECKPOINTER_SQLITE_PATH", ":memory:")
+        return _SqliteSaver(sqlite3.connect(path, check_same_thread=False))
+
+    from app.utils.db import get_db
+    return MongoDBSaver(get_db()["checkpoints"])
@@ -0,0 +1,160 @@
+# app/agents/concurrency.py
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+
+from app.utils.metrics import observe
+
+
+class LLMBusyError(Exception):
+    """Raised when the LLM call queue is full or a queued call waited too long."""
+
+
+class _ThreadWaiter:
+    def __init__(self):
+        self.event = threading.Event()
+
+    def wake(self, limiter):
+        self.event.set()
+        return True
+
+
+class _AsyncWaiter:
+    def __init__(self, loop):
+        self.loop = loop
+        self.future = loop.create_future()
+
+    def wake(self, limiter):
+        if self.future.done():
+            return False
+
+        def _grant():
+            # The waiter may have been cancelled after it was picked;
+            # pass the slot on instead of leaking it.
+            if self.future.done():
+                limiter.release()
+            else:
+                self.future.set_result(True)
+
+        self.loop.call_soon_threadsafe(_grant)
+        return True
+
+
+class ConcurrencyLimiter:
+    """Caps the number of concurrent LLM calls, with a bounded wait queue.
+
+    Works from both worker threads (``with limiter:``) and event loops
+    (``async with limiter:``), including several event loops at once, so the
+    same cap applies to the Flask and ASGI serving paths. Slots are handed to
+    waiters in FIFO order.
+    """
+
+    def __init__(self, limit: int, max_queue: int = 0, timeout: float = None):
+        self.limit = limit
+        self.max_queue = max_queue  # 0 means unbounded
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._active = 0
+        self._waiters = deque()
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def _acquire_or_enqueue(self, waiter) -> bool:
+        with self._lock:
+            if self._active < self.limit and not self._waiters:
+                self._active += 1
+                return True
+            if self.max_queue and len(self._waiters) >= self.max_queue:
+                raise LLMBusyError("Too many requests are waiting for the language model.")
+            self._waiters.append(waiter)
+            return False
+
+    def _discard(self, waiter) -> bool:
+        """Removes a waiter that gave up. Returns False if it was already granted a slot."""
+        with self._lock:
+            try:
+                self._waiters.remove(waiter)
+                return True
+            except ValueError:
+                return False
+
+    def acquire(self):
+        waiter = _ThreadWaiter()
+        if self._acquire_or_enqueue(waiter):
+            return
+        started = time.perf_counter()
+        if not waiter.event.wait(self.timeout) and self._discard(waiter):
+            observe("llm_queue", "wait", time.perf_counter() - started, error=True)
+            raise LLMBusyError("Timed out waiting for a free language model slot.")
+        observe("llm_queue", "wait", time.perf_counter() - started)
+
+    async def aacquire(self):
+        waiter = _AsyncWaiter(asyncio.get_running_loop())
+        if self._acquire_or_enqueue(waiter):
+            return
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.timeout)
+        except asyncio.TimeoutError as e:
+            if self._discard(waiter):
+                waiter.future.cancel()
+                observe("llm_queue", "wait", time.perf_counter() - started, error=True)
+                raise LLMBusyError("Timed out waiting for a free language model slot.") from e
+            # The slot was granted just as we timed out; keep it.
+            await waiter.future
+        except asyncio.CancelledError:
+            if self._discard(waiter):
+                waiter.future.cancel()
+            else:
+                # Granted while being cancelled; wait for the hand-over and
+                # pass the slot on.
+                await waiter.future
+                self.release()
+            raise
+        observe("llm_queue", "wait", time.perf_counter() - started)
+
+    def release(self):
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if waiter.wake(self):
+                    return
+            self._active -= 1
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    async def __aenter__(self):
+        await self.aacquire()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.release()
+
+
+def _env_float(name):
+    value = os.getenv(name)
+    return float(value) if value else None
+
+
+# Shared by every graph node that calls the LLM.
+#   LLM_MAX_CONCURRENCY: calls allowed in flight at once
+#   LLM_MAX_QUEUE:       calls allowed to wait for a slot (0 = unbounded)
+#   LLM_QUEUE_TIMEOUT:   seconds a call may wait before giving up
+llm_limiter = ConcurrencyLimiter(
+    limit=int(os.getenv("LLM_MAX_CONCURRENCY", "32")),
+    max_queue=int(os.getenv("LLM_MAX_QUEUE", "0")),
+    timeout=_env_float("LLM_QUEUE_TIMEOUT"),
+)
@@ -0,0 +1,114 @@
+# app/agents/fake_llm.py
+# A scripted, deterministic chat model for benchmarks and offline runs
+# (LLM_PROVIDER=fake). It never calls a provider: it picks a tool call from
+# keywords in the user's message, then answers once the tool result is back.
+# FAKE_LLM_LATENCY_MS adds a fixed delay per call to stand in for a real
+# provider's response time.
+import os
+import re
+import time
+import uuid
+import asyncio
+import datetime
+from typing import List
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+_SESSION_RE = re.compile(r"The user's (employee|supervisor) ID: (\S+)")
+_OBJECT_ID_RE = re.compile(r"\b[0-9a-f]{24}\b")
+_ROLE_RE = re.compile(r"The user's role is: \*\*(\w+)\*\*")
+
+
+def _session(messages) -> dict:
+    """The role and IDs written into the system prompt by AgentProfile."""
+    info = {}
+    for message in messages:
+        if isinstance(message, SystemMessage):
+            for kind, value in _SESSION_RE.findall(message.content):
+                info[kind] = None if value == "None" else value
+            role = _ROLE_RE.search(message.content)
+            if role:
+                info["role"] = role.group(1)
+    return info
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Chooses tool calls by keyword, so the same message always takes the same path."""
+
+    tool_names: List[str] = []
+    latency_ms: float = float(os.getenv("FAKE_LLM_LATENCY_MS", "0"))
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-fake"
+
+    def bind_tools(self, tools, **kwargs):
+        return ScriptedChatModel(tool_names=[getattr(t, "name", str(t)) for t in tools], latency_ms=self.latency_ms)
+
+    def _tool_call(self, text: str, session: dict):
+        text = text.lower()
+        employee_id = session.get("employee")
+        role = session.get("role")
+        if "balance" in text:
+            return "get_my_leave_balance", {"employee_id": employee_id}
+        if "calendar" in text or "who else" in text:
+            today = datetime.date.today()
+            return "get_team_leave_calendar", {
+                "supervisor_id": employee_id,
+                "start_date": today.isoformat(),
+                "end_date": (today + datetime.timedelta(days=7)).isoformat(),
+            }
+        if any(word in text for word in ("approve", "reject")):
+            request_ids = _OBJECT_ID_RE.findall(text)
+            new_status = "rejected" if "reject" in text else (
+                "approved_by_hr" if role == "hr" else "approved_by_supervisor")
+            if len(request_ids) == 1:
+                return "approve_or_reject_request", {
+                    "request_id": request_ids[0], "new_status": new_status,
+                    "approver_id": employee_id, "approver_role": role,
+                    "rejection_reason": "Benchmark" if new_status == "rejected" else None,
+                }
+            return "bulk_approve_or_reject_requests", {
+                "request_ids": request_ids or None, "all_pending": not request_ids,
+                "new_status": new_status, "approver_id": employee_id, "approver_role": role,
+            }
+        if any(word in text for word in ("create", "apply", "book")):
+            start = datetime.date.today() + datetime.timedelta(days=30)
+            return "create_leave_request", {
+                "employee_id": employee_id, "supervisor_id": session.get("supervisor"),
+                "leave_type": "Annual", "start_date": start.isoformat(),
+                "end_date": (start + datetime.timedelta(days=1)).isoformat(), "reason": "Benchmark",
+            }
+        if any(word in text for word in ("pending", "show", "list", "requests")):
+            if role == "supervisor":
+                return "get_pending_supervisor_requests", {"supervisor_id": employee_id}
+            if role == "hr":
+                return "get_pending_hr_requests", {}
+            return "get_my_leave_requests", {"employee_id": employee_id}
+        return None, None
+
+    def _respond(self, messages) -> AIMessage:
+        last = messages[-1]
+        if isinstance(last, ToolMessage):
+            return AIMessage(content=f"Here is the result:\n{last.content}")
+        if not isinstance(last, HumanMessage):
+            return AIMessage(content="OK.")
+        if not self.tool_names:
+            # Unbound model: history summarization and the like.
+            return AIMessage(content=f"Summary: {last.content[:200]}")
+        name, args = self._tool_call(last.content, _session(messages))
+        if name not in self.tool_names:
+            return AIMessage(content="How can I help you with your leave?")
+        return AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": f"fake_{uuid.uuid4().hex}"}])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages))])
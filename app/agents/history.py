@@ -0,0 +1,179 @@
+# app/agents/history.py
+# Keeps the prompt bounded however long a conversation gets.
+#
+# The last HISTORY_WINDOW_TURNS turns (within HISTORY_MAX_TOKENS) are sent
+# verbatim. Older turns are folded into a running summary that is stored in
+# the graph state and only recomputed when the window moves. Lines from older
+# messages that mention a leave request ID are kept verbatim as "pinned"
+# context, so "approve Kamal's request" still works after the list that
+# showed the ID has left the window.
+import os
+import re
+import logging
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from app.tools.formatters import estimate_tokens
+from app.utils.metrics import span, record_llm_usage
+
+log = logging.getLogger(__name__)
+
+WINDOW_TURNS = int(os.getenv("HISTORY_WINDOW_TURNS", "6"))
+MAX_TOKENS = int(os.getenv("HISTORY_MAX_TOKENS", "4000"))
+MAX_PINNED = int(os.getenv("HISTORY_MAX_PINNED", "30"))
+
+OBJECT_ID_RE = re.compile(r"\b[0-9a-f]{24}\b")
+
+SUMMARY_PROMPT = """You maintain a running summary of a conversation between an HR leave assistant and a user.
+Update the summary with the new messages below. Keep it under 150 words. Keep every fact that may matter later:
+leave types, dates, request IDs and their statuses, decisions taken and open questions. Write in English.
+
+Current summary:
+{summary}
+
+New messages:
+{messages}
+
+Updated summary:"""
+
+# A node must write something; an empty message list leaves the state as is.
+_UNCHANGED = {"messages": []}
+
+# Tags the summary LLM call, so streaming does not send it to the user.
+SUMMARY_TAG = "history_summary"
+
+
+def _message_tokens(message) -> int:
+    tokens = estimate_tokens(str(message.content))
+    for tool_call in getattr(message, "tool_calls", None) or []:
+        tokens += estimate_tokens(str(tool_call.get("args")))
+    return tokens
+
+
+def compute_cutoff(messages, summarized_upto: int = 0) -> int:
+    """Index of the first message to keep verbatim.
+
+    Always a turn boundary (a HumanMessage), so an AIMessage with tool calls
+    is never separated from its ToolMessages, and never before summarized_upto.
+    The current turn is always kept.
+    """
+    starts = [i for i, m in enumerate(messages) if isinstance(m, HumanMessage)]
+    if not starts:
+        return summarized_upto
+
+    cutoff = starts[-WINDOW_TURNS] if len(starts) > WINDOW_TURNS else starts[0]
+    cutoff = max(cutoff, summarized_upto)
+
+    tokens = sum(_message_tokens(m) for m in messages[cutoff:])
+    for start in starts:
+        if start <= cutoff:
+            continue
+        if tokens <= MAX_TOKENS:
+            break
+        tokens -= sum(_message_tokens(m) for m in messages[cutoff:start])
+        cutoff = start
+    return cutoff
+
+
+def _render_for_summary(messages) -> str:
+    lines = []
+    for message in messages:
+        if isinstance(message, HumanMessage):
+            lines.append(f"User: {message.content}")
+        elif isinstance(message, ToolMessage):
+            lines.append(f"Tool result: {message.content}")
+        elif isinstance(message, AIMessage):
+            if message.content:
+                lines.append(f"Assistant: {message.content}")
+            for tool_call in message.tool_calls:
+                lines.append(f"Assistant called {tool_call['name']}({tool_call['args']})")
+    return "\n".join(lines)
+
+
+def _update_pinned(pinned: dict, messages) -> dict:
+    """Keeps the latest line mentioning each request ID, newest MAX_PINNED IDs."""
+    pinned = dict(pinned)
+    for message in messages:
+        for line in str(message.content).splitlines():
+            for object_id in OBJECT_ID_RE.findall(line):
+                pinned.pop(object_id, None)
+                pinned[object_id] = line.strip()
+    while len(pinned) > MAX_PINNED:
+        pinned.pop(next(iter(pinned)))
+    return pinned
+
+
+def _plan(state):
+    """Returns (cutoff, messages to fold into the summary), or None if the window has not moved."""
+    messages = state["messages"]
+    summarized_upto = state.get("summarized_upto") or 0
+    cutoff = compute_cutoff(messages, summarized_upto)
+    if cutoff <= summarized_upto:
+        return None
+    return cutoff, messages[summarized_upto:cutoff]
+
+
+def _summary_prompt(state, dropped) -> str:
+    return SUMMARY_PROMPT.format(
+        summary=state.get("summary") or "(none yet)",
+        messages=_render_for_summary(dropped),
+    )
+
+
+def _updates(state, cutoff, dropped, summary) -> dict:
+    return {
+        "summary": summary,
+        "summarized_upto": cutoff,
+        "pinned": _update_pinned(state.get("pinned") or {}, dropped),
+    }
+
+
+def update_history(state, llm, limiter) -> dict:
+    """Graph node: folds turns that left the window into the running summary."""
+    plan = _plan(state)
+    if plan is None:
+        return _UNCHANGED
+    cutoff, dropped = plan
+    try:
+        with limiter, span("llm", "summarize"):
+            response = llm.invoke(_summary_prompt(state, dropped), config={"tags": [SUMMARY_TAG]})
+        record_llm_usage(response)
+        summary = response.content
+    except Exception as e:
+        # Keep the old summary; the window simply stays longer this turn.
+        log.warning("History summarization failed", extra={"error": str(e)})
+        return _UNCHANGED
+    return _updates(state, cutoff, dropped, summary)
+
+
+async def aupdate_history(state, llm, limiter) -> dict:
+    plan = _plan(state)
+    if plan is None:
+        return _UNCHANGED
+    cutoff, dropped = plan
+    try:
+        async with limiter:
+            with span("llm", "summarize"):
+                response = await llm.ainvoke(_summary_prompt(state, dropped), config={"tags": [SUMMARY_TAG]})
+        record_llm_usage(response)
+        summary = response.content
+    except Exception as e:
+        log.warning("History summarization failed", extra={"error": str(e)})
+        return _UNCHANGED
+    return _updates(state, cutoff, dropped, summary)
+
+
+def select_messages(state) -> list:
+    """The messages to send to the LLM: summary context plus the verbatim window."""
+    window = list(state["messages"][state.get("summarized_upto") or 0:])
+    parts = []
+    if state.get("summary"):
+        parts.append(f"Summary of the earlier conversation:\n{state['summary']}")
+    if state.get("pinned"):
+        parts.append(
+            "Leave requests mentioned earlier in the conversation (their IDs can be used for approvals):\n"
+            + "\n".join(state["pinned"].values())
+        )
+    if parts:
+        return [SystemMessage(content="\n\n".join(parts))] + window
+    return window
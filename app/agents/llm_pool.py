@@ -0,0 +1,648 @@
+# app/agents/llm_pool.py
+# Several LLM providers behind one chat model. Each provider has its own
+# concurrency cap (ConcurrencyLimiter), request rate limit (token bucket),
+# timeout and circuit breaker; a call goes to the first provider, in
+# LLM_PROVIDERS order, that is healthy and has capacity, and fails over to
+# the next one when the provider fails (timeout, connection error, 5xx). A
+# client error (bad request, validation) is raised as is: it would fail the
+# same way everywhere. With LLM_HEDGE=1 a call that has not answered
+# within the provider's p95 latency is also sent to the next provider, and
+# the first answer wins (for streams: the first token).
+#
+#   LLM_PROVIDERS:               e.g. "groq,openai:gpt-4o-mini" (kind[:model]);
+#                                defaults to LLM_PROVIDER (+ LLM_MODEL)
+#   LLM_<KIND>_MODEL:            model of a provider kind (GROQ, OPENAI, FAKE)
+#   LLM_<KIND>_MAX_CONCURRENCY:  calls in flight at that provider (default 16)
+#   LLM_<KIND>_RPM:              requests per minute allowed (0 = no limit)
+#   LLM_<KIND>_TIMEOUT:          seconds before a call counts as failed (default 60)
+#   LLM_RATE_LIMIT_WAIT:         seconds a call may wait for a rate-limit token
+#                                before trying the next provider (default 2)
+#   LLM_PROVIDER_QUEUE_TIMEOUT:  same, for a free concurrency slot (default 5)
+#   LLM_BREAKER_FAILURES / LLM_BREAKER_COOLDOWN: consecutive failures that
+#                                open a provider's circuit, and seconds it stays open
+#   LLM_MAX_ATTEMPTS:            providers tried per call, at least one each (default 2)
+#   LLM_HEDGE, LLM_HEDGE_MIN_SAMPLES: hedging on/off, and the calls a provider
+#                                needs before its p95 is trusted
+#
+# Per-provider latency (p50/p95/p99 of the last calls), in-flight calls,
+# circuit state, call results and hedges are exported on /metrics.
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait as wait_futures
+from typing import Any, List
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessageChunk
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+
+from app.agents.concurrency import ConcurrencyLimiter, LLMBusyError
+from app.utils.metrics import REGISTRY, Counter, span, gauge_lines
+
+log = logging.getLogger(__name__)
+
+RATE_LIMIT_WAIT = float(os.getenv("LLM_RATE_LIMIT_WAIT", "2"))
+PROVIDER_QUEUE_TIMEOUT = float(os.getenv("LLM_PROVIDER_QUEUE_TIMEOUT", "5"))
+BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "2"))
+HEDGE = os.getenv("LLM_HEDGE", "0") == "1"
+HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LATENCY_WINDOW = 500
+
+PROVIDER_CALLS = REGISTRY.register(Counter(
+    "hr_llm_provider_calls_total",
+    "LLM provider calls by result (success, error, timeout, skipped when busy/rate limited/circuit open).",
+    ("provider", "result")))
+HEDGES = REGISTRY.register(Counter(
+    "hr_llm_hedges_total", "Hedged LLM requests sent to a provider, and how many it won.", ("provider", "result")))
+
+# Runs the calls of a hedged synchronous request; the loser finishes in the
+# background and its answer is dropped.
+_hedge_executor = ThreadPoolExecutor(max_workers=int(os.getenv("LLM_HEDGE_WORKERS", "32")),
+                                     thread_name_prefix="llm-hedge")
+
+
+class ProviderUnavailable(LLMBusyError):
+    """The provider was skipped (circuit open, rate limited or busy); nothing
+    was sent. When every provider is skipped the API answers 503, as for a
+    full LLM queue."""
+
+
+class TokenBucket:
+    """Allows `rate` requests per second on average, in bursts of up to `burst`."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait: float):
+        """Takes a token and returns the seconds to wait before using it, or
+        None (taking nothing) when that would be longer than max_wait."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+            if wait > max_wait:
+                return None
+            self.tokens -= 1
+            return wait
+
+
+class CircuitBreaker:
+    """Opens after `failures` failed calls in a row; after `cooldown` seconds
+    one trial call is let through, which closes it again on success.
+
+    allow() hands out a ticket that the call passes back to cancel() or
+    record(); only the ticket of the trial call can end the trial.
+    """
+
+    def __init__(self, name, failures: int, cooldown: float):
+        self.name = name
+        self.failures = failures
+        self.cooldown = cooldown
+        self._errors = 0
+        self._opened_at = None
+        self._trial = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        with self._lock:
+            return self._opened_at is not None and (
+                self._trial is not None or time.monotonic() - self._opened_at < self.cooldown)
+
+    def allow(self):
+        """A ticket for one call, or None when the circuit is open."""
+        with self._lock:
+            if self._opened_at is None:
+                return object()
+            if self._trial is not None or time.monotonic() - self._opened_at < self.cooldown:
+                return None
+            self._trial = object()
+            return self._trial
+
+    def cancel(self, ticket):
+        """The call was never made (or was abandoned, e.g. it lost a hedge race)."""
+        with self._lock:
+            if self._trial is ticket:
+                self._trial = None
+
+    def record(self, ticket, ok: bool):
+        with self._lock:
+            if self._trial is ticket:
+                self._trial = None
+            if ok:
+                if self._opened_at is not None:
+                    log.info("LLM provider answering again; circuit closed", extra={"provider": self.name})
+                self._errors = 0
+                self._opened_at = None
+                return
+            self._errors += 1
+            if self._opened_at is not None or self._errors >= self.failures:
+                if self._opened_at is None:
+                    log.warning("LLM provider failing; circuit open", extra={
+                        "provider": self.name, "errors": self._errors, "cooldown": self.cooldown})
+                self._opened_at = time.monotonic()
+
+
+class LatencyWindow:
+    """The last LATENCY_WINDOW latencies, for percentiles."""
+
+    def __init__(self):
+        self._values = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self._lock:
+            self._values.append(seconds)
+
+    def __len__(self):
+        return len(self._values)
+
+    def quantile(self, q: float):
+        with self._lock:
+            values = sorted(self._values)
+        if not values:
+            return None
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def _is_timeout(error) -> bool:
+    # SDK timeouts (openai/groq APITimeoutError, httpx.TimeoutException) are
+    # recognised by class name, so no SDK has to be imported here.
+    return isinstance(error, (asyncio.TimeoutError, TimeoutError)) or any(
+        cls.__name__ in ("APITimeoutError", "TimeoutException") for cls in type(error).__mro__)
+
+
+def _is_provider_failure(error) -> bool:
+    """Whether an error says the provider is unwell: timeouts, connection
+    errors and 5xx (or 408/429) answers. Anything else (bad request, auth,
+    validation) fails the same way on every provider, so it neither counts
+    against the circuit breaker nor fails over."""
+    if _is_timeout(error) or isinstance(error, ConnectionError):
+        return True
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if isinstance(status, int):
+        return status >= 500 or status in (408, 429)
+    return any(cls.__name__ in ("APIConnectionError", "TransportError") for cls in type(error).__mro__)
+
+
+def _fails_over(error) -> bool:
+    """Whether the next provider should get the call: this one was skipped or is failing."""
+    return isinstance(error, LLMBusyError) or _is_provider_failure(error)
+
+
+def _env(kind, name, default):
+    return os.getenv(f"LLM_{kind.upper()}_{name}", default)
+
+
+def _create_model(kind, model, timeout):
+    """The LangChain chat model of one provider, importing only its SDK.
+
+    SDK retries are off: a failed call moves on to the next provider instead.
+    """
+    if kind == "openai":
+        from langchain_openai import ChatOpenAI
+        return ChatOpenAI(model=model or "gpt-4o", temperature=0, api_key=os.getenv("OPENAI_API_KEY"),
+                          timeout=timeout, max_retries=0)
+    if kind == "fake":
+        # Scripted model for benchmarks and offline runs; no API key needed.
+        from app.agents.fake_llm import ScriptedChatModel
+        return ScriptedChatModel()
+    if kind == "groq":
+        from langchain_groq import ChatGroq
+        return ChatGroq(model=model or "qwen/qwen3-32b", temperature=0, groq_api_key=os.getenv("GROQ_API_KEY"),
+                        timeout=timeout, max_retries=0)
+    raise ValueError(f"Unknown LLM provider '{kind}': use groq, openai or fake.")
+
+
+def _as_chunk(result: ChatResult) -> ChatGenerationChunk:
+    """A whole answer as one stream chunk, for models that cannot stream."""
+    message = result.generations[0].message
+    chunk = AIMessageChunk(
+        content=message.content,
+        additional_kwargs=message.additional_kwargs,
+        response_metadata=message.response_metadata,
+        tool_call_chunks=[
+            {"name": tc["name"], "args": json.dumps(tc["args"]), "id": tc["id"], "index": i}
+            for i, tc in enumerate(getattr(message, "tool_calls", None) or [])
+        ],
+        id=message.id,
+    )
+    if getattr(message, "usage_metadata", None):
+        chunk.usage_metadata = message.usage_metadata
+    return ChatGenerationChunk(message=chunk)
+
+
+class Provider:
+    def __init__(self, spec: str):
+        self.name = spec
+        self.kind, _, model = spec.partition(":")
+        self.kind = self.kind.strip().lower()
+        self.model_name = model or _env(self.kind, "MODEL", None)
+        self.timeout = float(_env(self.kind, "TIMEOUT", "60"))
+        self.limiter = ConcurrencyLimiter(limit=int(_env(self.kind, "MAX_CONCURRENCY", "16")),
+                                          timeout=PROVIDER_QUEUE_TIMEOUT)
+        rpm = float(_env(self.kind, "RPM", "0"))
+        # Bursts of up to a tenth of a minute's allowance.
+        self.bucket = TokenBucket(rpm / 60, max(1.0, rpm / 10)) if rpm else None
+        self.breaker = CircuitBreaker(spec, BREAKER_FAILURES, BREAKER_COOLDOWN)
+        self.latency = LatencyWindow()
+        self.first_token = LatencyWindow()
+        self._model = None
+        self._bound = {}
+        self._lock = threading.Lock()
+
+    def model(self, tools, tool_kwargs):
+        """(chat model, call kwargs) with the tools bound, cached per tool set."""
+        key = (tuple(getattr(t, "name", str(t)) for t in tools), repr(sorted(tool_kwargs.items())))
+        bound = self._bound.get(key)
+        if bound is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = _create_model(self.kind, self.model_name, self.timeout)
+                if not tools:
+                    bound = (self._model, {})
+                else:
+                    binding = self._model.bind_tools(tools, **tool_kwargs)
+                    # bind_tools returns a RunnableBinding (model + kwargs) or,
+                    # for the scripted model, a new model.
+                    bound = (binding, {}) if isinstance(binding, BaseChatModel) else (binding.bound, dict(binding.kwargs))
+                self._bound[key] = bound
+        return bound
+
+    def hedge_delay(self, streaming: bool):
+        window = self.first_token if streaming else self.latency
+        return window.quantile(0.95) if len(window) >= HEDGE_MIN_SAMPLES else None
+
+    def _admit(self):
+        """Checks the circuit and rate limit: (seconds to wait, breaker ticket)."""
+        ticket = self.breaker.allow()
+        if ticket is None:
+            PROVIDER_CALLS.inc(provider=self.name, result="circuit_open")
+            raise ProviderUnavailable(f"{self.name}: circuit open")
+        delay = self.bucket.reserve(RATE_LIMIT_WAIT) if self.bucket else 0.0
+        if delay is None:
+            self.breaker.cancel(ticket)
+            PROVIDER_CALLS.inc(provider=self.name, result="rate_limited")
+            raise ProviderUnavailable(f"{self.name}: rate limited")
+        return delay, ticket
+
+    def _busy(self, e, ticket):
+        self.breaker.cancel(ticket)
+        PROVIDER_CALLS.inc(provider=self.name, result="busy")
+        return ProviderUnavailable(f"{self.name}: {e}")
+
+    def _done(self, started, ticket, error=None, window=None):
+        """Records a finished call. The latency window (`window`, default the
+        whole-call one) also gets the time of a timeout, as a lower bound, so
+        hedging sees a provider that is slow enough to time out."""
+        window = self.latency if window is None else window
+        if error is None:
+            window.add(time.perf_counter() - started)
+            PROVIDER_CALLS.inc(provider=self.name, result="success")
+            self.breaker.record(ticket, True)
+        elif _is_timeout(error):
+            window.add(time.perf_counter() - started)
+            PROVIDER_CALLS.inc(provider=self.name, result="timeout")
+            self.breaker.record(ticket, False)
+        elif _is_provider_failure(error):
+            PROVIDER_CALLS.inc(provider=self.name, result="error")
+            self.breaker.record(ticket, False)
+        else:
+            # The provider answered; the request itself was bad.
+            PROVIDER_CALLS.inc(provider=self.name, result="client_error")
+            self.breaker.record(ticket, True)
+
+    def generate(self, messages, stop, tools, tool_kwargs, kwargs) -> ChatResult:
+        delay, ticket = self._admit()
+        time.sleep(delay)
+        try:
+            self.limiter.acquire()
+        except LLMBusyError as e:
+            raise self._busy(e, ticket)
+        try:
+            model, call_kwargs = self.model(tools, tool_kwargs)
+            started = time.perf_counter()
+            try:
+                with span("llm_provider", self.name):
+                    result = model._generate(messages, stop=stop, **call_kwargs, **kwargs)
+            except Exception as e:
+                self._done(started, ticket, e)
+                raise
+            self._done(started, ticket)
+            return result
+        finally:
+            self.limiter.release()
+
+    async def agenerate(self, messages, stop, tools, tool_kwargs, kwargs) -> ChatResult:
+        delay, ticket = self._admit()
+        await asyncio.sleep(delay)
+        try:
+            await self.limiter.aacquire()
+        except LLMBusyError as e:
+            raise self._busy(e, ticket)
+        try:
+            model, call_kwargs = self.model(tools, tool_kwargs)
+            started = time.perf_counter()
+            try:
+                with span("llm_provider", self.name):
+                    result = await asyncio.wait_for(
+                        model._agenerate(messages, stop=stop, **call_kwargs, **kwargs), self.timeout)
+            except asyncio.CancelledError:
+                # Lost a hedge race: says nothing about the provider's health.
+                self.breaker.cancel(ticket)
+                raise
+            except Exception as e:
+                self._done(started, ticket, e)
+                raise
+            self._done(started, ticket)
+            return result
+        finally:
+            self.limiter.release()
+
+    async def astream(self, messages, stop, tools, tool_kwargs, kwargs):
+        delay, ticket = self._admit()
+        await asyncio.sleep(delay)
+        try:
+            await self.limiter.aacquire()
+        except LLMBusyError as e:
+            raise self._busy(e, ticket)
+        try:
+            model, call_kwargs = self.model(tools, tool_kwargs)
+            started = time.perf_counter()
+            # Until the first chunk, a timeout is a slow first token.
+            window = self.first_token
+            try:
+                if type(model)._astream is BaseChatModel._astream and type(model)._stream is BaseChatModel._stream:
+                    result = await asyncio.wait_for(
+                        model._agenerate(messages, stop=stop, **call_kwargs, **kwargs), self.timeout)
+                    self.first_token.add(time.perf_counter() - started)
+                    window = None
+                    yield _as_chunk(result)
+                else:
+                    chunks = model._astream(messages, stop=stop, **call_kwargs, **kwargs)
+                    first = await asyncio.wait_for(chunks.__anext__(), self.timeout)
+                    self.first_token.add(time.perf_counter() - started)
+                    window = None
+                    yield first
+                    async for chunk in chunks:
+                        yield chunk
+            except (asyncio.CancelledError, GeneratorExit):
+                self.breaker.cancel(ticket)
+                raise
+            except StopAsyncIteration:
+                self._done(started, ticket)
+                return
+            except Exception as e:
+                self._done(started, ticket, e, window)
+                raise
+            self._done(started, ticket)
+        finally:
+            self.limiter.release()
+
+
+class LLMPool:
+    def __init__(self, providers: List[Provider]):
+        self.providers = providers
+
+    def _attempts(self) -> list:
+        """Providers to try, in order: healthy ones first, each at least once."""
+        healthy = [p for p in self.providers if not p.breaker.is_open]
+        if not healthy:
+            raise LLMBusyError("No language model provider is available right now.")
+        return [healthy[i % len(healthy)] for i in range(max(MAX_ATTEMPTS, len(healthy)))], healthy
+
+    @staticmethod
+    def _partner(provider, healthy):
+        others = [p for p in healthy if p is not provider]
+        return others[0] if HEDGE and others else None
+
+    def generate(self, messages, stop, tools, tool_kwargs, kwargs) -> ChatResult:
+        attempts, healthy = self._attempts()
+        error = None
+        for provider in attempts:
+            call = lambda p: p.generate(messages, stop, tools, tool_kwargs, kwargs)
+            try:
+                partner = self._partner(provider, healthy)
+                delay = provider.hedge_delay(False) if partner else None
+                if delay is None:
+                    return self._tag(call(provider), provider)
+                return self._hedged(provider, partner, delay, call)
+            except Exception as e:
+                if not _fails_over(e):
+                    raise
+                error = e
+        raise error
+
+    def _hedged(self, primary, partner, delay, call):
+        submit = lambda p: _hedge_executor.submit(contextvars.copy_context().run, call, p)
+        first = submit(primary)
+        # wait() rather than result(timeout=): since Python 3.11 the futures'
+        # TimeoutError is the builtin one, so a provider timing out would
+        # look like "no answer yet".
+        if first in wait_futures({first}, timeout=delay).done:
+            return self._tag(first.result(), primary)
+        HEDGES.inc(provider=partner.name, result="sent")
+        futures = {first: primary, submit(partner): partner}
+        pending, error = set(futures), None
+        while pending:
+            done, pending = wait_futures(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if futures[future] is partner:
+                        HEDGES.inc(provider=partner.name, result="won")
+                    return self._tag(future.result(), futures[future])
+                error = future.exception()
+                if not _fails_over(error):
+                    raise error
+        raise error
+
+    async def agenerate(self, messages, stop, tools, tool_kwargs, kwargs) -> ChatResult:
+        attempts, healthy = self._attempts()
+        error = None
+        for provider in attempts:
+            call = lambda p: p.agenerate(messages, stop, tools, tool_kwargs, kwargs)
+            try:
+                partner = self._partner(provider, healthy)
+                delay = provider.hedge_delay(False) if partner else None
+                if delay is None:
+                    return self._tag(await call(provider), provider)
+                return await self._ahedged(provider, partner, delay, call)
+            except Exception as e:
+                if not _fails_over(e):
+                    raise
+                error = e
+        raise error
+
+    async def _ahedged(self, primary, partner, delay, call):
+        first = asyncio.ensure_future(call(primary))
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return self._tag(first.result(), primary)
+        HEDGES.inc(provider=partner.name, result="sent")
+        tasks = {first: primary, asyncio.ensure_future(call(partner)): partner}
+        pending, error = set(tasks), None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if tasks[task] is partner:
+                            HEDGES.inc(provider=partner.name, result="won")
+                        return self._tag(task.result(), tasks[task])
+                    error = task.exception()
+                    if not _fails_over(error):
+                        raise error
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def astream(self, messages, stop, tools, tool_kwargs, kwargs):
+        """Streams from one provider. Failover and hedging happen before the
+        first chunk; once text has been sent, the stream stays with its provider."""
+        attempts, healthy = self._attempts()
+        error = None
+        for provider in attempts:
+            try:
+                chunks, first = await self._open_stream(provider, self._partner(provider, healthy),
+                                                        messages, stop, tools, tool_kwargs, kwargs)
+            except Exception as e:
+                if not _fails_over(e):
+                    raise
+                error = e
+                continue
+            if first is None:
+                return
+            yield first
+            async for chunk in chunks:
+                yield chunk
+            return
+        raise error
+
+    async def _open_stream(self, primary, partner, messages, stop, tools, tool_kwargs, kwargs):
+        """Starts a stream and waits for its first chunk: (generator, first chunk)."""
+        async def first_chunk(provider):
+            chunks = provider.astream(messages, stop, tools, tool_kwargs, kwargs)
+            try:
+                return chunks, self._tag_chunk(await chunks.__anext__(), provider)
+            except StopAsyncIteration:
+                return chunks, None
+            except BaseException:
+                await chunks.aclose()
+                raise
+
+        delay = primary.hedge_delay(True) if partner else None
+        if delay is None:
+            return await first_chunk(primary)
+        first = asyncio.ensure_future(first_chunk(primary))
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result()
+        HEDGES.inc(provider=partner.name, result="sent")
+        tasks = {first: primary, asyncio.ensure_future(first_chunk(partner)): partner}
+        pending, error = set(tasks), None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if tasks[task] is partner:
+                            HEDGES.inc(provider=partner.name, result="won")
+                        # A loser that already has its first chunk is closed below.
+                        for other in pending:
+                            other.add_done_callback(_close_stream)
+                        return task.result()
+                    error = task.exception()
+                    if not _fails_over(error):
+                        raise error
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    @staticmethod
+    def _tag(result: ChatResult, provider) -> ChatResult:
+        for generation in result.generations:
+            generation.message.response_metadata["llm_provider"] = provider.name
+        return result
+
+    @staticmethod
+    def _tag_chunk(chunk, provider):
+        if chunk is not None:
+            chunk.message.response_metadata["llm_provider"] = provider.name
+        return chunk
+
+    def metric_lines(self):
+        yield from gauge_lines(
+            "hr_llm_provider_latency_seconds", "LLM provider latency over its last calls.",
+            [({"provider": p.name, "quantile": q}, p.latency.quantile(q))
+             for p in self.providers for q in (0.5, 0.95, 0.99) if p.latency.quantile(q) is not None])
+        for name, documentation, value in (
+            ("hr_llm_provider_in_flight", "Calls in flight at each LLM provider.", lambda p: p.limiter.active),
+            ("hr_llm_provider_queued", "Calls waiting for a slot at each LLM provider.", lambda p: p.limiter.queued),
+            ("hr_llm_provider_circuit_open", "1 while an LLM provider's circuit breaker is open.",
+             lambda p: int(p.breaker.is_open)),
+        ):
+            yield from gauge_lines(name, documentation, [({"provider": p.name}, value(p)) for p in self.providers])
+
+
+def _close_stream(task):
+    if not task.cancelled() and task.exception() is None:
+        chunks, _ = task.result()
+        asyncio.ensure_future(chunks.aclose())
+
+
+class PooledChatModel(BaseChatModel):
+    """A chat model that sends each call to the LLMPool."""
+
+    pool: Any
+    tools: List[Any] = []
+    tool_kwargs: dict = {}
+
+    @property
+    def _llm_type(self) -> str:
+        return "provider-pool"
+
+    def bind_tools(self, tools, **kwargs):
+        # Each provider binds the tools in its own format, on first use.
+        return PooledChatModel(pool=self.pool, tools=list(tools), tool_kwargs=kwargs)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        return self.pool.generate(messages, stop, self.tools, self.tool_kwargs, kwargs)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        return await self.pool.agenerate(messages, stop, self.tools, self.tool_kwargs, kwargs)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        async for chunk in self.pool.astream(messages, stop, self.tools, self.tool_kwargs, kwargs):
+            yield chunk
+
+
+def provider_specs() -> list:
+    specs = os.getenv("LLM_PROVIDERS")
+    if specs:
+        return [spec.strip() for spec in specs.split(",") if spec.strip()]
+    # Single-provider setup: LLM_PROVIDER and LLM_MODEL, as before.
+    kind = os.getenv("LLM_PROVIDER", "groq").lower()
+    model = os.getenv("LLM_MODEL")
+    return [f"{kind}:{model}" if model else kind]
+
+
+def create_pooled_llm() -> PooledChatModel:
+    pool = LLMPool([Provider(spec) for spec in provider_specs()])
+    REGISTRY.register_collector(pool.metric_lines)
+    log.info("LLM providers configured", extra={
+        "providers": [p.name for p in pool.providers], "hedged": HEDGE and len(pool.providers) > 1})
+    return PooledChatModel(pool=pool)
@@ -0,0 +1,116 @@
+# app/agents/profiles.py
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+
+from app.tools import leave_tools
+from app.agents.history import select_messages
+
+# --- System prompt, split by role ---
+# Only the role's own section is sent, and the per-user IDs are the very last
+# thing in the system message, so the prompt prefix is identical for every
+# user of a role and provider-side prompt caching can reuse it.
+BASE_PROMPT = """You are an expert HR assistant chatbot for a leave management system.
+You must respond to the user in **Sinhala**. Be polite, professional, and helpful.
+
+**GOLDEN RULE: Before calling any tool, you MUST first check the conversation history. If the information the user is asking for (like a rejection reason) is already available in a previous message, answer using that information directly. DO NOT call a tool again if you already have the answer.**
+
+The user's role is: **{role}**.
+"""
+
+ROLE_PROMPTS = {
+    "employee": """
+- Your main task is to help them create and view leave requests.
+- When you use `get_my_leave_requests` and find a rejected request, make sure to mention that the user can ask for the reason.
+- **CRITICAL INSTRUCTIONS FOR CREATING LEAVE:**
+  - To create a leave request using `create_leave_request`, you absolutely need THREE pieces of information from the user: 1. The leave type. 2. The start date. 3. The end date.
+  - **Follow this conversation flow exactly:**
+      - **Step 1:** If the user makes a vague request, you MUST ask for the missing details.
+      - **Step 2:** Do NOT call the `create_leave_request` tool until you have gathered all three pieces of information.
+      - **Step 3:** Once you have the details, YOU MUST confirm them with the user one last time.
+      - **Step 4:** Only after the user confirms, you are allowed to call the `create_leave_request` tool. For the `employee_id` and `supervisor_id` arguments, you MUST use the IDs given in the session context below. Do NOT ask the user for these IDs.
+- You can also show an employee their own leave requests using `get_my_leave_requests`.
+- If creating a request returns a note about overlapping leave, tell the user about it.
+- For questions like "how many leave days do I have left", use `get_my_leave_balance` with their employee ID.
+""",
+    "supervisor": """
+- You can show them the leave requests of their team that are waiting for their approval using `get_pending_supervisor_requests`, with their own employee ID as `supervisor_id`.
+- A supervisor approves by setting the status to 'approved_by_supervisor', or rejects with 'rejected'.
+- To answer "who else in my team is off that week?", use `get_team_leave_calendar` with their own employee ID as `supervisor_id` and the dates in question.
+""",
+    "hr": """
+- You can show them the leave requests waiting for final HR approval using `get_pending_hr_requests`.
+- HR gives final approval by setting the status to 'approved_by_hr', or rejects with 'rejected'.
+- To see who in a team is on leave in a period, use `get_team_leave_calendar` with that team's supervisor ID.
+""",
+}
+
+APPROVAL_PROMPT = """- **CRITICAL INSTRUCTIONS FOR APPROVING/REJECTING:**
+  - When you use the `approve_or_reject_request` tool, the `request_id` argument **MUST** be the 24-character hexadecimal ObjectId of the leave request (e.g., '667b...'), **NOT** the employee's ID (e.g., 'EMP123').
+  - You should find this specific `request_id` from the list of requests you previously showed the user in the conversation history. If a user says "approve Kamal's request", you must look back in the conversation to find the specific request ID associated with Kamal's pending request.
+  - Use the user's own employee ID from the session context for `approver_id`, and their role for `approver_role`.
+  - To approve or reject several requests at once, use `bulk_approve_or_reject_requests` with their `request_ids` in ONE call, instead of calling `approve_or_reject_request` repeatedly. Only set `all_pending` when the user clearly asks to process ALL pending requests, and confirm with the user first.
+"""
+
+SESSION_PROMPT = """
+**Session context:**
+- The user's employee ID: {employee_id}
+- The user's supervisor ID: {supervisor_id}
+"""
+
+# --- Tools each role may use ---
+ROLE_TOOLS = {
+    "employee": [
+        leave_tools.create_leave_request,
+        leave_tools.get_my_leave_requests,
+        leave_tools.get_my_leave_balance,
+    ],
+    "supervisor": [
+        leave_tools.get_pending_supervisor_requests,
+        leave_tools.get_team_leave_calendar,
+        leave_tools.approve_or_reject_request,
+        leave_tools.bulk_approve_or_reject_requests,
+    ],
+    "hr": [
+        leave_tools.get_pending_hr_requests,
+        leave_tools.get_team_leave_calendar,
+        leave_tools.approve_or_reject_request,
+        leave_tools.bulk_approve_or_reject_requests,
+    ],
+}
+
+
+class AgentProfile:
+    """The prompt, tools and bound LLM chain for one role, built once at startup."""
+
+    def __init__(self, role, llm):
+        self.role = role
+        self.tools = ROLE_TOOLS.get(role, [])
+        self.tool_map = {tool.name: tool for tool in self.tools}
+
+        system_text = BASE_PROMPT.replace("{role}", role) + ROLE_PROMPTS.get(role, "")
+        if "approve_or_reject_request" in self.tool_map:
+            system_text += APPROVAL_PROMPT
+        system_text += SESSION_PROMPT
+
+        self.prompt = ChatPromptTemplate.from_messages([
+            ("system", system_text),
+            MessagesPlaceholder(variable_name="messages"),
+        ])
+        bound_llm = llm.bind_tools(self.tools) if self.tools else llm
+        self.chain = self.prompt | bound_llm
+
+    def chain_input(self, state) -> dict:
+        """The per-call template variables: only the user's IDs and the windowed messages."""
+        user_info = state.get("user_info", {})
+        return {
+            # The user's own ID comes from the JWT token under the 'user_id' key
+            "employee_id": user_info.get("user_id"),
+            "supervisor_id": user_info.get("supervisor_id") if self.role == "employee" else None,
+            "messages": select_messages(state),
+        }
+
+
+def build_profiles(llm) -> dict:
+    """Builds one AgentProfile per known role, plus a tool-less fallback."""
+    profiles = {role: AgentProfile(role, llm) for role in ROLE_TOOLS}
+    profiles["unknown"] = AgentProfile("unknown", llm)
+    return profiles
@@ -0,0 +1,247 @@
+# app/agents/response_cache.py
+# Caches the answers of read-only chat turns ("show pending requests"), so
+# asking the same thing again skips the whole agent loop.
+#
+# The key is role + user ID + normalized message + the version stamps of the
+# leave_requests slice the user can see (app/models/data_version.py). Every
+# write bumps those stamps, so a cached answer stops matching exactly when
+# its data changes; stale entries are never served and simply age out.
+#
+# Only the first turn of a thread is cached, and only if it called read-only
+# tools (and nothing else): its answer then depends on the data alone. A
+# follow-up ("yes", "what about next month?") is answered from the thread's
+# history, so it always goes to the agent. On a hit the cached
+# messages, tool calls and results included, are appended to the thread with
+# update_state, so the conversation history is the same as after a real run.
+#
+#   RESPONSE_CACHE_BACKEND: memory (default, per process), mongo (shared by
+#                           all workers) or off
+#   RESPONSE_CACHE_SIZE:    entries kept by the memory backend (LRU)
+#   RESPONSE_CACHE_TTL:     seconds an entry is kept
+import os
+import re
+import uuid
+import datetime
+import threading
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage, messages_from_dict, messages_to_dict
+
+from app.utils.cache import TTLCache
+from app.utils.metrics import register_cache
+from app.models.data_version import DataVersion, GLOBAL_SCOPE
+
+READ_ONLY_TOOLS = {
+    "get_my_leave_requests",
+    "get_my_leave_balance",
+    "get_pending_supervisor_requests",
+    "get_pending_hr_requests",
+    "get_team_leave_calendar",
+}
+
+_SPACES_RE = re.compile(r"\s+")
+
+
+def normalize(text: str) -> str:
+    """Lower case, single spaces, no trailing punctuation."""
+    return _SPACES_RE.sub(" ", text.strip().lower()).rstrip(" ?!.")
+
+
+def _scopes(user_info) -> list:
+    """The version stamps covering the data a user's read-only tools can return."""
+    role, user_id = user_info.get("role"), user_info.get("user_id")
+    if role == "employee":
+        return [f"employee:{user_id}"]
+    if role == "supervisor":
+        return [f"supervisor:{user_id}"]
+    if role == "hr":
+        return [GLOBAL_SCOPE]
+    return None
+
+
+def turn_messages(messages) -> list:
+    """The messages of the last turn: everything after the last HumanMessage."""
+    for index in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[index], HumanMessage):
+            return list(messages[index + 1:])
+    return []
+
+
+def is_first_turn(messages) -> bool:
+    """True when the last HumanMessage is the only one: the thread had no history."""
+    return sum(isinstance(m, HumanMessage) for m in messages) == 1
+
+
+def is_cacheable(turn) -> bool:
+    tool_calls = [tc for m in turn if isinstance(m, AIMessage) for tc in m.tool_calls]
+    if not tool_calls or not turn or not isinstance(turn[-1], AIMessage) or turn[-1].tool_calls:
+        return False
+    for tool_call in tool_calls:
+        # A page after a cursor depends on the earlier pages the user saw.
+        if tool_call["name"] not in READ_ONLY_TOOLS or tool_call["args"].get("after"):
+            return False
+    return not any(isinstance(m, ToolMessage) and str(m.content).startswith("Error") for m in turn)
+
+
+def _with_new_ids(messages) -> list:
+    """Gives replayed tool calls fresh IDs, so IDs stay unique within a thread."""
+    new_ids = {}
+    for message in messages:
+        if isinstance(message, AIMessage):
+            for tool_call in message.tool_calls:
+                tool_call["id"] = new_ids.setdefault(tool_call["id"], f"cached_{uuid.uuid4().hex}")
+        elif isinstance(message, ToolMessage):
+            message.tool_call_id = new_ids.get(message.tool_call_id, message.tool_call_id)
+    return messages
+
+
+class InProcessBackend:
+    """LRU + TTL, per process."""
+
+    def __init__(self, maxsize, ttl):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def set(self, key, value):
+        self._cache.set(key, value)
+
+    def stats(self) -> dict:
+        stats = self._cache.stats()
+        return {"size": stats["size"], "evictions": stats["evictions"]}
+
+
+class MongoBackend:
+    """Shared by every worker; entries expire through a TTL index on expires_at."""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+
+    @staticmethod
+    def collection():
+        from app.utils.db import get_db
+        return get_db()["response_cache"]
+
+    def get(self, key):
+        doc = self.collection().find_one({"_id": key}, {"value": 1, "expires_at": 1})
+        # The TTL monitor runs about once a minute, so check expiry here too.
+        if doc is None or doc["expires_at"] <= datetime.datetime.utcnow():
+            return None
+        return doc["value"]
+
+    def set(self, key, value):
+        expires_at = datetime.datetime.utcnow() + datetime.timedelta(seconds=self.ttl)
+        self.collection().replace_one({"_id": key}, {"value": value, "expires_at": expires_at}, upsert=True)
+
+    def stats(self) -> dict:
+        # Expired entries are removed by MongoDB, not evicted by us.
+        return {"size": self.collection().estimated_document_count(), "evictions": 0}
+
+
+class ResponseCache:
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def key(self, user_info, message):
+        """The cache key for this message now, or None if it cannot be cached.
+
+        Reads the current version stamps, so call it before running the
+        turn: an answer computed while a write lands is stored under the old
+        stamps and never served.
+        """
+        scopes = _scopes(user_info)
+        if scopes is None or not message:
+            return None
+        versions = ".".join(str(v) for v in DataVersion.get(scopes))
+        return f"{user_info['role']}:{user_info['user_id']}:{versions}:{normalize(message)}"
+
+    def get(self, key):
+        """The cached turn messages, or None."""
+        value = self.backend.get(key) if key else None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return _with_new_ids(messages_from_dict(value)) if value is not None else None
+
+    def put(self, key, messages) -> bool:
+        """Caches the last turn of `messages` if it was the first one and read-only."""
+        turn = turn_messages(messages)
+        if key is None or not is_first_turn(messages) or not is_cacheable(turn):
+            return False
+        self.backend.set(key, messages_to_dict(turn))
+        return True
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            **self.backend.stats(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+def lookup(agent_input, graph, config, new_thread):
+    """Returns (key, cached turn or None) for a chat turn; key is None when
+    the turn cannot be cached or caching is off.
+
+    A turn with history before it is never served from (or stored in) the
+    cache. The thread's state is only read when the client sent a thread ID.
+    """
+    cache = get_response_cache()
+    if cache is None:
+        return None, None
+    if not new_thread and graph.get_state(config).values.get("messages"):
+        return None, None
+    message = agent_input["messages"][-1].content
+    key = cache.key(agent_input["user_info"], message)
+    return key, (cache.get(key) if key else None)
+
+
+def store(key, messages):
+    """Caches the last turn of a thread's messages under key, if it was read-only."""
+    if key is not None:
+        get_response_cache().put(key, messages)
+
+
+def _replay_values(agent_input, cached) -> dict:
+    return {"messages": list(agent_input["messages"]) + list(cached), "user_info": agent_input["user_info"]}
+
+
+def replay(graph, config, agent_input, cached):
+    """Appends the user's message and the cached answer to the thread."""
+    # As if the agent node had produced them, so the thread ends the turn
+    # in the same state as after a real run.
+    graph.update_state(config, _replay_values(agent_input, cached), as_node="agent")
+
+
+async def areplay(graph, config, agent_input, cached):
+    await graph.aupdate_state(config, _replay_values(agent_input, cached), as_node="agent")
+
+
+_lock = threading.Lock()
+_response_cache = None
+
+
+def get_response_cache():
+    """The shared ResponseCache, or None when RESPONSE_CACHE_BACKEND=off."""
+    global _response_cache
+    backend_name = os.getenv("RESPONSE_CACHE_BACKEND", "memory").lower()
+    if backend_name == "off":
+        return None
+    if _response_cache is None:
+        with _lock:
+            if _response_cache is None:
+                ttl = float(os.getenv("RESPONSE_CACHE_TTL", "600"))
+                if backend_name == "mongo":
+                    backend = MongoBackend(ttl)
+                else:
+                    backend = InProcessBackend(int(os.getenv("RESPONSE_CACHE_SIZE", "1000")), ttl)
+                _response_cache = ResponseCache(backend)
+                register_cache("response", _response_cache)
+    return _response_cache
@@ -0,0 +1,205 @@
+# app/agents/router.py
+# Fast path in front of the LLM. The most common questions ("show my leave
+# requests", "show pending requests") are matched with keyword rules for the
+# user's role, answered by calling the list tool directly and rendering the
+# result with a template. Anything that does not clearly match goes on to
+# the LLM as before.
+import re
+import uuid
+import logging
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from app.agents.tool_executor import to_tool_message
+from app.utils.metrics import span
+
+log = logging.getLogger(__name__)
+
+# Messages longer than this are treated as "something more specific" and
+# left to the LLM.
+MAX_ROUTED_WORDS = 12
+
+# (tool name, patterns) per role. A message must match one of the patterns.
+INTENTS = {
+    "employee": ("get_my_leave_requests", [
+        r"\b(show|list|view|see|check|get|display)\b.*\b(my|all)\b.*\b(leave|leaves|requests?)\b",
+        r"\bmy\s+(leave\s+)?(requests?|leaves?)\b",
+        r"\bstatus\s+of\s+my\s+(leave|requests?)\b",
+        r"මගේ\s*නිවාඩු",
+        r"මගෙ\s*නිවාඩු",
+        r"මගේ\s*ඉල්ලීම්",
+    ]),
+    "supervisor": ("get_pending_supervisor_requests", [
+        r"\bpending\b.*\b(leave|leaves|requests?)\b",
+        r"\b(requests?|leaves?)\b.*\b(to approve|waiting|awaiting)\b",
+        r"පොරොත්තු",
+        r"අනුමත\s*කිරීමට\s*(ඇති|තිබෙන|තියෙන)",
+        r"අනුමැතිය\s*(සඳහා|බලාපොරොත්තු)",
+    ]),
+    "hr": ("get_pending_hr_requests", [
+        r"\bpending\b.*\b(leave|leaves|requests?)\b",
+        r"\b(requests?|leaves?)\b.*\b(to approve|waiting|awaiting)\b",
+        r"පොරොත්තු",
+        r"අනුමත\s*කිරීමට\s*(ඇති|තිබෙන|තියෙන)",
+        r"අනුමැතිය\s*(සඳහා|බලාපොරොත්තු)",
+    ]),
+}
+
+# Anything that asks for a change, a specific request or a date goes to the LLM.
+EXCLUDE_PATTERNS = [
+    r"\d",
+    r"\b(approve|reject|decline|cancel|create|apply|submit|new|why|reason|balance)\b",
+    r"\b(want|need|take|book|tomorrow|next|from|until)\b",
+    r"අනුමත\s*කරන්න",
+    r"ප්‍රතික්ෂේප",
+    r"ඉල්ලන්න",
+    r"දාන්න",
+    r"අවලංගු",
+    r"ඇයි",
+    r"ඕන",
+    r"අවශ්‍ය",
+    r"හෙට",
+    r"හේතුව",
+]
+
+_INTENTS = {
+    role: (tool_name, [re.compile(p, re.IGNORECASE) for p in patterns])
+    for role, (tool_name, patterns) in INTENTS.items()
+}
+_EXCLUDE = [re.compile(p, re.IGNORECASE) for p in EXCLUDE_PATTERNS]
+
+STATUS_LABELS = {
+    "pending_supervisor_approval": "අධීක්ෂක අනුමැතිය බලාපොරොත්තුවෙන්",
+    "approved_by_supervisor": "අධීක්ෂක අනුමත කර ඇත (HR අනුමැතිය බලාපොරොත්තුවෙන්)",
+    "approved_by_hr": "අවසන් අනුමැතිය ලැබී ඇත",
+    "rejected": "ප්‍රතික්ෂේප කර ඇත",
+}
+
+HEADINGS = {
+    "get_my_leave_requests": "ඔබගේ නිවාඩු ඉල්ලීම්:",
+    "get_pending_supervisor_requests": "ඔබගේ අනුමැතිය බලාපොරොත්තුවෙන් ඇති නිවාඩු ඉල්ලීම්:",
+    "get_pending_hr_requests": "HR අවසන් අනුමැතිය බලාපොරොත්තුවෙන් ඇති නිවාඩු ඉල්ලීම්:",
+}
+
+EMPTY_MESSAGES = {
+    "get_my_leave_requests": "ඔබට තවම නිවාඩු ඉල්ලීම් කිසිවක් නැත.",
+    "get_pending_supervisor_requests": "ඔබගේ අනුමැතිය බලාපොරොත්තුවෙන් ඇති නිවාඩු ඉල්ලීම් කිසිවක් නැත.",
+    "get_pending_hr_requests": "HR අනුමැතිය බලාපොරොත්තුවෙන් ඇති නිවාඩු ඉල්ලීම් කිසිවක් නැත.",
+}
+
+
+def match_intent(role: str, text: str):
+    """Returns the tool name to call directly, or None if the LLM should handle it."""
+    if role not in _INTENTS or not text:
+        return None
+    text = text.strip()
+    if len(text.split()) > MAX_ROUTED_WORDS:
+        return None
+    if any(p.search(text) for p in _EXCLUDE):
+        return None
+    tool_name, patterns = _INTENTS[role]
+    if any(p.search(text) for p in patterns):
+        return tool_name
+    return None
+
+
+def _tool_args(tool_name: str, user_info: dict) -> dict:
+    if tool_name == "get_my_leave_requests":
+        return {"employee_id": user_info.get("user_id")}
+    if tool_name == "get_pending_supervisor_requests":
+        return {"supervisor_id": user_info.get("user_id")}
+    return {}
+
+
+def _format_date(value) -> str:
+    return value.strftime("%Y-%m-%d") if hasattr(value, "strftime") else str(value)
+
+
+def render_requests(tool_name: str, result) -> str:
+    """Renders a list tool's result as the assistant's answer (in Sinhala)."""
+    if not isinstance(result, dict):
+        return str(result)
+    requests = result.get("requests", [])
+    if not requests:
+        return EMPTY_MESSAGES[tool_name]
+
+    lines = [HEADINGS[tool_name], ""]
+    has_rejected = False
+    for req in requests:
+        status = req.get("status")
+        has_rejected = has_rejected or status == "rejected"
+        who = f"{req.get('employee_id')} | " if tool_name != "get_my_leave_requests" else ""
+        lines.append(
+            f"- {who}{req.get('leave_type')} | {_format_date(req.get('start_date'))} - {_format_date(req.get('end_date'))}"
+            f" | {STATUS_LABELS.get(status, status)} | ID: `{req.get('_id')}`"
+        )
+        if req.get("reason"):
+            lines.append(f"  හේතුව: {req['reason']}")
+
+    if has_rejected and tool_name == "get_my_leave_requests":
+        lines += ["", "ප්‍රතික්ෂේප වූ ඉල්ලීමක හේතුව දැනගැනීමට අවශ්‍ය නම් මගෙන් අසන්න."]
+    if result.get("next_cursor"):
+        lines += ["", "තවත් ඉල්ලීම් ඇත. ඒවා බැලීමට 'තවත් පෙන්වන්න' ලෙස අසන්න."]
+    return "\n".join(lines)
+
+
+def _routed_call(state, tool_map):
+    """Returns (tool_call, tool) when the last message can take the fast path."""
+    last_message = state["messages"][-1]
+    if not isinstance(last_message, HumanMessage):
+        return None, None
+    user_info = state.get("user_info", {})
+    tool_name = match_intent(user_info.get("role"), last_message.content)
+    if tool_name is None or tool_name not in tool_map:
+        return None, None
+    tool_call = {"name": tool_name, "args": _tool_args(tool_name, user_info), "id": f"router_{uuid.uuid4().hex}"}
+    return tool_call, tool_map[tool_name]
+
+
+def _routed_messages(tool_call, tool_output) -> list:
+    # The same message sequence the LLM would have produced, so the tool
+    # result (with request IDs) is in the history for later turns.
+    return [
+        AIMessage(content="", tool_calls=[tool_call]),
+        to_tool_message(tool_call, tool_output),
+        AIMessage(content=render_requests(tool_call["name"], tool_output)),
+    ]
+
+
+# A node must write something; an empty message list leaves the state as is.
+_PASS_THROUGH = {"messages": []}
+
+
+def route(state, tool_map) -> dict:
+    tool_call, tool = _routed_call(state, tool_map)
+    if tool_call is None:
+        return _PASS_THROUGH
+    try:
+        with span("tool", tool_call["name"]):
+            tool_output = tool.invoke(tool_call["args"])
+    except Exception as e:
+        # Let the LLM handle (and explain) the failure.
+        log.warning("Router fast path failed", extra={"tool": tool_call["name"], "error": str(e)})
+        return _PASS_THROUGH
+    return {"messages": _routed_messages(tool_call, tool_output)}
+
+
+async def aroute(state, tool_map) -> dict:
+    tool_call, tool = _routed_call(state, tool_map)
+    if tool_call is None:
+        return _PASS_THROUGH
+    try:
+        with span("tool", tool_call["name"]):
+            tool_output = await tool.ainvoke(tool_call["args"])
+    except Exception as e:
+        log.warning("Router fast path failed", extra={"tool": tool_call["name"], "error": str(e)})
+        return _PASS_THROUGH
+    return {"messages": _routed_messages(tool_call, tool_output)}
+
+
+def route_decision(state) -> str:
+    """After the router: 'end' if it answered the turn, otherwise 'agent'."""
+    last_message = state["messages"][-1]
+    if isinstance(last_message, AIMessage) and not last_message.tool_calls:
+        return "end"
+    return "agent"
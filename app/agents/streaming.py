@@ -0,0 +1,91 @@
+# app/agents/streaming.py
+import json
+import queue
+import asyncio
+import threading
+import contextvars
+
+from app.agents.history import SUMMARY_TAG
+
+
+def _is_node_end(event, node):
+    """True for the end of the graph node itself.
+
+    The runnable inside the node has the same name and ends first; only the
+    node's own run is tagged with its graph step.
+    """
+    return (event.get("metadata", {}).get("langgraph_node") == node
+            and any(tag.startswith("graph:step:") for tag in event.get("tags", [])))
+
+
+async def astream_chat_events(graph, graph_input, config):
+    """Runs the agent graph and yields (event, data) pairs as they happen.
+
+    Events:
+      - token:      a piece of the assistant's answer text
+      - tool_start: a tool is about to run
+      - tool_end:   a tool has finished
+      - done:       the final answer for this turn
+    """
+    final_response = ""
+    async for event in graph.astream_events(graph_input, config=config, version="v2"):
+        kind = event["event"]
+        if SUMMARY_TAG in event.get("tags", []):
+            # The history summary is bookkeeping, not part of the answer.
+            continue
+        if kind == "on_chat_model_stream":
+            chunk = event["data"]["chunk"]
+            # Chunks that only carry tool-call arguments have no text to show.
+            if chunk.content:
+                yield "token", {"content": chunk.content}
+        elif kind == "on_chat_model_end":
+            output = event["data"].get("output")
+            if output is not None and not getattr(output, "tool_calls", None):
+                final_response = output.content
+        elif kind == "on_chain_end" and _is_node_end(event, "router"):
+            # The fast-path router answers without an LLM call, so its reply
+            # is sent as a single token.
+            messages = (event["data"].get("output") or {}).get("messages") or []
+            if messages and not messages[-1].tool_calls:
+                final_response = messages[-1].content
+                yield "token", {"content": final_response}
+        elif kind == "on_tool_start":
+            yield "tool_start", {"name": event["name"], "input": event["data"].get("input")}
+        elif kind == "on_tool_end":
+            yield "tool_end", {"name": event["name"]}
+    yield "done", {"response": final_response}
+
+
+def iter_chat_events(graph, graph_input, config):
+    """Synchronous wrapper around astream_chat_events for WSGI servers.
+
+    The graph runs on its own event loop in a background thread and the events
+    are handed over through a queue, so Flask can write each one to the client
+    as soon as it is produced.
+    """
+    events = queue.Queue()
+    sentinel = object()
+
+    async def produce():
+        try:
+            async for item in astream_chat_events(graph, graph_input, config):
+                events.put(item)
+        except Exception as e:
+            events.put(("error", {"error": f"An internal error occurred: {e}"}))
+        finally:
+            events.put(sentinel)
+
+    # The caller's context (request ID and metrics) goes with the graph run.
+    context = contextvars.copy_context()
+    threading.Thread(target=lambda: context.run(asyncio.run, produce()), daemon=True).start()
+
+    while True:
+        item = events.get()
+        if item is sentinel:
+            return
+        yield item
+
+
+def format_sse(event: str, data: dict) -> str:
+    """Encodes one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
@@ -0,0 +1,177 @@
+# app/agents/tool_executor.py
+# Runs the tool calls of one model message. Independent calls run
+# concurrently, results always come back in the order the model asked for
+# them, and each read has its own timeout so one slow call cannot stall the
+# whole turn. Writes are never abandoned once they have started: the model
+# would be told a change failed that may still go through.
+import os
+import time
+import asyncio
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from langchain_core.messages import ToolMessage
+
+from app.tools.formatters import format_tool_result
+from app.utils.metrics import span
+
+log = logging.getLogger(__name__)
+
+TOOL_CALL_TIMEOUT = float(os.getenv("TOOL_CALL_TIMEOUT", "30"))
+
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("TOOL_MAX_WORKERS", "8")),
+    thread_name_prefix="agent-tools"
+)
+
+# Arguments that identify the record a write tool changes. Two writes to the
+# same record must not run at the same time; reads never conflict.
+WRITE_TOOL_KEYS = {
+    "create_leave_request": "employee_id",
+    "approve_or_reject_request": "request_id",
+}
+
+
+# Tools that may touch any number of records always run on their own.
+EXCLUSIVE_TOOLS = {"bulk_approve_or_reject_requests"}
+
+WRITE_TOOLS = set(WRITE_TOOL_KEYS) | EXCLUSIVE_TOOLS
+
+
+def _resource_key(tool_call):
+    arg_name = WRITE_TOOL_KEYS.get(tool_call['name'])
+    if arg_name is None:
+        return None
+    return (arg_name, str(tool_call['args'].get(arg_name)))
+
+
+def plan_batches(tool_calls) -> list:
+    """Splits tool calls into consecutive batches that can each run concurrently.
+
+    A call starts a new batch only when it writes to a record that a call in
+    the current batch also writes to, so their relative order is kept. Bulk
+    tools always get a batch of their own.
+    """
+    batches, current, keys = [], [], set()
+    for tool_call in tool_calls:
+        if tool_call['name'] in EXCLUSIVE_TOOLS:
+            if current:
+                batches.append(current)
+            batches.append([tool_call])
+            current, keys = [], set()
+            continue
+        key = _resource_key(tool_call)
+        if key is not None and key in keys:
+            batches.append(current)
+            current, keys = [], set()
+        current.append(tool_call)
+        if key is not None:
+            keys.add(key)
+    if current:
+        batches.append(current)
+    return batches
+
+
+def to_tool_message(tool_call, tool_output) -> ToolMessage:
+    """Wraps a tool's output in a ToolMessage, compactly formatted for the LLM.
+
+    The formatter's token accounting is kept in response_metadata.
+    """
+    content, metadata = format_tool_result(tool_call['name'], tool_output)
+    return ToolMessage(content=content, tool_call_id=tool_call['id'], response_metadata=metadata)
+
+
+def _invoke(tool_map, tool_call):
+    tool_name = tool_call['name']
+    tool_args = tool_call['args']
+    if tool_name not in tool_map:
+        return f"Error: Tool '{tool_name}' not found."
+    try:
+        # "args" is a LogRecord attribute; extra must not overwrite it.
+        log.debug("Calling tool", extra={"tool": tool_name, "tool_args": tool_args})
+        with span("tool", tool_name):
+            return tool_map[tool_name].invoke(tool_args)
+    except Exception as e:
+        log.exception("Tool call failed", extra={"tool": tool_name})
+        return f"Error: {e}"
+
+
+async def _ainvoke(tool_map, tool_call):
+    tool_name = tool_call['name']
+    tool_args = tool_call['args']
+    if tool_name not in tool_map:
+        return f"Error: Tool '{tool_name}' not found."
+    try:
+        # "args" is a LogRecord attribute; extra must not overwrite it.
+        log.debug("Calling tool", extra={"tool": tool_name, "tool_args": tool_args})
+        with span("tool", tool_name):
+            if tool_name in WRITE_TOOLS:
+                return await tool_map[tool_name].ainvoke(tool_args)
+            return await asyncio.wait_for(tool_map[tool_name].ainvoke(tool_args), TOOL_CALL_TIMEOUT)
+    except asyncio.TimeoutError:
+        log.warning("Tool call timed out", extra={"tool": tool_name, "timeout": TOOL_CALL_TIMEOUT})
+        return f"Error: Tool '{tool_name}' timed out."
+    except Exception as e:
+        log.exception("Tool call failed", extra={"tool": tool_name})
+        return f"Error: {e}"
+
+
+def _timed_invoke(started, tool_map, tool_call):
+    # When the call leaves the pool's queue; its timeout counts from here.
+    started.append(time.monotonic())
+    return _invoke(tool_map, tool_call)
+
+
+def _wait(tool_call, future, started, submitted_at):
+    """The output of a submitted call.
+
+    A call still queued after TOOL_CALL_TIMEOUT is cancelled and never runs.
+    A running read gets TOOL_CALL_TIMEOUT from its own start and is then
+    abandoned; a running write is waited for.
+    """
+    tool_name = tool_call['name']
+    try:
+        return future.result(timeout=max(0, submitted_at + TOOL_CALL_TIMEOUT - time.monotonic()))
+    except FutureTimeoutError:
+        pass
+    if future.cancel():
+        log.warning("Tool call cancelled before it started", extra={"tool": tool_name, "timeout": TOOL_CALL_TIMEOUT})
+        return f"Error: Tool '{tool_name}' was not run because the server is busy. Nothing was changed."
+    if tool_name in WRITE_TOOLS:
+        return future.result()
+    # started is empty for the moment between the pool taking the call and
+    # _timed_invoke running.
+    start = started[0] if started else time.monotonic()
+    try:
+        return future.result(timeout=max(0, start + TOOL_CALL_TIMEOUT - time.monotonic()))
+    except FutureTimeoutError:
+        # The read keeps running in the background; the turn moves on.
+        log.warning("Tool call timed out", extra={"tool": tool_name, "timeout": TOOL_CALL_TIMEOUT})
+        return f"Error: Tool '{tool_name}' timed out."
+
+
+def run_tool_calls(tool_map, tool_calls) -> list:
+    """Runs tool calls on the shared thread pool and returns ToolMessages in order."""
+    outputs = []
+    for batch in plan_batches(tool_calls):
+        submitted_at = time.monotonic()
+        calls = []
+        for tool_call in batch:
+            started = []
+            # Each call gets a copy of the caller's context so LangChain
+            # callbacks (tracing, streaming events) still see the parent run.
+            future = _executor.submit(contextvars.copy_context().run, _timed_invoke, started, tool_map, tool_call)
+            calls.append((tool_call, future, started))
+        for tool_call, future, started in calls:
+            outputs.append(to_tool_message(tool_call, _wait(tool_call, future, started, submitted_at)))
+    return outputs
+
+
+async def arun_tool_calls(tool_map, tool_calls) -> list:
+    """Async version of run_tool_calls."""
+    outputs = []
+    for batch in plan_batches(tool_calls):
+        results = await asyncio.gather(*(_ainvoke(tool_map, tool_call) for tool_call in batch))
+        outputs.extend(to_tool_message(tool_call, result) for tool_call, result in zip(batch, results))
+    return outputs
@@ -1,48 +1,124 @@
-from flask import Blueprint, request, jsonify
+import uuid
+import logging
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from app.utils.decorators import token_required
-from app.agents.leave_agent_graph import agent_graph
-from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
+from app.agents.streaming import iter_chat_events, format_sse
+from app.agents.concurrency import LLMBusyError
 
 chat_bp = Blueprint('chat_bp', __name__)
+log = logging.getLogger(__name__)
+
+
+def build_agent_input(current_user, user_message):
+    """Builds the graph input for one chat turn.
+
+    Only the new message is sent; earlier turns come from the checkpointer.
+    """
+    # Imported here so LangChain is only loaded by requests that chat.
+    from langchain_core.messages import HumanMessage
+
+    user_info_for_agent = current_user.copy()
+    # Always from the profile, never from the token: an employee moved to
+    # another supervisor must not keep routing requests to the old one.
+    # Tokens issued with a supervisor_id claim are overridden here too.
+    if current_user.get('role') == 'employee':
+        from app.models.user import User
+        user_data = User.get_profile(current_user['user_id'])
+        user_info_for_agent['supervisor_id'] = user_data.get('supervisor_id') if user_data else None
+
+    return {
+        "messages": [HumanMessage(content=user_message)],
+        "user_info": user_info_for_agent
+    }
+
 
 @chat_bp.route('/', methods=['POST'])
 @token_required
 def handle_chat(current_user):
-    data = request.json
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Request body must be a JSON object"}), 400
     user_message = data.get("message")
-    history_from_frontend = data.get("history", [])
+    # The conversation history is kept server-side by the graph checkpointer.
+    # A new thread is started when the client does not send one yet.
+    thread_id = data.get("thread_id") or uuid.uuid4().hex
 
     if not user_message:
         return jsonify({"error": "Message is required"}), 400
 
-    chat_history_messages = []
-    # Start from the second message if the first is the initial greeting
-    start_index = 1 if len(history_from_frontend) > 0 and history_from_frontend[0].get('role') == 'assistant' else 0
-    for msg in history_from_frontend[start_index:]:
-        if msg["role"] == "user":
-            chat_history_messages.append(HumanMessage(content=msg["content"]))
-        elif msg["role"] == "assistant":
-            chat_history_messages.append(AIMessage(content=msg["content"]))
-    
-    chat_history_messages.append(HumanMessage(content=user_message))
-
     try:
-        user_info_for_agent = current_user.copy()
-        if current_user.get('role') == 'employee':
-            from app.models.user import User
-            user_data = User.find_by_username(current_user['username'])
-            user_info_for_agent['supervisor_id'] = user_data.get('supervisor_id') if user_data else None
-
-        response = agent_graph.invoke({
-            "messages": chat_history_messages,
-            "user_info": user_info_for_agent
-        })
+        # The agent (LangChain, LangGraph, the LLM client) loads on the first chat.
+        from app.agents.leave_agent_graph import get_agent_graph, thread_config
+        from app.agents import response_cache
+        agent_graph = get_agent_graph()
+        agent_input = build_agent_input(current_user, user_message)
+        config = thread_config(current_user['user_id'], thread_id)
+
+        cache_key, cached = response_cache.lookup(agent_input, agent_graph, config, not data.get("thread_id"))
+        if cached:
+            response_cache.replay(agent_graph, config, agent_input, cached)
+            return jsonify({"response": cached[-1].content, "thread_id": thread_id, "cached": True})
+
+        response = agent_graph.invoke(agent_input, config=config)
+        response_cache.store(cache_key, response['messages'])
         
         ai_response = response['messages'][-1].content
         
-        return jsonify({"response": ai_response})
+        return jsonify({"response": ai_response, "thread_id": thread_id})
 
+    except LLMBusyError as e:
+        return jsonify({"error": str(e)}), 503
     except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return jsonify({"error": f"An internal error occurred: {e}"}), 500
\ No newline at end of file
+        log.exception("Chat request failed")
+        return jsonify({"error": f"An internal error occurred: {e}"}), 500
+
+
+@chat_bp.route('/stream', methods=['POST'])
+@token_required
+def handle_chat_stream(current_user):
+    """Same as handle_chat, but streams tokens and tool events as Server-Sent Events."""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Request body must be a JSON object"}), 400
+    user_message = data.get("message")
+    thread_id = data.get("thread_id") or uuid.uuid4().hex
+
+    if not user_message:
+        return jsonify({"error": "Message is required"}), 400
+
+    def generate():
+        yield format_sse("thread", {"thread_id": thread_id})
+        # Setup runs inside the stream too, so a failure anywhere ends it
+        # with an error event instead of a broken connection.
+        try:
+            from app.agents.leave_agent_graph import get_agent_graph, thread_config
+            from app.agents import response_cache
+            agent_graph = get_agent_graph()
+            agent_input = build_agent_input(current_user, user_message)
+            config = thread_config(current_user['user_id'], thread_id)
+            cache_key, cached = response_cache.lookup(agent_input, agent_graph, config, not data.get("thread_id"))
+            if cached:
+                response_cache.replay(agent_graph, config, agent_input, cached)
+                yield format_sse("token", {"content": cached[-1].content})
+                yield format_sse("done", {"response": cached[-1].content, "thread_id": thread_id, "cached": True})
+                return
+
+            finished = False
+            for event, payload in iter_chat_events(agent_graph, agent_input, config):
+                if event == "done":
+                    payload["thread_id"] = thread_id
+                    finished = True
+                yield format_sse(event, payload)
+            if finished and cache_key:
+                response_cache.store(cache_key, agent_graph.get_state(config).values["messages"])
+        except LLMBusyError as e:
+            yield format_sse("error", {"error": str(e)})
+        except Exception as e:
+            log.exception("Chat stream failed")
+            yield format_sse("error", {"error": f"An internal error occurred: {e}"})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
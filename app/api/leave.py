@@ -0,0 +1,37 @@
+# app/api/leave.py
+from flask import Blueprint, request, jsonify
+from app.utils.decorators import token_required, role_required
+
+leave_bp = Blueprint('leave_bp', __name__)
+
+@leave_bp.route('/bulk-status', methods=['POST'])
+@token_required
+@role_required('supervisor', 'hr')
+def bulk_status(current_user):
+    """Approves or rejects many leave requests in one database operation.
+
+    Body: {"new_status": ..., "request_ids": [...]} or
+          {"new_status": ..., "all_pending": true, "team_supervisor_id": ..., "requested_before": "2025-07-01"}
+    The approver is always the logged-in user.
+    """
+    data = request.json or {}
+    if not data.get("new_status"):
+        return jsonify({"error": "new_status is required"}), 400
+
+    # Imported here so routes that never touch leave data stay light.
+    from app.tools.leave_tools import bulk_update_status
+    try:
+        result = bulk_update_status(
+            approver_id=current_user['user_id'],
+            approver_role=current_user['role'],
+            new_status=data["new_status"],
+            request_ids=data.get("request_ids"),
+            all_pending=bool(data.get("all_pending")),
+            team_supervisor_id=data.get("team_supervisor_id"),
+            requested_before=data.get("requested_before"),
+            rejection_reason=data.get("rejection_reason"),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify(result)
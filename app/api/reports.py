@@ -0,0 +1,131 @@
+# app/api/reports.py
+# HR reports. Every route takes the period as ?month=2025-07, or as
+# ?from=2025-07-01&to=2025-08-01 (to is exclusive), and an optional
+# ?group_by=leave_type,department.
+import io
+import csv
+import json
+import datetime
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from app.utils.decorators import token_required, role_required
+
+reports_bp = Blueprint('reports_bp', __name__)
+
+# Rows per chunk written to the client by the exports.
+EXPORT_CHUNK_ROWS = 500
+
+
+def _period(args):
+    """Returns (start, end) from the query string; end is exclusive."""
+    if args.get("month"):
+        start = datetime.datetime.strptime(args["month"], "%Y-%m")
+        end = (start + datetime.timedelta(days=32)).replace(day=1)
+        return start, end
+    if args.get("from") and args.get("to"):
+        start = datetime.datetime.fromisoformat(args["from"])
+        end = datetime.datetime.fromisoformat(args["to"])
+        if end <= start:
+            raise ValueError("'to' must be after 'from'.")
+        return start, end
+    raise ValueError("Give ?month=YYYY-MM, or ?from=YYYY-MM-DD&to=YYYY-MM-DD.")
+
+
+def _group_by(args, default):
+    if "group_by" not in args:
+        return default
+    return tuple(field for field in args["group_by"].split(",") if field)
+
+
+def _report(build, default_group_by):
+    try:
+        start, end = _period(request.args)
+        rows = build(start, end, _group_by(request.args, default_group_by))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"from": start.date().isoformat(), "to": end.date().isoformat(), "rows": rows})
+
+
+def _json_default(value):
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+@reports_bp.route('/leave-days', methods=['GET'])
+@token_required
+@role_required('hr')
+def leave_days(current_user):
+    """Requests and leave days, by leave type and status unless group_by says otherwise."""
+    from app.models.leave_report import LeaveReport
+    return _report(LeaveReport.leave_days, ("leave_type", "status"))
+
+
+@reports_bp.route('/turnaround', methods=['GET'])
+@token_required
+@role_required('hr')
+def turnaround(current_user):
+    """Supervisor and HR approval times in hours."""
+    from app.models.leave_report import LeaveReport
+    return _report(LeaveReport.turnaround, ())
+
+
+@reports_bp.route('/rejections', methods=['GET'])
+@token_required
+@role_required('hr')
+def rejections(current_user):
+    """Rejection rates per approval stage, by leave type unless group_by says otherwise."""
+    from app.models.leave_report import LeaveReport
+    return _report(LeaveReport.rejection_rates, ("leave_type",))
+
+
+@reports_bp.route('/export', methods=['GET'])
+@token_required
+@role_required('hr')
+def export(current_user):
+    """Streams the period's leave requests as CSV (default) or JSONL (?format=jsonl)."""
+    from app.models.leave_report import LeaveReport, EXPORT_FIELDS
+    export_format = request.args.get("format", "csv")
+    if export_format not in ("csv", "jsonl"):
+        return jsonify({"error": "format must be 'csv' or 'jsonl'."}), 400
+    try:
+        start, end = _period(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    rows = LeaveReport.export_rows(start, end)
+
+    def generate_csv():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_FIELDS)
+        count = 0
+        for row in rows:
+            writer.writerow([_csv_value(row.get(field)) for field in EXPORT_FIELDS])
+            count += 1
+            if count % EXPORT_CHUNK_ROWS == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    def generate_jsonl():
+        chunk = []
+        for row in rows:
+            chunk.append(json.dumps(row, ensure_ascii=False, default=_json_default))
+            if len(chunk) == EXPORT_CHUNK_ROWS:
+                yield "\n".join(chunk) + "\n"
+                chunk = []
+        if chunk:
+            yield "\n".join(chunk) + "\n"
+
+    filename = f"leave_requests_{start:%Y-%m-%d}_{end:%Y-%m-%d}.{export_format}"
+    # No Content-Length, so the response is sent chunked as it is generated.
+    return Response(
+        stream_with_context(generate_csv() if export_format == "csv" else generate_jsonl()),
+        mimetype="text/csv" if export_format == "csv" else "application/x-ndjson",
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
@@ -1,5 +1,6 @@
 # app/auth/routes.py
 import os
+import uuid
 import jwt
 import datetime
 from flask import Blueprint, request, jsonify
@@ -25,6 +26,8 @@ def login():
         'user_id': user_data['employee_id'],
         'username': user_data['username'],
         'role': user_data['role'],
+        # No supervisor_id: it can change while the token is valid, so chat
+        # reads it from the (cached) user profile instead.
         'exp': datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=24)
     }, os.getenv("SECRET_KEY", "default_secret_key_for_dev"), algorithm="HS256")
 
@@ -32,5 +35,8 @@ def login():
         "message": "Login successful",
         "token": token,
         "role": user_data['role'],
-        "username": user_data['username']
+        "username": user_data['username'],
+        # A fresh conversation thread for this session; the chat history is
+        # stored server-side under this ID.
+        "thread_id": uuid.uuid4().hex
     })
\ No newline at end of file
@@ -0,0 +1,44 @@
+# app/models/data_version.py
+# Version stamps for slices of leave_requests, used to invalidate cached
+# answers (app/agents/response_cache.py). Every write to a leave request
+# bumps the stamps of the employee, of their supervisor's team and the
+# global one; a cached answer is only valid while the stamps it was computed
+# under are unchanged. Stamps live in MongoDB, so all workers see the same.
+from pymongo import UpdateOne
+from app.utils.db import get_db
+
+GLOBAL_SCOPE = "all"
+
+
+def scopes_for(request) -> list:
+    """The stamps a write to this leave request must bump."""
+    scopes = [GLOBAL_SCOPE]
+    if request.get("employee_id"):
+        scopes.append(f"employee:{request['employee_id']}")
+    if request.get("supervisor_id"):
+        scopes.append(f"supervisor:{request['supervisor_id']}")
+    return scopes
+
+
+class DataVersion:
+    @staticmethod
+    def collection():
+        return get_db()["data_versions"]
+
+    @staticmethod
+    def bump(requests):
+        """Bumps the stamps of the given (changed) leave requests in one bulk_write."""
+        scopes = set()
+        for request in requests:
+            scopes.update(scopes_for(request))
+        if scopes:
+            DataVersion.collection().bulk_write(
+                [UpdateOne({"_id": scope}, {"$inc": {"v": 1}}, upsert=True) for scope in sorted(scopes)],
+                ordered=False
+            )
+
+    @staticmethod
+    def get(scopes) -> tuple:
+        """The current stamps of the scopes, in order (0 if never bumped)."""
+        found = {doc["_id"]: doc["v"] for doc in DataVersion.collection().find({"_id": {"$in": list(scopes)}})}
+        return tuple(found.get(scope, 0) for scope in scopes)
@@ -0,0 +1,163 @@
+# app/models/leave_balance.py
+# Materialized leave balances: one document per (employee_id, leave_type,
+# year) holding the days used, kept up to date with $inc whenever a request
+# reaches (or leaves) 'approved_by_hr'. Reading a balance is a single indexed
+# lookup instead of a scan of the employee's request history.
+#
+# The request update and the balance $inc are separate writes, so a crash in
+# between can leave a balance off; recompute everything with
+#
+#   python -m app.models.leave_balance            # report drift only
+#   python -m app.models.leave_balance --fix      # and correct it
+import os
+import json
+import datetime
+from pymongo import UpdateOne, DeleteOne
+from app.utils.db import get_db
+
+# Days per year for each leave type. Override with LEAVE_ENTITLEMENTS, e.g.
+# '{"Annual": 14, "Sick": 7, "Casual": 7}'.
+ENTITLEMENTS = json.loads(os.getenv("LEAVE_ENTITLEMENTS", '{"Annual": 14, "Sick": 7, "Casual": 7}'))
+
+APPROVED_STATUS = "approved_by_hr"
+
+# A request needs all of these to count towards a balance.
+LEDGER_FIELDS = ("employee_id", "leave_type", "start_date", "end_date")
+
+# Days are counted inclusively and charged to the year the leave starts in.
+# Both counts below compare calendar dates, ignoring any time of day, so the
+# ledger and reconcile() always agree.
+EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def _day_number(field):
+    # Whole (UTC) days since the epoch.
+    return {"$floor": {"$divide": [{"$subtract": [field, EPOCH]}, 86400000]}}
+
+
+DAYS_EXPR = {"$add": [{"$subtract": [_day_number("$end_date"), _day_number("$start_date")]}, 1]}
+
+
+def leave_days(request) -> int:
+    return (request["end_date"].date() - request["start_date"].date()).days + 1
+
+
+def _key(request):
+    return (request["employee_id"], request["leave_type"], request["start_date"].year)
+
+
+def _filter(employee_id, leave_type, year):
+    return {"employee_id": employee_id, "leave_type": leave_type, "year": year}
+
+
+class LeaveBalance:
+    @staticmethod
+    def collection():
+        return get_db()["leave_balances"]
+
+    @staticmethod
+    def apply(requests, sign: int):
+        """Adds (sign=1) or takes back (sign=-1) the days of approved requests.
+
+        The requests need employee_id, leave_type, start_date and end_date.
+        All changes go out in one bulk_write, one $inc per balance document.
+        """
+        deltas = {}
+        for request in requests:
+            if not all(request.get(field) for field in LEDGER_FIELDS):
+                # Not created through create_leave_request; nothing to count.
+                continue
+            key = _key(request)
+            deltas[key] = deltas.get(key, 0) + sign * leave_days(request)
+        operations = [
+            UpdateOne(_filter(*key), {"$inc": {"used_days": days}}, upsert=True)
+            for key, days in deltas.items() if days
+        ]
+        if operations:
+            LeaveBalance.collection().bulk_write(operations, ordered=False)
+
+    @staticmethod
+    def on_status_change(requests, old_status, new_status):
+        """Keeps the ledger in step with requests that moved from old_status to new_status."""
+        if new_status == APPROVED_STATUS and old_status != APPROVED_STATUS:
+            LeaveBalance.apply(requests, 1)
+        elif old_status == APPROVED_STATUS and new_status != APPROVED_STATUS:
+            LeaveBalance.apply(requests, -1)
+
+    @staticmethod
+    def get(employee_id, year=None) -> dict:
+        """Entitlement, used and remaining days per leave type for one year."""
+        year = year or datetime.date.today().year
+        used = {
+            doc["leave_type"]: doc.get("used_days", 0)
+            for doc in LeaveBalance.collection().find({"employee_id": employee_id, "year": year})
+        }
+        balances = []
+        for leave_type in list(ENTITLEMENTS) + sorted(set(used) - set(ENTITLEMENTS)):
+            entitlement = ENTITLEMENTS.get(leave_type)
+            days = used.get(leave_type, 0)
+            balances.append({
+                "leave_type": leave_type,
+                "entitlement": entitlement,
+                "used": days,
+                "remaining": entitlement - days if entitlement is not None else None,
+            })
+        return {"employee_id": employee_id, "year": year, "balances": balances}
+
+    @staticmethod
+    def reconcile(fix: bool = False) -> dict:
+        """Recomputes every balance from leave_requests with one aggregation.
+
+        Returns the balances that differ from the ledger; with fix=True they
+        are corrected (and stale ones removed) in one bulk_write.
+        """
+        db = get_db()
+        pipeline = [
+            {"$match": {
+                "status": APPROVED_STATUS,
+                "leave_type": {"$exists": True},
+                "start_date": {"$type": "date"},
+                "end_date": {"$type": "date"},
+            }},
+            {"$group": {
+                "_id": {
+                    "employee_id": "$employee_id",
+                    "leave_type": "$leave_type",
+                    "year": {"$year": "$start_date"},
+                },
+                "used_days": {"$sum": DAYS_EXPR},
+            }},
+        ]
+        expected = {
+            (row["_id"]["employee_id"], row["_id"]["leave_type"], row["_id"]["year"]): int(row["used_days"])
+            for row in db["leave_requests"].aggregate(pipeline)
+        }
+        current = {
+            (doc["employee_id"], doc["leave_type"], doc["year"]): doc.get("used_days", 0)
+            for doc in LeaveBalance.collection().find({}, {"_id": 0})
+        }
+
+        drift = []
+        operations = []
+        for key in expected.keys() | current.keys():
+            want, have = expected.get(key, 0), current.get(key)
+            if have == want or (have is None and want == 0):
+                continue
+            drift.append({"employee_id": key[0], "leave_type": key[1], "year": key[2],
+                          "ledger": have, "expected": want})
+            if key in expected:
+                operations.append(UpdateOne(_filter(*key), {"$set": {"used_days": want}}, upsert=True))
+            else:
+                operations.append(DeleteOne(_filter(*key)))
+        if fix and operations:
+            LeaveBalance.collection().bulk_write(operations, ordered=False)
+        return {"checked": len(expected.keys() | current.keys()), "drift": drift, "fixed": fix and bool(operations)}
+
+
+if __name__ == "__main__":
+    import sys
+    report = LeaveBalance.reconcile(fix="--fix" in sys.argv)
+    for row in report["drift"]:
+        print(f"⚠️  {row['employee_id']} {row['leave_type']} {row['year']}: ledger={row['ledger']} expected={row['expected']}")
+    print(f"✅ {report['checked']} balance(s) checked, {len(report['drift'])} off"
+          + (", fixed." if report["fixed"] else "."))
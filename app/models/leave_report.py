@@ -0,0 +1,145 @@
+# app/models/leave_report.py
+# HR reports, computed inside MongoDB with aggregation pipelines so only the
+# (small) results travel to Python.
+#
+# Leave-day reports and exports cover leave that *starts* in the period;
+# workflow reports (turnaround, rejection rates) cover requests *made* in the
+# period. Periods are [start, end), end exclusive.
+from app.utils.db import get_leave_requests_collection
+from app.models.leave_balance import DAYS_EXPR
+
+# Fields a report may be grouped by. 'department' comes from the user
+# document of the employee.
+GROUP_FIELDS = {"leave_type", "status", "department", "supervisor_id", "employee_id"}
+
+EXPORT_FIELDS = [
+    "_id", "employee_id", "department", "supervisor_id", "leave_type", "start_date", "end_date",
+    "days", "status", "reason", "rejection_reason", "requested_at", "supervisor_action_at", "hr_action_at",
+]
+
+_MS_PER_HOUR = 3600000
+
+_DEPARTMENT_STAGES = [
+    {"$lookup": {"from": "users", "localField": "employee_id", "foreignField": "employee_id", "as": "employee"}},
+    {"$addFields": {"department": {"$ifNull": [{"$arrayElemAt": ["$employee.department", 0]}, "Unassigned"]}}},
+    {"$project": {"employee": 0}},
+]
+
+
+def _check_group_by(group_by):
+    unknown = set(group_by) - GROUP_FIELDS
+    if unknown:
+        raise ValueError(f"Cannot group by: {', '.join(sorted(unknown))}. Use: {', '.join(sorted(GROUP_FIELDS))}.")
+
+
+def _group_stages(match, group_by, accumulators):
+    """$match, the department $lookup only when needed, then $group."""
+    _check_group_by(group_by)
+    stages = [{"$match": match}]
+    if "department" in group_by:
+        stages += _DEPARTMENT_STAGES
+    stages.append({"$group": {"_id": {field: f"${field}" for field in group_by}, **accumulators}})
+    stages.append({"$sort": {"_id": 1}})
+    return stages
+
+
+def _flatten(rows):
+    """Moves the group key fields to the top level of each row."""
+    for row in rows:
+        key = row.pop("_id") or {}
+        yield {**key, **row}
+
+
+def _hours(later, earlier):
+    return {"$divide": [{"$subtract": [f"${later}", f"${earlier}"]}, _MS_PER_HOUR]}
+
+
+def _has(field):
+    # $ifNull turns a missing field into null, so this is false for both.
+    return {"$gt": [{"$ifNull": [f"${field}", None]}, None]}
+
+
+def _lacks(field):
+    return {"$eq": [{"$ifNull": [f"${field}", None]}, None]}
+
+
+class LeaveReport:
+    @staticmethod
+    def leave_days(start, end, group_by=("leave_type", "status")) -> list:
+        """Requests and leave days per group, for leave starting in [start, end)."""
+        pipeline = _group_stages(
+            {"start_date": {"$gte": start, "$lt": end}},
+            group_by,
+            {"requests": {"$sum": 1}, "days": {"$sum": DAYS_EXPR}},
+        )
+        return list(_flatten(get_leave_requests_collection().aggregate(pipeline)))
+
+    @staticmethod
+    def turnaround(start, end, group_by=()) -> list:
+        """Average and longest approval times in hours, per stage, for requests made in [start, end)."""
+        pipeline = _group_stages(
+            {"requested_at": {"$gte": start, "$lt": end}},
+            group_by,
+            {
+                "requests": {"$sum": 1},
+                "supervisor_decided": {"$sum": {"$cond": [_has("supervisor_action_at"), 1, 0]}},
+                # $avg and $max skip the nulls left by undecided requests.
+                "supervisor_avg_hours": {"$avg": _hours("supervisor_action_at", "requested_at")},
+                "supervisor_max_hours": {"$max": _hours("supervisor_action_at", "requested_at")},
+                "hr_decided": {"$sum": {"$cond": [_has("hr_action_at"), 1, 0]}},
+                "hr_avg_hours": {"$avg": _hours("hr_action_at", "supervisor_action_at")},
+                "hr_max_hours": {"$max": _hours("hr_action_at", "supervisor_action_at")},
+                "total_avg_hours": {"$avg": _hours("hr_action_at", "requested_at")},
+            },
+        )
+        return list(_flatten(get_leave_requests_collection().aggregate(pipeline)))
+
+    @staticmethod
+    def rejection_rates(start, end, group_by=("leave_type",)) -> list:
+        """Decisions and rejections per approval stage, for requests made in [start, end)."""
+        rejected = {"$eq": ["$status", "rejected"]}
+        pipeline = _group_stages(
+            {"requested_at": {"$gte": start, "$lt": end}},
+            group_by,
+            {
+                "supervisor_decided": {"$sum": {"$cond": [_has("supervisor_action_at"), 1, 0]}},
+                "supervisor_rejected": {"$sum": {"$cond": [
+                    {"$and": [rejected, _has("supervisor_action_at"), _lacks("hr_action_at")]}, 1, 0
+                ]}},
+                "hr_decided": {"$sum": {"$cond": [_has("hr_action_at"), 1, 0]}},
+                "hr_rejected": {"$sum": {"$cond": [{"$and": [rejected, _has("hr_action_at")]}, 1, 0]}},
+            },
+        )
+
+        def rate(rejected_field, decided_field):
+            return {"$cond": [
+                {"$gt": [f"${decided_field}", 0]},
+                {"$divide": [f"${rejected_field}", f"${decided_field}"]},
+                None,
+            ]}
+
+        pipeline.insert(-1, {"$addFields": {
+            "supervisor_rejection_rate": rate("supervisor_rejected", "supervisor_decided"),
+            "hr_rejection_rate": rate("hr_rejected", "hr_decided"),
+        }})
+        return list(_flatten(get_leave_requests_collection().aggregate(pipeline)))
+
+    @staticmethod
+    def export_rows(start, end, batch_size: int = 1000):
+        """Yields every request whose leave starts in [start, end), with its
+        department and day count, in start_date order.
+
+        Reads through a server-side cursor, so memory use does not grow with
+        the size of the export.
+        """
+        pipeline = [
+            {"$match": {"start_date": {"$gte": start, "$lt": end}}},
+            {"$sort": {"start_date": 1, "_id": 1}},
+            *_DEPARTMENT_STAGES,
+            {"$addFields": {"days": DAYS_EXPR}},
+            {"$project": {field: 1 for field in EXPORT_FIELDS}},
+        ]
+        cursor = get_leave_requests_collection().aggregate(pipeline, batchSize=batch_size, allowDiskUse=True)
+        for row in cursor:
+            row["_id"] = str(row["_id"])
+            yield row
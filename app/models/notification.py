@@ -0,0 +1,129 @@
+# app/models/notification.py
+# The notification outbox. A status change never sends anything itself: the
+# tool that changes a leave request pushes an event onto that request's
+# `outbox` array in the same write (insert_one / find_one_and_update /
+# update_many), so the event exists exactly when the change does and the chat
+# request never waits on delivery. A worker (app/utils/notification_worker.py)
+# claims requests with due events, delivers them and pulls them off again.
+#
+# Outbox fields on a leave request:
+#   outbox               pending events, oldest first
+#   outbox_due_at        when the worker may next try (absent when empty)
+#   outbox_attempts      failed deliveries in a row, for the backoff
+#   outbox_claim(_until) the worker batch holding the request, and its lease
+#   outbox_dead          events given up on after NOTIFY_MAX_ATTEMPTS
+import datetime
+from bson import ObjectId
+from pymongo import UpdateOne
+from app.utils.db import get_leave_requests_collection
+
+# Fields the worker needs to word and address a notification.
+NOTIFY_FIELDS = {
+    "employee_id": 1, "supervisor_id": 1, "leave_type": 1, "start_date": 1, "end_date": 1,
+    "status": 1, "rejection_reason": 1, "outbox": 1, "outbox_attempts": 1,
+}
+
+
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def outbox_event(event: str, status: str, actor_id=None) -> dict:
+    """One outbox entry: `event` is 'created' or 'status_changed'.
+
+    The _id is unique within a request's outbox, not across requests: an
+    update_many pushes the same entry into every request it matches.
+    """
+    return {"_id": ObjectId(), "event": event, "status": status, "by": actor_id, "at": _now()}
+
+
+def outbox_fields(event: str, status: str, actor_id=None) -> dict:
+    """Outbox fields for a new request document (insert_one)."""
+    return {"outbox": [outbox_event(event, status, actor_id)], "outbox_due_at": _now()}
+
+
+def add_to_update(update_doc: dict, event: str, status: str, actor_id=None) -> dict:
+    """Adds an outbox event to an update document, in place.
+
+    $min makes the request due now without pushing back an earlier due time.
+    """
+    update_doc.setdefault("$push", {})["outbox"] = outbox_event(event, status, actor_id)
+    update_doc.setdefault("$min", {})["outbox_due_at"] = _now()
+    return update_doc
+
+
+class NotificationOutbox:
+    @staticmethod
+    def claim(batch_size: int, lease_seconds: float, token: str) -> list:
+        """Claims up to batch_size requests with due events for one worker batch.
+
+        The claim is a conditional update_many, so two workers never claim the
+        same request; a worker that dies loses its claim when the lease ends.
+        Returns the claimed requests with NOTIFY_FIELDS.
+        """
+        collection = get_leave_requests_collection()
+        now = _now()
+        due = {
+            "outbox_due_at": {"$lte": now},
+            "$or": [{"outbox_claim_until": None}, {"outbox_claim_until": {"$lte": now}}],
+        }
+        ids = [doc["_id"] for doc in collection.find(due, {"_id": 1}).sort("outbox_due_at", 1).limit(batch_size)]
+        if not ids:
+            return []
+        collection.update_many(
+            {**due, "_id": {"$in": ids}},
+            {"$set": {"outbox_claim": token,
+                      "outbox_claim_until": now + datetime.timedelta(seconds=lease_seconds)}}
+        )
+        # By _id: outbox_claim is not indexed. The token drops any request
+        # another worker claimed between the find and the update.
+        return list(collection.find({"_id": {"$in": ids}, "outbox_claim": token}, NOTIFY_FIELDS))
+
+    @staticmethod
+    def complete(token: str, claimed: list, delivered: dict, failed: dict, backoff, max_attempts: int) -> int:
+        """Records the outcome of a worker batch in one bulk_write.
+
+        delivered maps a request _id to the _ids of its delivered events,
+        failed to the events that were not delivered. Delivered events are
+        pulled. A request with failures is retried after backoff(attempts);
+        once it has failed max_attempts times in a row its failed events move
+        to outbox_dead.
+        Returns the number of events dead-lettered.
+        """
+        collection = get_leave_requests_collection()
+        attempts = {doc["_id"]: doc.get("outbox_attempts", 0) for doc in claimed}
+        operations = []
+        dead = 0
+        now = _now()
+        for request_id in set(delivered) | set(failed):
+            update = {"$unset": {"outbox_claim": "", "outbox_claim_until": ""}}
+            done = list(delivered.get(request_id, []))
+            failed_events = failed.get(request_id, [])
+            if failed_events:
+                tries = attempts.get(request_id, 0) + 1
+                if tries >= max_attempts:
+                    done += [event["_id"] for event in failed_events]
+                    update["$push"] = {"outbox_dead": {"$each": [{**event, "failed_at": now} for event in failed_events]}}
+                    update["$set"] = {"outbox_attempts": 0}
+                    dead += len(failed_events)
+                else:
+                    update["$set"] = {"outbox_attempts": tries,
+                                      "outbox_due_at": now + datetime.timedelta(seconds=backoff(tries))}
+            else:
+                update["$set"] = {"outbox_attempts": 0}
+            if done:
+                update["$pull"] = {"outbox": {"_id": {"$in": done}}}
+            operations.append(UpdateOne({"_id": request_id, "outbox_claim": token}, update))
+        if operations:
+            collection.bulk_write(operations, ordered=False)
+            # Only requests whose outbox is now empty stop being due; an event
+            # pushed while the batch ran keeps its request due.
+            collection.update_many(
+                {"_id": {"$in": list(set(delivered) | set(failed))}, "outbox": {"$size": 0}},
+                {"$unset": {"outbox_due_at": ""}}
+            )
+        return dead
+
+    @staticmethod
+    def pending_count() -> int:
+        return get_leave_requests_collection().count_documents({"outbox_due_at": {"$exists": True}})
@@ -1,12 +1,54 @@
 # app/models/user.py
+import os
 from werkzeug.security import check_password_hash
-from app.utils.db import db
+from app.utils.db import get_db
+from app.utils.cache import TTLCache
+from app.utils.metrics import register_cache
+
+# Profiles by employee_id, without the password hash. Entries expire after
+# USER_CACHE_TTL seconds so changes made by other processes are picked up;
+# changes made through User.update (or in-process imports) are visible
+# immediately. Login tokens carry no profile fields for the same reason.
+_profile_cache = TTLCache(
+    maxsize=int(os.getenv("USER_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("USER_CACHE_TTL", "300"))
+)
+register_cache("user_profile", _profile_cache)
 
 class User:
     @staticmethod
     def find_by_username(username):
-        return db.users.find_one({"username": username})
+        return get_db().users.find_one({"username": username})
 
     @staticmethod
     def check_password(user_password_hash, password):
-        return check_password_hash(user_password_hash, password)
\ No newline at end of file
+        return check_password_hash(user_password_hash, password)
+
+    @staticmethod
+    def get_profile(employee_id):
+        """Returns the user's profile (no password), from the cache when possible."""
+        profile = _profile_cache.get(employee_id)
+        if profile is None:
+            profile = get_db().users.find_one({"employee_id": employee_id}, {"password": 0})
+            if profile is not None:
+                _profile_cache.set(employee_id, profile)
+        return profile
+
+    @staticmethod
+    def update(employee_id, changes):
+        """Updates a user document and drops its cached profile."""
+        result = get_db().users.update_one({"employee_id": employee_id}, {"$set": changes})
+        User.invalidate(employee_id)
+        return result
+
+    @staticmethod
+    def invalidate(employee_id=None):
+        """Drops one cached profile, or all of them."""
+        if employee_id is None:
+            _profile_cache.clear()
+        else:
+            _profile_cache.invalidate(employee_id)
+
+    @staticmethod
+    def cache_stats():
+        return _profile_cache.stats()
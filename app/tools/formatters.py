@@ -0,0 +1,140 @@
+# app/tools/formatters.py
+# Turns tool results into the compact text the LLM sees in a ToolMessage.
+#
+# List results are rendered as a small table with only the columns the
+# agent needs and ISO dates, instead of the Python repr of every Mongo
+# document. Every result is held to a row and token budget, so the prompt
+# size of the next agent step stays bounded however many requests exist.
+import os
+import datetime
+
+MAX_ROWS = int(os.getenv("TOOL_RESULT_MAX_ROWS", "20"))
+MAX_TOKENS = int(os.getenv("TOOL_RESULT_MAX_TOKENS", "1500"))
+
+# (column header, document field) for leave-request rows.
+REQUEST_COLUMNS = [
+    ("id", "_id"),
+    ("employee", "employee_id"),
+    ("type", "leave_type"),
+    ("start", "start_date"),
+    ("end", "end_date"),
+    ("status", "status"),
+    ("reason", "reason"),
+    ("rejection_reason", "rejection_reason"),
+    ("requested", "requested_at"),
+]
+
+# List tools that take an `after` cursor. Others (the team calendar) can only
+# be narrowed down, so the hint must not offer a cursor they would ignore.
+PAGED_TOOLS = {"get_my_leave_requests", "get_pending_supervisor_requests", "get_pending_hr_requests"}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 bytes of UTF-8 per token), no tokenizer needed."""
+    return max(1, len(text.encode("utf-8")) // 4)
+
+
+def _cell(value) -> str:
+    if value is None:
+        return "-"
+    if isinstance(value, datetime.datetime):
+        if value.time() == datetime.time(0, 0):
+            return value.date().isoformat()
+        return value.isoformat(timespec="minutes")
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    # Keep each row on one line and the separator unambiguous.
+    return str(value).replace("\n", " ").replace("|", "/")
+
+
+def _format_requests(tool_name: str, result: dict, max_rows: int, max_tokens: int):
+    requests = result.get("requests", [])
+    next_cursor = result.get("next_cursor")
+    if not requests:
+        return "No leave requests found.", {"rows_shown": 0, "rows_total": 0}
+
+    # Drop columns that are empty for every row (e.g. rejection_reason), and
+    # the employee column when the employee is asking about themselves.
+    columns = [(h, f) for h, f in REQUEST_COLUMNS if any(req.get(f) is not None for req in requests)]
+    if tool_name == "get_my_leave_requests":
+        columns = [(h, f) for h, f in columns if f != "employee_id"]
+    header = " | ".join(h for h, _ in columns)
+    lines = [header]
+    used = estimate_tokens(header)
+    shown = 0
+    for req in requests[:max_rows]:
+        line = " | ".join(_cell(req.get(f)) for _, f in columns)
+        cost = estimate_tokens(line)
+        if shown and used + cost > max_tokens:
+            break
+        lines.append(line)
+        used += cost
+        shown += 1
+
+    hidden = len(requests) - shown
+    if hidden and tool_name not in PAGED_TOOLS:
+        lines.append(f"... {hidden}{'+' if result.get('truncated') else ''} more not shown; ask for a shorter period to see them.")
+    elif hidden:
+        # Page on from the last row shown, not the end of the fetched page.
+        from app.tools.leave_tools import encode_cursor
+        cursor = encode_cursor(requests[shown - 1])
+        lines.append(f"... {hidden}{'+' if next_cursor else ''} more not shown; call again with after='{cursor}' to see them.")
+    elif next_cursor:
+        lines.append(f"... more requests exist; call again with after='{next_cursor}' to see them.")
+    elif result.get("truncated"):
+        lines.append("... more leave exists in this period; ask for a shorter period to see it.")
+    return "\n".join(lines), {"rows_shown": shown, "rows_total": len(requests)}
+
+
+def _format_bulk_results(result: dict, max_rows: int, max_tokens: int):
+    results = result.get("results", {})
+    lines = [f"{result.get('updated_count', 0)} request(s) updated to {result.get('new_status')}."]
+    used = estimate_tokens(lines[0])
+    # Failures first: they are what the user needs to hear about.
+    items = sorted(results.items(), key=lambda item: item[1] == "updated")
+    shown = 0
+    for request_id, outcome in items[:max_rows]:
+        line = f"{request_id}: {outcome}"
+        if used + estimate_tokens(line) > max_tokens:
+            break
+        lines.append(line)
+        used += estimate_tokens(line)
+        shown += 1
+    if len(items) > shown:
+        lines.append(f"... {len(items) - shown} more result(s) not shown.")
+    return "\n".join(lines), {"rows_shown": shown, "rows_total": len(items)}
+
+
+def _format_balances(result: dict):
+    balances = result.get("balances", [])
+    lines = [f"Leave balance of {result.get('employee_id')} for {result.get('year')}:",
+             "type | entitlement | used | remaining"]
+    for balance in balances:
+        lines.append(" | ".join(_cell(balance.get(f)) for f in ("leave_type", "entitlement", "used", "remaining")))
+    return "\n".join(lines), {"rows_shown": len(balances), "rows_total": len(balances)}
+
+
+def format_tool_result(tool_name: str, output, max_rows: int = None, max_tokens: int = None):
+    """Returns (content, metadata) for a tool's output.
+
+    metadata carries the token accounting: 'estimated_tokens', plus
+    'rows_shown'/'rows_total' for list results.
+    """
+    max_rows = max_rows or MAX_ROWS
+    max_tokens = max_tokens or MAX_TOKENS
+
+    if isinstance(output, dict) and "requests" in output:
+        content, metadata = _format_requests(tool_name, output, max_rows, max_tokens)
+    elif isinstance(output, dict) and "results" in output:
+        content, metadata = _format_bulk_results(output, max_rows, max_tokens)
+    elif isinstance(output, dict) and "balances" in output:
+        content, metadata = _format_balances(output)
+    else:
+        content, metadata = str(output), {}
+        if estimate_tokens(content) > max_tokens:
+            # Roughly max_tokens worth of characters.
+            content = content[:max_tokens * 4].rsplit(" ", 1)[0] + " ... [truncated]"
+            metadata["truncated"] = True
+
+    metadata["estimated_tokens"] = estimate_tokens(content)
+    return content, metadata
@@ -1,5 +1,14 @@
+import os
+import uuid
+import logging
+import base64
+import asyncio
 import datetime
+import contextvars
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
 from bson import ObjectId
+from pymongo import ReturnDocument
 from langchain_core.tools import tool
 from pydantic.v1 import BaseModel, Field
 from typing import Optional, List
@@ -9,9 +18,18 @@ from typing import Optional, List
 from dateutil.parser import parse
 
 # Database collection එක import කිරීම
-from app.utils.db import leave_requests_collection, db
+from app.utils.db import get_client, get_leave_requests_collection
+from app.models.leave_balance import LeaveBalance
+from app.models.data_version import DataVersion
+from app.models.notification import outbox_fields, add_to_update
 
-# --- Input Schemas (කිසිදු වෙනසක් නැත) ---
+log = logging.getLogger(__name__)
+
+# Opt-in database diagnostics: a server ping before every insert and a dump
+# of the inserted document. Off by default, it costs a round-trip per insert.
+DB_DIAGNOSTICS = os.getenv("DB_DIAGNOSTICS", "0") == "1"
+
+# --- Input Schemas ---
 class CreateLeaveRequestInput(BaseModel):
     employee_id: str = Field(description="The unique ID of the employee making the request.")
     supervisor_id: str = Field(description="The unique ID of the employee's supervisor.")
@@ -20,15 +38,30 @@ class CreateLeaveRequestInput(BaseModel):
     end_date: str = Field(description="End date of leave. Should be a clear date like '2025-07-16'.")
     reason: Optional[str] = Field(description="Reason for leave.")
 
-class GetMyLeaveRequestsInput(BaseModel):
+class PageInput(BaseModel):
+    limit: int = Field(default=20, description="Maximum number of requests to return (1-100).")
+    after: Optional[str] = Field(default=None, description="The 'next_cursor' value from a previous call, to fetch the next page.")
+
+class GetMyLeaveRequestsInput(PageInput):
     employee_id: str = Field(description="The unique ID of the employee.")
 
-class GetPendingSupervisorRequestsInput(BaseModel):
+class GetPendingSupervisorRequestsInput(PageInput):
     supervisor_id: str = Field(description="The unique ID of the supervisor.")
     
-class GetPendingHRRequestsInput(BaseModel):
+class GetPendingHRRequestsInput(PageInput):
     pass
 
+class GetTeamLeaveCalendarInput(BaseModel):
+    supervisor_id: str = Field(description="The supervisor ID of the team.")
+    start_date: str = Field(description="First day of the period, like '2025-07-14'.")
+    end_date: str = Field(description="Last day of the period, like '2025-07-18'.")
+    include_pending: bool = Field(default=True, description="Also include leave that is not yet fully approved.")
+    limit: int = Field(default=50, description="Maximum number of leave requests to return (1-100).")
+
+class GetMyLeaveBalanceInput(BaseModel):
+    employee_id: str = Field(description="The unique ID of the employee.")
+    year: Optional[int] = Field(default=None, description="The year, like 2025. Defaults to the current year.")
+
 class ApproveRejectRequestInput(BaseModel):
     request_id: str = Field(description="The unique ID of the leave request (ObjectId).")
     new_status: str = Field(description="The new status: 'approved_by_supervisor', 'approved_by_hr', or 'rejected'.")
@@ -36,6 +69,73 @@ class ApproveRejectRequestInput(BaseModel):
     approver_id: str = Field(description="The employee ID of the person approving/rejecting.")
     approver_role: str = Field(description="The role of the person approving/rejecting ('supervisor' or 'hr').")
 
+class BulkApproveRejectInput(BaseModel):
+    request_ids: Optional[List[str]] = Field(default=None, description="The ObjectIds of the leave requests to update. Leave empty when using all_pending.")
+    all_pending: bool = Field(default=False, description="Set to true to update ALL requests waiting for this approver instead of a list of IDs.")
+    team_supervisor_id: Optional[str] = Field(default=None, description="With all_pending (HR only): limit to the team of this supervisor ID.")
+    requested_before: Optional[str] = Field(default=None, description="With all_pending: only requests made before this date, like '2025-07-01'.")
+    new_status: str = Field(description="The new status: 'approved_by_supervisor', 'approved_by_hr', or 'rejected'.")
+    rejection_reason: Optional[str] = Field(default=None, description="Reason for rejection, if applicable.")
+    approver_id: str = Field(description="The employee ID of the person approving/rejecting.")
+    approver_role: str = Field(description="The role of the person approving/rejecting ('supervisor' or 'hr').")
+
+
+# --- Status transitions ---
+# The status a request must be in for each approver role, and the statuses
+# that role may move it to.
+TRANSITIONS = {
+    "supervisor": ("pending_supervisor_approval", {"approved_by_supervisor", "rejected"}),
+    "hr": ("approved_by_supervisor", {"approved_by_hr", "rejected"}),
+}
+
+
+# --- Team calendar ---
+# A leave overlaps [window_start, window_end] when it starts on or before
+# window_end and ends on or after window_start. Because no leave may be
+# longer than MAX_LEAVE_DAYS, it must also start after
+# window_start - MAX_LEAVE_DAYS, which bounds start_date on both sides so the
+# (supervisor_id, start_date, end_date) index scans only that range.
+MAX_LEAVE_DAYS = int(os.getenv("MAX_LEAVE_DAYS", "90"))
+
+# Leave that is approved, or still on its way to approval.
+ACTIVE_STATUSES = ["pending_supervisor_approval", "approved_by_supervisor", "approved_by_hr"]
+
+def _overlap_query(supervisor_id: str, window_start, window_end, statuses) -> dict:
+    return {
+        "supervisor_id": supervisor_id,
+        "start_date": {
+            "$gte": window_start - datetime.timedelta(days=MAX_LEAVE_DAYS),
+            "$lte": window_end,
+        },
+        "end_date": {"$gte": window_start},
+        "status": {"$in": statuses},
+    }
+
+def find_overlapping(supervisor_id: str, window_start, window_end, statuses=ACTIVE_STATUSES, limit: int = 100) -> list:
+    """Leave in a supervisor's team that overlaps the window, earliest first."""
+    cursor = get_leave_requests_collection().find(
+        _overlap_query(supervisor_id, window_start, window_end, statuses), LIST_PROJECTION
+    )
+    requests = list(cursor.sort([("start_date", 1), ("_id", 1)]).limit(limit))
+    for req in requests:
+        req['_id'] = str(req['_id'])
+    return requests
+
+def _conflict_warnings(employee_id: str, supervisor_id: str, start, end) -> List[str]:
+    overlapping = find_overlapping(supervisor_id, start, end)
+    own = [req for req in overlapping if req["employee_id"] == employee_id]
+    team = [req for req in overlapping if req["employee_id"] != employee_id]
+    warnings = []
+    if own:
+        warnings.append("The employee already has leave in this period: " + ", ".join(
+            f"{req['leave_type']} {req['start_date']:%Y-%m-%d} to {req['end_date']:%Y-%m-%d} ({req['status']}, ID {req['_id']})"
+            for req in own))
+    if team:
+        warnings.append(f"{len(team)} other team member(s) are also on leave in this period: " + ", ".join(
+            f"{req['employee_id']} {req['start_date']:%Y-%m-%d} to {req['end_date']:%Y-%m-%d} ({req['status']})"
+            for req in team))
+    return warnings
+
 
 # --- Tools ---
 
@@ -43,13 +143,17 @@ class ApproveRejectRequestInput(BaseModel):
 def create_leave_request(employee_id: str, supervisor_id: str, leave_type: str, start_date: str, end_date: str, reason: Optional[str] = None) -> str:
     """Creates a new leave request for an employee."""
     try:
-        print("\n--- [DEBUG] Inside create_leave_request tool ---")
-        print(f"[DEBUG] Attempting to parse dates: start='{start_date}', end='{end_date}'")
+        log.debug("Creating leave request", extra={"employee_id": employee_id, "start_date": start_date, "end_date": end_date})
         
         # 'parse' ශ්‍රිතය දැන් නිවැරදිව ක්‍රියා කරයි
         parsed_start_date = parse(start_date)
         parsed_end_date = parse(end_date)
-        print(f"[DEBUG] Dates parsed successfully.")
+
+        if parsed_end_date < parsed_start_date:
+            return "The end date cannot be before the start date."
+        if (parsed_end_date - parsed_start_date).days + 1 > MAX_LEAVE_DAYS:
+            return f"A single leave request cannot be longer than {MAX_LEAVE_DAYS} days. Please split it into several requests."
+        warnings = _conflict_warnings(employee_id, supervisor_id, parsed_start_date, parsed_end_date)
 
         request_data = {
             "employee_id": employee_id,
@@ -59,60 +163,126 @@ def create_leave_request(employee_id: str, supervisor_id: str, leave_type: str,
             "end_date": parsed_end_date,
             "reason": reason,
             "status": "pending_supervisor_approval",
-            "requested_at": datetime.datetime.now(datetime.timezone.utc)
+            "requested_at": datetime.datetime.now(datetime.timezone.utc),
+            # Picked up by the notification worker; nothing is sent from here.
+            **outbox_fields("created", "pending_supervisor_approval", employee_id)
         }
-        print(f"[DEBUG] Data document prepared: {request_data}")
 
-        print("[DEBUG] Pinging database server...")
-        server_info = db.client.server_info()
-        print(f"[DEBUG] Ping successful. Server version: {server_info['version']}")
-        
-        print("[DEBUG] Attempting to insert document into collection...")
-        result = leave_requests_collection.insert_one(request_data)
+        if DB_DIAGNOSTICS:
+            # An extra round-trip per insert, so only when asked for.
+            server_info = get_client().server_info()
+            log.info("Inserting leave request", extra={"server_version": server_info["version"], "document": dict(request_data)})
+
+        result = get_leave_requests_collection().insert_one(request_data)
         
         if result.acknowledged:
-            print(f"✅ [SUCCESS] MongoDB acknowledged the insert. Document ID: {result.inserted_id}")
-            return f"Successfully created the leave request. The request ID is {result.inserted_id}."
+            DataVersion.bump([request_data])
+            log.info("Leave request created", extra={"leave_request_id": str(result.inserted_id), "employee_id": employee_id})
+            message = f"Successfully created the leave request. The request ID is {result.inserted_id}."
+            if warnings:
+                message += " Note: " + " ".join(warnings)
+            return message
         else:
-            print("❌ [FAILURE] MongoDB did NOT acknowledge the insert.")
+            log.error("MongoDB did not acknowledge a leave request insert", extra={"employee_id": employee_id})
             return "There was a problem creating the request. The database did not confirm the entry."
 
     except Exception as e:
-        print(f"❌ [DEBUG] AN EXCEPTION OCCURRED in create_leave_request: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("create_leave_request failed", extra={"employee_id": employee_id})
         return f"An internal error occurred: {str(e)}."
 
-# --- අනෙකුත් tools (කිසිදු වෙනසක් නැත) ---
+# --- Paginated list queries ---
+# The list tools return newest first, ordered by (requested_at, _id) so the
+# order is stable, and page with an opaque cursor instead of skip/offset.
+MAX_PAGE_SIZE = 100
 
-@tool("get_my_leave_requests", args_schema=GetMyLeaveRequestsInput)
-def get_my_leave_requests(employee_id: str) -> list:
-    """Fetches all leave requests for a specific employee."""
-    requests = list(leave_requests_collection.find({"employee_id": employee_id}))
+# Only the fields the agent needs to talk about a request.
+LIST_PROJECTION = {
+    "employee_id": 1,
+    "supervisor_id": 1,
+    "leave_type": 1,
+    "start_date": 1,
+    "end_date": 1,
+    "reason": 1,
+    "status": 1,
+    "requested_at": 1,
+    "rejection_reason": 1,
+}
+
+def encode_cursor(doc) -> str:
+    raw = f"{doc['requested_at'].isoformat()}|{doc['_id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def _decode_cursor(token: str) -> dict:
+    requested_at, _id = base64.urlsafe_b64decode(token.encode()).decode().split("|")
+    requested_at = datetime.datetime.fromisoformat(requested_at)
+    _id = ObjectId(_id)
+    return {"$or": [
+        {"requested_at": {"$lt": requested_at}},
+        {"requested_at": requested_at, "_id": {"$lt": _id}},
+    ]}
+
+def _find_page(query: dict, limit: int, after: Optional[str]) -> dict:
+    """Returns one page of leave requests and the cursor for the next page."""
+    limit = max(1, min(limit or 20, MAX_PAGE_SIZE))
+    if after:
+        try:
+            query = {"$and": [query, _decode_cursor(after)]}
+        except Exception:
+            raise ValueError("Invalid 'after' cursor. Use the next_cursor value returned by the previous call.")
+
+    # Fetch one extra document to know whether another page exists.
+    cursor = get_leave_requests_collection().find(query, LIST_PROJECTION)
+    cursor = cursor.sort([("requested_at", -1), ("_id", -1)]).limit(limit + 1)
+    requests = list(cursor)
+    next_cursor = encode_cursor(requests[limit - 1]) if len(requests) > limit else None
+    requests = requests[:limit]
     for req in requests:
         req['_id'] = str(req['_id'])
-    return requests
+    return {"requests": requests, "next_cursor": next_cursor}
+
+@tool("get_my_leave_requests", args_schema=GetMyLeaveRequestsInput)
+def get_my_leave_requests(employee_id: str, limit: int = 20, after: Optional[str] = None) -> dict:
+    """Fetches a specific employee's leave requests, newest first. Pass 'after' to get the next page."""
+    return _find_page({"employee_id": employee_id}, limit, after)
 
 @tool("get_pending_supervisor_requests", args_schema=GetPendingSupervisorRequestsInput)
-def get_pending_supervisor_requests(supervisor_id: str) -> list:
-    """Fetches leave requests pending approval for a specific supervisor."""
-    requests = list(leave_requests_collection.find({
+def get_pending_supervisor_requests(supervisor_id: str, limit: int = 20, after: Optional[str] = None) -> dict:
+    """Fetches leave requests pending approval for a specific supervisor, newest first. Pass 'after' to get the next page."""
+    return _find_page({
         "supervisor_id": supervisor_id,
         "status": "pending_supervisor_approval"
-    }))
-    for req in requests:
-        req['_id'] = str(req['_id'])
-    return requests
+    }, limit, after)
     
 @tool("get_pending_hr_requests", args_schema=GetPendingHRRequestsInput)
-def get_pending_hr_requests() -> list:
-    """Fetches leave requests pending final approval from HR."""
-    requests = list(leave_requests_collection.find({
+def get_pending_hr_requests(limit: int = 20, after: Optional[str] = None) -> dict:
+    """Fetches leave requests pending final approval from HR, newest first. Pass 'after' to get the next page."""
+    return _find_page({
         "status": "approved_by_supervisor"
-    }))
-    for req in requests:
-        req['_id'] = str(req['_id'])
-    return requests
+    }, limit, after)
+
+@tool("get_team_leave_calendar", args_schema=GetTeamLeaveCalendarInput)
+def get_team_leave_calendar(supervisor_id: str, start_date: str, end_date: str,
+                            include_pending: bool = True, limit: int = 50) -> dict:
+    """Shows who in a supervisor's team is on leave (approved, and optionally pending) between two dates, earliest first. Use it to check for overlaps before approving."""
+    window_start, window_end = parse(start_date), parse(end_date)
+    if window_end < window_start:
+        raise ValueError("end_date cannot be before start_date.")
+    statuses = ACTIVE_STATUSES if include_pending else ["approved_by_hr"]
+    limit = max(1, min(limit or 50, MAX_PAGE_SIZE))
+    # One extra row tells whether the period has more leave than the limit.
+    requests = find_overlapping(supervisor_id, window_start, window_end, statuses, limit + 1)
+    result = {"requests": requests[:limit], "next_cursor": None}
+    if len(requests) > limit:
+        result["truncated"] = True
+    return result
+
+@tool("get_my_leave_balance", args_schema=GetMyLeaveBalanceInput)
+def get_my_leave_balance(employee_id: str, year: Optional[int] = None) -> dict:
+    """Shows an employee's leave balance for a year: entitlement, used and remaining days per leave type."""
+    return LeaveBalance.get(employee_id, year)
+
+# Fields the balance ledger and the data version stamps need from a changed request.
+CHANGED_FIELDS = {"employee_id": 1, "supervisor_id": 1, "leave_type": 1, "start_date": 1, "end_date": 1, "status": 1}
 
 @tool("approve_or_reject_request", args_schema=ApproveRejectRequestInput)
 def approve_or_reject_request(request_id: str, new_status: str, approver_id: str, approver_role: str, rejection_reason: Optional[str] = None) -> str:
@@ -126,11 +296,144 @@ def approve_or_reject_request(request_id: str, new_status: str, approver_id: str
     }
     if rejection_reason:
         update_doc["$set"]["rejection_reason"] = rejection_reason
+    add_to_update(update_doc, "status_changed", new_status, approver_id)
         
-    result = leave_requests_collection.update_one(
+    # The document as it was before the update tells whether the leave
+    # balance has to change.
+    previous = get_leave_requests_collection().find_one_and_update(
         {"_id": ObjectId(request_id)},
-        update_doc
+        update_doc,
+        projection=CHANGED_FIELDS,
+        return_document=ReturnDocument.BEFORE
     )
-    if result.modified_count > 0:
+    if previous is not None:
+        LeaveBalance.on_status_change([previous], previous.get("status"), new_status)
+        DataVersion.bump([previous])
         return f"Request {request_id} has been successfully updated to {new_status}."
-    return f"Failed to update request {request_id}."
\ No newline at end of file
+    return f"Failed to update request {request_id}."
+
+def bulk_update_status(approver_id: str, approver_role: str, new_status: str,
+                       request_ids: Optional[List[str]] = None, all_pending: bool = False,
+                       team_supervisor_id: Optional[str] = None, requested_before: Optional[str] = None,
+                       rejection_reason: Optional[str] = None) -> dict:
+    """Moves many leave requests to new_status with a single update_many.
+
+    The update filter includes the status each request must currently be in
+    for this role (and, for supervisors, their own team), so requests that
+    were already processed are skipped atomically. Every document updated by
+    this call is tagged with a batch ID, which is how the per-ID results are
+    read back (by _id; the batch fields are not indexed).
+
+    Shared by the bulk tool and the /api/leave/bulk-status route.
+    """
+    if approver_role not in TRANSITIONS:
+        raise ValueError(f"Role '{approver_role}' cannot approve or reject requests.")
+    from_status, allowed = TRANSITIONS[approver_role]
+    if new_status not in allowed:
+        raise ValueError(f"A {approver_role} can only set the status to: {', '.join(sorted(allowed))}.")
+    if not request_ids and not all_pending:
+        raise ValueError("Give request_ids, or set all_pending to update every pending request.")
+
+    query = {"status": from_status}
+    if approver_role == "supervisor":
+        query["supervisor_id"] = approver_id
+    elif team_supervisor_id:
+        query["supervisor_id"] = team_supervisor_id
+    if requested_before:
+        query["requested_at"] = {"$lt": parse(requested_before)}
+
+    results = {}
+    object_ids = []
+    if request_ids:
+        for request_id in request_ids:
+            if ObjectId.is_valid(request_id):
+                object_ids.append(ObjectId(request_id))
+            else:
+                results[request_id] = "invalid_id"
+        query["_id"] = {"$in": object_ids}
+    else:
+        # The pending requests as of now; a request that becomes pending
+        # while this runs is left for the next action.
+        object_ids = [doc["_id"] for doc in get_leave_requests_collection().find(query, {"_id": 1})]
+        query["_id"] = {"$in": object_ids}
+
+    batch_id = uuid.uuid4().hex
+    update_doc = {
+        "$set": {
+            "status": new_status,
+            f"{approver_role}_action_by": approver_id,
+            f"{approver_role}_action_at": datetime.datetime.now(datetime.timezone.utc),
+            f"{approver_role}_action_batch": batch_id
+        }
+    }
+    if rejection_reason:
+        update_doc["$set"]["rejection_reason"] = rejection_reason
+    # Every updated request gets the same event, _id included; the worker
+    # tells them apart by request _id.
+    add_to_update(update_doc, "status_changed", new_status, approver_id)
+
+    collection = get_leave_requests_collection()
+    result = collection.update_many(query, update_doc)
+
+    # Every request moved here left from_status, so none was approved_by_hr
+    # before; only a final HR approval changes the leave balances.
+    updated_docs = []
+    if request_ids:
+        found = collection.find(
+            {"_id": {"$in": object_ids}},
+            {**CHANGED_FIELDS, f"{approver_role}_action_batch": 1}
+        )
+        for doc in found:
+            if doc.get(f"{approver_role}_action_batch") == batch_id:
+                results[str(doc["_id"])] = "updated"
+                updated_docs.append(doc)
+            elif doc.get("status") == from_status:
+                # Right status, but another team's or outside the date filter.
+                results[str(doc["_id"])] = "skipped (not in your approval queue)"
+            else:
+                results[str(doc["_id"])] = f"skipped (status is '{doc.get('status')}')"
+        for object_id in object_ids:
+            results.setdefault(str(object_id), "not_found")
+    else:
+        found = collection.find({"_id": {"$in": object_ids}, f"{approver_role}_action_batch": batch_id}, CHANGED_FIELDS)
+        for doc in found:
+            results[str(doc["_id"])] = "updated"
+            updated_docs.append(doc)
+
+    LeaveBalance.on_status_change(updated_docs, from_status, new_status)
+    DataVersion.bump(updated_docs)
+    return {"new_status": new_status, "updated_count": result.modified_count, "results": results}
+
+@tool("bulk_approve_or_reject_requests", args_schema=BulkApproveRejectInput)
+def bulk_approve_or_reject_requests(new_status: str, approver_id: str, approver_role: str,
+                                    request_ids: Optional[List[str]] = None, all_pending: bool = False,
+                                    team_supervisor_id: Optional[str] = None, requested_before: Optional[str] = None,
+                                    rejection_reason: Optional[str] = None) -> dict:
+    """Approves or rejects many leave requests at once, either a list of request IDs or all pending requests (optionally filtered by team and request date). Returns the result for each request."""
+    return bulk_update_status(approver_id, approver_role, new_status, request_ids, all_pending,
+                              team_supervisor_id, requested_before, rejection_reason)
+
+# --- Async variants ---
+# The ASGI path awaits tools with `ainvoke`. The pymongo calls run on a
+# dedicated, bounded pool sized to the Mongo connection pool, so the event
+# loop never blocks on the database and tool calls cannot starve the default
+# executor used by the rest of the app.
+_db_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("MONGO_ASYNC_WORKERS", "16")),
+    thread_name_prefix="mongo-tools"
+)
+
+def _attach_async(tool_obj):
+    async def _arun(**kwargs):
+        loop = asyncio.get_running_loop()
+        # copy_context keeps the request's metrics context in the pool thread.
+        return await loop.run_in_executor(
+            _db_executor, contextvars.copy_context().run, partial(tool_obj.func, **kwargs)
+        )
+    tool_obj.coroutine = _arun
+    return tool_obj
+
+for _tool in (create_leave_request, get_my_leave_requests, get_pending_supervisor_requests,
+              get_pending_hr_requests, get_team_leave_calendar, get_my_leave_balance, approve_or_reject_request,
+              bulk_approve_or_reject_requests):
+    _attach_async(_tool)
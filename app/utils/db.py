@@ -1,17 +1,45 @@
 # app/utils/db.py
+# The MongoDB client is created on first use rather than at import time, so
+# routes that never touch the database (and cold starts in general) do not
+# pay for connection setup.
 import os
-from pymongo import MongoClient
+import logging
+import threading
 from dotenv import load_dotenv
 
 load_dotenv()
 
-MONGO_URI = os.getenv("MONGO_URI")
-MONGO_DB_NAME = os.getenv("MONGO_DB_NAME")
+log = logging.getLogger(__name__)
 
-client = MongoClient(MONGO_URI)
-db = client[MONGO_DB_NAME]
+_lock = threading.Lock()
+_client = None
 
-# Leave requests collection
-leave_requests_collection = db["leave_requests"]
 
-print("✅ Successfully connected to MongoDB.")
\ No newline at end of file
+def get_client():
+    """Returns the shared MongoClient, creating it on first use (thread-safe)."""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                from pymongo import MongoClient
+                from app.utils.metrics import mongo_listener
+                _client = MongoClient(os.getenv("MONGO_URI"), event_listeners=[mongo_listener()])
+                log.info("MongoDB client created")
+    return _client
+
+
+def set_client(client):
+    """Replaces the shared client, e.g. with a mongomock.MongoClient for
+    benchmarks and offline runs. Call it before the first request."""
+    global _client
+    with _lock:
+        _client = client
+
+
+def get_db():
+    return get_client()[os.getenv("MONGO_DB_NAME")]
+
+
+def get_leave_requests_collection():
+    """Leave requests collection"""
+    return get_db()["leave_requests"]
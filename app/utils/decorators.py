@@ -1,26 +1,67 @@
 # app/utils/decorators.py
 import os
+import time
 import jwt
 from functools import wraps
 from flask import request, jsonify
+from app.utils.cache import TTLCache
+from app.utils.metrics import register_cache
+
+# Decoded tokens, so a client sending the same token on every request is
+# only verified once per TOKEN_CACHE_TTL seconds (never past its 'exp').
+_token_cache = TTLCache(
+    maxsize=int(os.getenv("TOKEN_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("TOKEN_CACHE_TTL", "60"))
+)
+register_cache("token", _token_cache)
+
+def decode_auth_header(auth_header):
+    """Decodes a 'Bearer <token>' header.
+
+    Returns (current_user, None) on success or (None, error_message).
+    Shared by the Flask decorator and the ASGI chat routes.
+    """
+    token = None
+    if auth_header:
+        parts = auth_header.split(" ")
+        token = parts[1] if len(parts) > 1 else None
+
+    if not token:
+        return None, 'Token is missing!'
+
+    current_user = _token_cache.get(token)
+    if current_user is not None and current_user.get('exp', 0) > time.time():
+        # A copy, so callers can't change the cached claims.
+        return dict(current_user), None
+
+    try:
+        current_user = jwt.decode(token, os.getenv("SECRET_KEY", "default_secret_key_for_dev"), algorithms=["HS256"])
+    except jwt.ExpiredSignatureError:
+        return None, 'Token has expired!'
+    except jwt.InvalidTokenError:
+        return None, 'Token is invalid!'
+
+    _token_cache.set(token, current_user)
+    return dict(current_user), None
 
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = None
-        if 'Authorization' in request.headers:
-            token = request.headers['Authorization'].split(" ")[1]
-
-        if not token:
-            return jsonify({'message': 'Token is missing!'}), 401
-
-        try:
-            current_user = jwt.decode(token, os.getenv("SECRET_KEY", "default_secret_key_for_dev"), algorithms=["HS256"])
-        except jwt.ExpiredSignatureError:
-            return jsonify({'message': 'Token has expired!'}), 401
-        except jwt.InvalidTokenError:
-            return jsonify({'message': 'Token is invalid!'}), 401
+        current_user, error = decode_auth_header(request.headers.get('Authorization'))
+        if error:
+            return jsonify({'message': error}), 401
 
         return f(current_user, *args, **kwargs)
 
-    return decorated
\ No newline at end of file
+    return decorated
+
+def role_required(*roles):
+    """Restricts a route to the given roles. Use below @token_required."""
+    def decorator(f):
+        @wraps(f)
+        def decorated(current_user, *args, **kwargs):
+            if current_user.get('role') not in roles:
+                return jsonify({'message': 'You are not allowed to perform this action.'}), 403
+            return f(current_user, *args, **kwargs)
+        return decorated
+    return decorator
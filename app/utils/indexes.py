@@ -0,0 +1,77 @@
+# app/utils/indexes.py
+# Creates the MongoDB indexes the app relies on. Safe to run repeatedly.
+#
+#   python -m app.utils.indexes
+#
+# or set MONGO_ENSURE_INDEXES=1 to run it when the Flask app starts.
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+# The list indexes of leave_requests end with (requested_at, _id) descending,
+# which is the order the list tools page through, so results come straight
+# from the index without an in-memory sort.
+INDEXES = {
+    "leave_requests": [
+        IndexModel(
+            [("employee_id", ASCENDING), ("requested_at", DESCENDING), ("_id", DESCENDING)],
+            name="employee_requested_at"
+        ),
+        IndexModel(
+            [("supervisor_id", ASCENDING), ("status", ASCENDING), ("requested_at", DESCENDING), ("_id", DESCENDING)],
+            name="supervisor_status_requested_at"
+        ),
+        IndexModel(
+            [("status", ASCENDING), ("requested_at", DESCENDING), ("_id", DESCENDING)],
+            name="status_requested_at"
+        ),
+        # Period filters of the HR reports and exports (app/models/leave_report.py).
+        IndexModel([("start_date", ASCENDING)], name="start_date"),
+        IndexModel([("requested_at", DESCENDING)], name="requested_at"),
+        # Range-overlap queries for the team calendar and conflict checks.
+        IndexModel(
+            [("supervisor_id", ASCENDING), ("start_date", ASCENDING), ("end_date", ASCENDING)],
+            name="supervisor_start_end"
+        ),
+        # Upsert key of imported historical requests (import_data.py).
+        IndexModel(
+            [("import_key", ASCENDING)],
+            name="import_key_unique", unique=True, sparse=True
+        ),
+        # Requests with undelivered notifications (app/models/notification.py);
+        # partial, so it only holds the few requests still in the outbox.
+        IndexModel(
+            [("outbox_due_at", ASCENDING)],
+            name="outbox_due_at", partialFilterExpression={"outbox_due_at": {"$exists": True}}
+        ),
+    ],
+    "leave_balances": [
+        IndexModel(
+            [("employee_id", ASCENDING), ("year", ASCENDING), ("leave_type", ASCENDING)],
+            name="employee_year_type_unique", unique=True
+        ),
+    ],
+    # Entries of the shared response cache (RESPONSE_CACHE_BACKEND=mongo)
+    # are deleted by MongoDB once expires_at has passed.
+    "response_cache": [
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "users": [
+        IndexModel([("username", ASCENDING)], name="username_unique", unique=True),
+        IndexModel([("employee_id", ASCENDING)], name="employee_id"),
+    ],
+}
+
+
+def ensure_indexes(db=None):
+    """Creates any missing index. Returns {collection: [index names]}."""
+    if db is None:
+        from app.utils.db import get_db
+        db = get_db()
+    created = {}
+    for collection_name, indexes in INDEXES.items():
+        created[collection_name] = db[collection_name].create_indexes(indexes)
+    return created
+
+
+if __name__ == "__main__":
+    for collection_name, names in ensure_indexes().items():
+        print(f"✅ {collection_name}: {', '.join(names)}")
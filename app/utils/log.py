@@ -0,0 +1,164 @@
+# app/utils/log.py
+# Structured, non-blocking logging for the app. Modules log with the standard
+# library (`log = logging.getLogger(__name__)`) and pass fields through
+# `extra`; setup_logging() routes every `app.*` record through a QueueHandler,
+# so a request thread only formats the message and drops it on a bounded
+# queue. A background QueueListener thread writes the JSON lines. When the
+# queue is full, records are dropped (and counted) rather than blocking a
+# request.
+#
+#   LOG_LEVEL:          level of the app loggers (default INFO)
+#   LOG_LEVELS:         per-module levels, e.g. "app.tools=DEBUG,app.agents.router=WARNING"
+#   LOG_FORMAT:         json (default) or text
+#   LOG_DEBUG_SAMPLE:   share of requests (0-1) whose DEBUG records are kept (default 1)
+#   LOG_QUEUE_SIZE:     records buffered for the writer thread (default 10000)
+import os
+import sys
+import copy
+import json
+import queue
+import atexit
+import random
+import logging
+import datetime
+import threading
+import zlib
+from logging.handlers import QueueHandler, QueueListener
+
+from app.utils.metrics import REGISTRY, Counter, current_request_id
+
+DROPPED = REGISTRY.register(Counter(
+    "hr_log_records_dropped_total", "Log records dropped because the log queue was full."))
+
+# Attributes every LogRecord has; anything else came in through `extra`.
+_RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message, request ID and extra fields."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for key, value in vars(record).items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Readable lines for local development: message, then the extra fields."""
+
+    def format(self, record):
+        fields = " ".join(f"{key}={value!r}" for key, value in vars(record).items()
+                          if key not in _RESERVED and not key.startswith("_"))
+        request_id = getattr(record, "request_id", None)
+        line = (f"{datetime.datetime.fromtimestamp(record.created):%H:%M:%S} {record.levelname:<7} "
+                f"{record.name}{f' [{request_id}]' if request_id else ''}: {record.getMessage()}"
+                f"{'  ' + fields if fields else ''}")
+        if record.exc_text:
+            line += "\n" + record.exc_text
+        return line
+
+
+class RequestFilter(logging.Filter):
+    """Tags records with the current request ID and samples DEBUG records.
+
+    Runs in the thread that logs, where the request context is. Sampling is
+    per request, so a kept request keeps all its DEBUG records.
+    """
+
+    def __init__(self, debug_sample: float):
+        super().__init__()
+        self.debug_sample = debug_sample
+
+    def filter(self, record):
+        # A record may carry its own (e.g. a streamed response finishing
+        # after its request context is gone).
+        if not getattr(record, "request_id", None):
+            record.request_id = current_request_id()
+        if record.levelno > logging.DEBUG or self.debug_sample >= 1:
+            return True
+        if record.request_id:
+            return zlib.crc32(record.request_id.encode()) % 10000 < self.debug_sample * 10000
+        return random.random() < self.debug_sample
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Never blocks: a record that does not fit in the queue is dropped."""
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DROPPED.inc()
+
+    def prepare(self, record):
+        # Resolve the message (its arguments may change later) and the
+        # traceback (it holds frames alive) here; the JSON encoding and the
+        # write happen on the listener thread.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def parse_levels(spec: str) -> dict:
+    """'app.tools=DEBUG,app.agents=WARNING' -> {'app.tools': 10, 'app.agents': 30}"""
+    levels = {}
+    for item in (spec or "").split(","):
+        name, _, level = item.strip().partition("=")
+        if name and level:
+            levels[name.strip()] = logging.getLevelName(level.strip().upper())
+    return levels
+
+
+_lock = threading.Lock()
+_listener = None
+
+
+def setup_logging(stream=None):
+    """Sends the `app` loggers through the queue to a writer thread. Idempotent."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            return
+        formatter = TextFormatter() if os.getenv("LOG_FORMAT", "json") == "text" else JsonFormatter()
+        output = logging.StreamHandler(stream or sys.stdout)
+        output.setFormatter(formatter)
+
+        log_queue = queue.Queue(maxsize=int(os.getenv("LOG_QUEUE_SIZE", "10000")))
+        handler = DroppingQueueHandler(log_queue)
+        handler.addFilter(RequestFilter(float(os.getenv("LOG_DEBUG_SAMPLE", "1"))))
+
+        app_logger = logging.getLogger("app")
+        app_logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+        app_logger.addHandler(handler)
+        # The app's records are written once, by the listener, not again by root handlers.
+        app_logger.propagate = False
+        for name, level in parse_levels(os.getenv("LOG_LEVELS", "")).items():
+            logging.getLogger(name).setLevel(level)
+
+        _listener = QueueListener(log_queue, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Writes out what is still queued and stops the writer thread."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
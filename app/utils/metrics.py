@@ -0,0 +1,326 @@
+# app/utils/metrics.py
+# Low-overhead instrumentation: timing spans, per-request statistics and a
+# Prometheus text endpoint (/metrics), without extra dependencies.
+#
+# Every HTTP request gets an ID (the X-Request-ID header, or a new one) and a
+# RequestStats object held in a context variable. span() times one unit of
+# work (an LLM call, a tool call; MongoDB commands are timed by a pymongo
+# command listener), adds it to a latency histogram and to the current
+# request's totals. Each observation is a perf_counter() pair, a dict lookup
+# and a short lock, so this is meant to stay on in production.
+import os
+import time
+import uuid
+import bisect
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+
+log = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Requests slower than this many seconds are logged with their breakdown.
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "5"))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def gauge_lines(name, documentation, samples):
+    """Prometheus text of a gauge computed at scrape time, for collectors
+    (Registry.register_collector). samples are (labels dict, value) pairs."""
+    yield f"# HELP {name} {documentation}"
+    yield f"# TYPE {name} gauge"
+    for labels, value in samples:
+        yield f"{name}{_labels(list(labels), list(labels.values()))} {_number(value)}"
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # key -> [count per bucket (+Inf last), sum]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            values = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+        for key, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == "+Inf" else f'le="{_number(bound)}"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector):
+        """collector() returns Prometheus text lines, computed at scrape time."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "hr_http_requests_total", "HTTP requests by route and status.", ("method", "endpoint", "status")))
+HTTP_DURATION = REGISTRY.register(Histogram(
+    "hr_http_request_duration_seconds", "HTTP request latency.", ("method", "endpoint")))
+SPAN_DURATION = REGISTRY.register(Histogram(
+    "hr_span_duration_seconds", "Latency of LLM calls, tool calls and MongoDB commands.", ("kind", "name")))
+SPAN_ERRORS = REGISTRY.register(Counter(
+    "hr_span_errors_total", "Failed LLM calls, tool calls and MongoDB commands.", ("kind", "name")))
+LLM_TOKENS = REGISTRY.register(Counter(
+    "hr_llm_tokens_total", "LLM tokens used, by type (input/output).", ("type",)))
+LLM_CALLS_PER_REQUEST = REGISTRY.register(Histogram(
+    "hr_llm_calls_per_request", "LLM calls (agent loops and summaries) per HTTP request.",
+    buckets=(0, 1, 2, 3, 4, 6, 8, 12)))
+MONGO_OPS_PER_REQUEST = REGISTRY.register(Histogram(
+    "hr_mongo_ops_per_request", "MongoDB commands per HTTP request.",
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100)))
+
+
+_caches = {}
+
+
+def register_cache(name, cache):
+    """Exports a TTLCache's hit/miss/eviction counters and size."""
+    _caches[name] = cache
+
+
+def _cache_lines():
+    if not _caches:
+        return
+    stats = {name: cache.stats() for name, cache in _caches.items()}
+    for field, kind, documentation in (
+        ("hits", "counter", "Cache hits."),
+        ("misses", "counter", "Cache misses."),
+        ("evictions", "counter", "Entries evicted to stay within the cache size."),
+        ("size", "gauge", "Entries in the cache."),
+    ):
+        name = f"hr_cache_{field}" + ("_total" if kind == "counter" else "")
+        yield f"# HELP {name} {documentation}"
+        yield f"# TYPE {name} {kind}"
+        for cache_name, values in stats.items():
+            yield f'{name}{{cache="{_escape(cache_name)}"}} {values[field]}'
+
+
+REGISTRY.register_collector(_cache_lines)
+
+
+class RequestStats:
+    """Totals for one HTTP request, shared by every thread working on it."""
+
+    def __init__(self, request_id):
+        self.request_id = request_id
+        self.started = time.perf_counter()
+        self.counts = {}
+        self.seconds = {}
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self._lock = threading.Lock()
+
+    def add(self, kind, seconds):
+        with self._lock:
+            self.counts[kind] = self.counts.get(kind, 0) + 1
+            self.seconds[kind] = self.seconds.get(kind, 0.0) + seconds
+
+    def add_tokens(self, input_tokens, output_tokens):
+        with self._lock:
+            self.input_tokens += input_tokens
+            self.output_tokens += output_tokens
+
+    def summary(self) -> str:
+        parts = [f"{kind} {self.counts[kind]}x {self.seconds[kind]:.2f}s" for kind in sorted(self.counts)]
+        if self.input_tokens or self.output_tokens:
+            parts.append(f"tokens {self.input_tokens}/{self.output_tokens}")
+        return " | ".join(parts)
+
+
+_current = contextvars.ContextVar("request_stats", default=None)
+
+
+def current_request_id():
+    stats = _current.get()
+    return stats.request_id if stats else None
+
+
+def start_request(request_id=None) -> RequestStats:
+    """Starts the statistics of a request in the current context."""
+    stats = RequestStats(request_id or uuid.uuid4().hex)
+    _current.set(stats)
+    return stats
+
+
+def finish_request(stats, method, endpoint, status):
+    """Records a finished request. Takes stats explicitly: streamed responses
+    finish after the request context is gone."""
+    elapsed = time.perf_counter() - stats.started
+    HTTP_REQUESTS.inc(method=method, endpoint=endpoint, status=status)
+    HTTP_DURATION.observe(elapsed, method=method, endpoint=endpoint)
+    LLM_CALLS_PER_REQUEST.observe(stats.counts.get("llm", 0))
+    MONGO_OPS_PER_REQUEST.observe(stats.counts.get("mongo", 0))
+    if elapsed >= SLOW_REQUEST_SECONDS:
+        log.warning("Slow request", extra={
+            "request_id": stats.request_id, "method": method, "endpoint": endpoint, "status": status,
+            "seconds": round(elapsed, 3), "breakdown": stats.summary()})
+
+
+def observe(kind, name, seconds, error=False):
+    SPAN_DURATION.observe(seconds, kind=kind, name=name)
+    if error:
+        SPAN_ERRORS.inc(kind=kind, name=name)
+    stats = _current.get()
+    if stats is not None:
+        stats.add(kind, seconds)
+
+
+@contextmanager
+def span(kind, name):
+    """Times the block as one `kind` operation called `name`."""
+    started = time.perf_counter()
+    error = False
+    try:
+        yield
+    except BaseException:
+        error = True
+        raise
+    finally:
+        observe(kind, name, time.perf_counter() - started, error)
+
+
+def record_llm_usage(message):
+    """Counts the tokens reported on an LLM response message, if any."""
+    usage = getattr(message, "usage_metadata", None) or {}
+    input_tokens = usage.get("input_tokens")
+    output_tokens = usage.get("output_tokens")
+    if input_tokens is None:
+        # Providers that only fill response_metadata (OpenAI-style token_usage).
+        token_usage = (getattr(message, "response_metadata", None) or {}).get("token_usage") or {}
+        input_tokens = token_usage.get("prompt_tokens")
+        output_tokens = token_usage.get("completion_tokens")
+    input_tokens, output_tokens = input_tokens or 0, output_tokens or 0
+    if input_tokens or output_tokens:
+        LLM_TOKENS.inc(input_tokens, type="input")
+        LLM_TOKENS.inc(output_tokens, type="output")
+        stats = _current.get()
+        if stats is not None:
+            stats.add_tokens(input_tokens, output_tokens)
+
+
+def mongo_listener():
+    """A pymongo CommandListener that times every MongoDB command."""
+    from pymongo import monitoring
+
+    class MongoCommandListener(monitoring.CommandListener):
+        # Called on the thread that ran the command, so the request context
+        # is the caller's.
+        def started(self, event):
+            pass
+
+        def succeeded(self, event):
+            observe("mongo", event.command_name, event.duration_micros / 1e6)
+
+        def failed(self, event):
+            observe("mongo", event.command_name, event.duration_micros / 1e6, error=True)
+
+    return MongoCommandListener()
+
+
+def init_app(app):
+    """Adds request IDs, request metrics and the /metrics endpoint to a Flask app."""
+    from flask import Response, g, request
+
+    @app.before_request
+    def _start_request():
+        g.request_stats = start_request(request.headers.get("X-Request-ID"))
+
+    @app.after_request
+    def _finish_request(response):
+        stats = g.get("request_stats")
+        if stats is None:
+            return response
+        response.headers["X-Request-ID"] = stats.request_id
+        if not response.is_streamed:
+            response.headers["Server-Timing"] = ", ".join(
+                f"{kind};dur={stats.seconds[kind] * 1000:.1f}" for kind in sorted(stats.seconds))
+        method = request.method
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        if response.is_streamed:
+            # Runs once the body has been sent, so streamed chats are timed in full.
+            response.call_on_close(lambda: finish_request(stats, method, endpoint, response.status_code))
+        else:
+            finish_request(stats, method, endpoint, response.status_code)
+        return response
+
+    @app.route("/metrics")
+    def metrics():
+        return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,52 @@
+# app/utils/notification_sinks.py
+# Where notification digests go. A sink has one method,
+#
+#   send(recipient, notifications)
+#
+# called once per recipient per worker batch with that recipient's digest (a
+# list of dicts: key, request_id, status, text). It raises on failure, and the
+# worker retries the whole digest later. Delivery is at least once; `key` is
+# stable across retries, so a sink can drop repeats.
+#
+# NOTIFY_SINK picks the sink: log (default), file (JSON lines appended to
+# NOTIFY_FILE) or "package.module:ClassName" for a custom one (e-mail,
+# webhook), which is created with no arguments.
+import os
+import json
+import threading
+import logging
+import importlib
+
+log = logging.getLogger(__name__)
+
+
+class LogSink:
+    """Logs each digest; for development and tests."""
+
+    def send(self, recipient, notifications):
+        log.info("Notification digest", extra={"recipient": recipient, "texts": [n["text"] for n in notifications]})
+
+
+class FileSink:
+    """Appends one JSON line per digest to a file."""
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv("NOTIFY_FILE", "notifications.jsonl")
+        self._lock = threading.Lock()
+
+    def send(self, recipient, notifications):
+        line = json.dumps({"recipient": recipient, "notifications": notifications}, default=str)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+def get_sink(name=None):
+    name = name or os.getenv("NOTIFY_SINK", "log")
+    if name == "log":
+        return LogSink()
+    if name == "file":
+        return FileSink()
+    if ":" in name:
+        module_name, class_name = name.split(":", 1)
+        return getattr(importlib.import_module(module_name), class_name)()
+    raise ValueError(f"Unknown NOTIFY_SINK '{name}': use log, file or package.module:ClassName.")
@@ -0,0 +1,200 @@
+# app/utils/notification_worker.py
+# Drains the notification outbox (app/models/notification.py) in batches:
+# claims requests with due events, turns their events into one digest per
+# recipient, hands the digests to the sink and records what went out. Runs
+# outside the chat request path, so a slow or failing sink never slows a chat.
+#
+#   python -m app.utils.notification_worker          # keep polling
+#   python -m app.utils.notification_worker --once   # drain one batch and exit
+#
+# or set NOTIFY_WORKER=thread to run it in a background thread of the web
+# process (single-process deployments).
+#
+#   NOTIFY_BATCH_SIZE     requests claimed per batch
+#   NOTIFY_POLL_SECONDS   pause when the outbox is empty
+#   NOTIFY_MAX_ATTEMPTS   failed deliveries before events are dead-lettered
+#   NOTIFY_BACKOFF_SECONDS / NOTIFY_BACKOFF_MAX_SECONDS  retry delay, doubled per attempt
+#   NOTIFY_LEASE_SECONDS  how long a claimed batch is held before another worker may take it
+import os
+import uuid
+import random
+import logging
+import threading
+
+from app.models.notification import NotificationOutbox
+from app.utils.notification_sinks import get_sink
+from app.utils.metrics import REGISTRY, Counter
+
+log = logging.getLogger(__name__)
+
+BATCH_SIZE = int(os.getenv("NOTIFY_BATCH_SIZE", "200"))
+POLL_SECONDS = float(os.getenv("NOTIFY_POLL_SECONDS", "5"))
+MAX_ATTEMPTS = int(os.getenv("NOTIFY_MAX_ATTEMPTS", "8"))
+BACKOFF_SECONDS = float(os.getenv("NOTIFY_BACKOFF_SECONDS", "30"))
+BACKOFF_MAX_SECONDS = float(os.getenv("NOTIFY_BACKOFF_MAX_SECONDS", "3600"))
+LEASE_SECONDS = float(os.getenv("NOTIFY_LEASE_SECONDS", "120"))
+
+NOTIFICATIONS = REGISTRY.register(Counter(
+    "hr_notifications_total", "Notification digests by result (sent/failed) and events dead-lettered.", ("result",)))
+
+STATUS_TEXT = {
+    "pending_supervisor_approval": "is waiting for supervisor approval",
+    "approved_by_supervisor": "was approved by the supervisor and is waiting for HR",
+    "approved_by_hr": "was approved by HR",
+    "rejected": "was rejected",
+}
+
+
+def backoff(attempts: int) -> float:
+    """Seconds before retry number `attempts`: doubling, capped, with jitter
+    so failed batches do not all come back at once."""
+    delay = min(BACKOFF_MAX_SECONDS, BACKOFF_SECONDS * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def _hr_ids() -> list:
+    from app.utils.db import get_db
+    return [u["employee_id"] for u in get_db()["users"].find({"role": "hr"}, {"employee_id": 1})
+            if u.get("employee_id")]
+
+
+def recipients(request, event, hr_ids) -> list:
+    """Who hears about an event. The person who made the change does not."""
+    status = event["status"]
+    if event["event"] == "created":
+        people = [request.get("supervisor_id")]
+    elif status == "approved_by_supervisor":
+        people = [request.get("employee_id")] + hr_ids
+    elif status in ("approved_by_hr", "rejected"):
+        people = [request.get("employee_id"), request.get("supervisor_id")]
+    else:
+        people = [request.get("employee_id")]
+    seen = []
+    for person in people:
+        if person and person != event.get("by") and person not in seen:
+            seen.append(person)
+    return seen
+
+
+def _text(request, event) -> str:
+    start, end = request.get("start_date"), request.get("end_date")
+    period = f"{start:%Y-%m-%d} to {end:%Y-%m-%d}" if start and end else "dates unknown"
+    if event["event"] == "created":
+        what = "is waiting for your approval"
+    else:
+        what = STATUS_TEXT.get(event["status"], f"is now '{event['status']}'")
+    text = f"{request.get('leave_type', 'Leave')} leave of {request.get('employee_id')} ({period}) {what}."
+    if event["status"] == "rejected" and request.get("rejection_reason"):
+        text += f" Reason: {request['rejection_reason']}"
+    return text
+
+
+def build_digests(claimed, hr_ids) -> dict:
+    """recipient -> {"notifications": [...], "events": {(request _id, event _id), ...}}.
+
+    Events are coalesced per request: only the latest one is worded, and it
+    goes to the people that event concerns. A supervisor who approved a
+    request in the same batch it was created in hears nothing, and an
+    employee whose request was approved and then rejected hears only of the
+    rejection. "events" lists every event behind a digest, so they are all
+    marked delivered (or failed) together.
+    """
+    digests = {}
+    for request in claimed:
+        outbox = request.get("outbox", [])
+        if not outbox:
+            continue
+        # The outbox is in write order.
+        latest = outbox[-1]
+        for recipient in recipients(request, latest, hr_ids):
+            digest = digests.setdefault(recipient, {"notifications": [], "events": set()})
+            digest["events"].update((request["_id"], event["_id"]) for event in outbox)
+            digest["notifications"].append({
+                # Event _ids repeat across the requests of one bulk update.
+                "key": f"{request['_id']}:{latest['_id']}:{recipient}", "request_id": str(request["_id"]),
+                "status": latest["status"], "text": _text(request, latest),
+            })
+    return digests
+
+
+def run_once(sink=None) -> dict:
+    """Claims, delivers and completes one batch. Returns its counts."""
+    sink = sink or get_sink()
+    token = uuid.uuid4().hex
+    claimed = NotificationOutbox.claim(BATCH_SIZE, LEASE_SECONDS, token)
+    if not claimed:
+        return {"requests": 0, "events": 0, "sent": 0, "failed": 0, "dead": 0}
+
+    needs_hr = any(r.get("outbox") and r["outbox"][-1]["status"] == "approved_by_supervisor" for r in claimed)
+    digests = build_digests(claimed, _hr_ids() if needs_hr else [])
+    failed_events = set()
+    sent = failed = 0
+    for recipient, digest in digests.items():
+        try:
+            sink.send(recipient, digest["notifications"])
+            sent += 1
+        except Exception as e:
+            log.warning("Notification delivery failed", extra={"recipient": recipient, "error": str(e)})
+            failed_events |= digest["events"]
+            failed += 1
+
+    delivered, failed_by_request = {}, {}
+    for request in claimed:
+        for event in request.get("outbox", []):
+            if (request["_id"], event["_id"]) in failed_events:
+                failed_by_request.setdefault(request["_id"], []).append(event)
+            else:
+                # Includes events nobody needs to hear about.
+                delivered.setdefault(request["_id"], []).append(event["_id"])
+        if not request.get("outbox"):
+            delivered.setdefault(request["_id"], [])
+    dead = NotificationOutbox.complete(token, claimed, delivered, failed_by_request, backoff, MAX_ATTEMPTS)
+
+    NOTIFICATIONS.inc(sent, result="sent")
+    NOTIFICATIONS.inc(failed, result="failed")
+    if dead:
+        NOTIFICATIONS.inc(dead, result="dead")
+        log.error("Notification events dead-lettered (see outbox_dead)", extra={"events": dead, "attempts": MAX_ATTEMPTS})
+    return {
+        "requests": len(claimed),
+        "events": sum(len(r.get("outbox", [])) for r in claimed),
+        "sent": sent, "failed": failed, "dead": dead,
+    }
+
+
+def run_forever(stop_event=None, sink=None):
+    """Drains batches back to back while there is work, polls when idle."""
+    sink = sink or get_sink()
+    stop_event = stop_event or threading.Event()
+    log.info("Notification worker started", extra={"sink": type(sink).__name__})
+    while not stop_event.is_set():
+        try:
+            counts = run_once(sink)
+        except Exception:
+            log.exception("Notification worker batch failed")
+            counts = {"requests": 0}
+        if counts["requests"]:
+            log.info("Notification batch delivered", extra=counts)
+        if counts["requests"] < BATCH_SIZE:
+            stop_event.wait(POLL_SECONDS)
+
+
+def start_in_thread():
+    """Runs the worker in a daemon thread. Returns the Event that stops it."""
+    stop_event = threading.Event()
+    threading.Thread(target=run_forever, args=(stop_event,), name="notification-worker", daemon=True).start()
+    return stop_event
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Deliver queued leave notifications.")
+    parser.add_argument("--once", action="store_true", help="Drain one batch and exit.")
+    args = parser.parse_args()
+    from app.utils.log import setup_logging
+    setup_logging()
+    if args.once:
+        print(run_once())
+    else:
+        run_forever()
@@ -0,0 +1,137 @@
+# asgi.py
+# ASGI entry point: `uvicorn asgi:app --workers 1`
+#
+# The chat routes run natively on the event loop (async graph nodes, awaited
+# tools), so a single process can hold hundreds of conversations that are
+# waiting on the LLM. Every other route is served by the regular Flask app.
+import uuid
+import logging
+from asgiref.wsgi import WsgiToAsgi
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+
+from app import create_app
+from app.utils.decorators import decode_auth_header
+from app.utils.metrics import start_request, finish_request
+
+flask_app = create_app()
+
+from app.api.chat import build_agent_input
+from app.agents.leave_agent_graph import get_agent_graph, thread_config
+from app.agents.streaming import astream_chat_events, format_sse
+from app.agents.concurrency import LLMBusyError
+from app.agents import response_cache
+
+# Under "app", so it goes through the JSON log queue (app/utils/log.py).
+log = logging.getLogger("app.asgi")
+
+
+async def _read_chat_request(request):
+    current_user, error = decode_auth_header(request.headers.get('Authorization'))
+    if error:
+        return None, None, None, None, JSONResponse({'message': error}, status_code=401)
+
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    if not isinstance(data, dict):
+        return None, None, None, None, JSONResponse({"error": "Request body must be a JSON object"}, status_code=400)
+    user_message = data.get("message")
+    if not user_message:
+        return None, None, None, None, JSONResponse({"error": "Message is required"}, status_code=400)
+
+    new_thread = not data.get("thread_id")
+    thread_id = data.get("thread_id") or uuid.uuid4().hex
+    return current_user, user_message, thread_id, new_thread, None
+
+
+async def _build_input(current_user, user_message, thread_id):
+    # build_agent_input may read the user's profile from MongoDB.
+    agent_input = await run_in_threadpool(build_agent_input, current_user, user_message)
+    return agent_input, thread_config(current_user['user_id'], thread_id)
+
+
+async def handle_chat(request):
+    stats = start_request(request.headers.get("X-Request-ID"))
+    status = 500
+    try:
+        response = await _handle_chat(request)
+        status = response.status_code
+        response.headers["X-Request-ID"] = stats.request_id
+        return response
+    finally:
+        finish_request(stats, request.method, "/api/chat/", status)
+
+
+async def _handle_chat(request):
+    current_user, user_message, thread_id, new_thread, error_response = await _read_chat_request(request)
+    if error_response:
+        return error_response
+
+    try:
+        agent_input, config = await _build_input(current_user, user_message, thread_id)
+        cache_key, cached = await run_in_threadpool(
+            response_cache.lookup, agent_input, get_agent_graph(), config, new_thread)
+        if cached:
+            await response_cache.areplay(get_agent_graph(), config, agent_input, cached)
+            return JSONResponse({"response": cached[-1].content, "thread_id": thread_id, "cached": True})
+
+        response = await get_agent_graph().ainvoke(agent_input, config=config)
+        await run_in_threadpool(response_cache.store, cache_key, response['messages'])
+        return JSONResponse({"response": response['messages'][-1].content, "thread_id": thread_id})
+    except LLMBusyError as e:
+        return JSONResponse({"error": str(e)}, status_code=503)
+    except Exception as e:
+        log.exception("Chat request failed")
+        return JSONResponse({"error": f"An internal error occurred: {e}"}, status_code=500)
+
+
+async def handle_chat_stream(request):
+    stats = start_request(request.headers.get("X-Request-ID"))
+    current_user, user_message, thread_id, new_thread, error_response = await _read_chat_request(request)
+    if error_response:
+        error_response.headers["X-Request-ID"] = stats.request_id
+        finish_request(stats, request.method, "/api/chat/stream", error_response.status_code)
+        return error_response
+
+    async def generate():
+        yield format_sse("thread", {"thread_id": thread_id})
+        try:
+            agent_input, config = await _build_input(current_user, user_message, thread_id)
+            cache_key, cached = await run_in_threadpool(
+                response_cache.lookup, agent_input, get_agent_graph(), config, new_thread)
+            if cached:
+                await response_cache.areplay(get_agent_graph(), config, agent_input, cached)
+                yield format_sse("token", {"content": cached[-1].content})
+                yield format_sse("done", {"response": cached[-1].content, "thread_id": thread_id, "cached": True})
+                return
+            async for event, payload in astream_chat_events(get_agent_graph(), agent_input, config):
+                if event == "done":
+                    payload["thread_id"] = thread_id
+                yield format_sse(event, payload)
+            if cache_key:
+                state = await get_agent_graph().aget_state(config)
+                await run_in_threadpool(response_cache.store, cache_key, state.values["messages"])
+        except Exception as e:
+            log.exception("Chat stream failed")
+            yield format_sse("error", {"error": f"An internal error occurred: {e}"})
+        finally:
+            # Timed once the whole stream has been sent.
+            finish_request(stats, request.method, "/api/chat/stream", 200)
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "X-Request-ID": stats.request_id}
+    )
+
+
+app = Starlette(routes=[
+    Route('/api/chat', handle_chat, methods=['POST']),
+    Route('/api/chat/', handle_chat, methods=['POST']),
+    Route('/api/chat/stream', handle_chat_stream, methods=['POST']),
+    Mount('/', app=WsgiToAsgi(flask_app)),
+])
@@ -0,0 +1,155 @@
+# benchmarks/dataset.py
+# Synthetic users and leave requests for benchmarks.
+#
+#   python -m benchmarks.dataset --mongo-uri mongodb://localhost:27017 --db hr_bench \
+#       --employees 5000 --supervisors 250 --requests 300000
+#
+# Usernames are predictable, so runners can log in as anyone:
+#   emp00000.. (employees), sup0000.. (supervisors), hr00.. (HR),
+# all with the password BENCH_PASSWORD.
+import argparse
+import datetime
+import os
+import random
+import time
+
+BENCH_PASSWORD = "bench_password"
+
+LEAVE_TYPES = ["Annual", "Sick", "Casual"]
+DEPARTMENTS = ["Engineering", "Finance", "Operations", "Sales", "Support", "People"]
+
+# (status, weight) of generated requests.
+STATUSES = [
+    ("approved_by_hr", 60),
+    ("rejected", 10),
+    ("approved_by_supervisor", 10),
+    ("pending_supervisor_approval", 20),
+]
+
+BATCH_SIZE = 5000
+
+
+def employee_username(i):
+    return f"emp{i:05d}"
+
+
+def supervisor_username(i):
+    return f"sup{i:04d}"
+
+
+def hr_username(i):
+    return f"hr{i:02d}"
+
+
+def _users(employees, supervisors, hr_users, password_hash):
+    for i in range(hr_users):
+        yield {"username": hr_username(i), "password": password_hash, "role": "hr",
+               "employee_id": f"HR{i:02d}", "department": "People"}
+    for i in range(supervisors):
+        yield {"username": supervisor_username(i), "password": password_hash, "role": "supervisor",
+               "employee_id": f"SUP{i:04d}", "department": DEPARTMENTS[i % len(DEPARTMENTS)]}
+    for i in range(employees):
+        supervisor = i % supervisors
+        yield {"username": employee_username(i), "password": password_hash, "role": "employee",
+               "employee_id": f"EMP{i:05d}", "supervisor_id": f"SUP{supervisor:04d}",
+               "department": DEPARTMENTS[supervisor % len(DEPARTMENTS)]}
+
+
+def _requests(count, employees, supervisors, rng, years):
+    today = datetime.datetime.combine(datetime.date.today(), datetime.time())
+    first_day = today - datetime.timedelta(days=365 * years)
+    span_days = 365 * years + 60
+    statuses, weights = zip(*STATUSES)
+    for _ in range(count):
+        employee = rng.randrange(employees)
+        start = first_day + datetime.timedelta(days=rng.randrange(span_days))
+        requested_at = start - datetime.timedelta(days=rng.randint(1, 30), minutes=rng.randrange(1440))
+        status = rng.choices(statuses, weights)[0]
+        doc = {
+            "employee_id": f"EMP{employee:05d}",
+            "supervisor_id": f"SUP{employee % supervisors:04d}",
+            "leave_type": rng.choice(LEAVE_TYPES),
+            "start_date": start,
+            "end_date": start + datetime.timedelta(days=rng.choice([0, 0, 0, 1, 1, 2, 4])),
+            "reason": None,
+            "status": status,
+            "requested_at": requested_at,
+        }
+        if status != "pending_supervisor_approval":
+            doc["supervisor_action_by"] = doc["supervisor_id"]
+            doc["supervisor_action_at"] = requested_at + datetime.timedelta(hours=rng.randint(1, 72))
+        if status == "approved_by_hr" or (status == "rejected" and rng.random() < 0.3):
+            doc["hr_action_by"] = "HR00"
+            doc["hr_action_at"] = doc["supervisor_action_at"] + datetime.timedelta(hours=rng.randint(1, 96))
+        if status == "rejected":
+            doc["rejection_reason"] = "Team capacity"
+        yield doc
+
+
+def _insert_batches(collection, docs):
+    batch = []
+    for doc in docs:
+        batch.append(doc)
+        if len(batch) == BATCH_SIZE:
+            collection.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        collection.insert_many(batch, ordered=False)
+
+
+def generate(db, employees=2000, supervisors=100, requests=20000, hr_users=2, years=3, seed=42) -> dict:
+    """Replaces the users, leave_requests and leave_balances of db with synthetic data.
+
+    Indexes are created and leave balances rebuilt from the requests, so the
+    database looks like one that has been in use for `years` years.
+    """
+    from werkzeug.security import generate_password_hash
+    from app.utils.indexes import ensure_indexes
+    from app.models.leave_balance import LeaveBalance
+
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    for name in ("users", "leave_requests", "leave_balances"):
+        db[name].delete_many({})
+
+    # Hashing is deliberately slow, so every user shares one hash.
+    password_hash = generate_password_hash(BENCH_PASSWORD, method='pbkdf2:sha256')
+    _insert_batches(db["users"], _users(employees, supervisors, hr_users, password_hash))
+    _insert_batches(db["leave_requests"], _requests(requests, employees, supervisors, rng, years))
+    ensure_indexes(db)
+    LeaveBalance.reconcile(fix=True)
+
+    return {
+        "employees": employees,
+        "supervisors": supervisors,
+        "hr_users": hr_users,
+        "requests": requests,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill a database with synthetic HR data.")
+    parser.add_argument("--mongo-uri", default=os.getenv("MONGO_URI"), help="MongoDB to fill (default: MONGO_URI).")
+    parser.add_argument("--db", default=os.getenv("MONGO_DB_NAME", "hr_bench"))
+    parser.add_argument("--employees", type=int, default=5000)
+    parser.add_argument("--supervisors", type=int, default=250)
+    parser.add_argument("--requests", type=int, default=300000)
+    parser.add_argument("--hr-users", type=int, default=2)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    if not args.mongo_uri:
+        parser.error("--mongo-uri (or MONGO_URI) is required; the in-process database is filled by benchmarks.load itself.")
+
+    os.environ["MONGO_DB_NAME"] = args.db
+    from benchmarks import mongo
+    client = mongo.install(args.mongo_uri)
+    summary = generate(client[args.db], args.employees, args.supervisors, args.requests,
+                       args.hr_users, args.years, args.seed)
+    print(f"✅ {summary['employees']} employees, {summary['supervisors']} supervisors and "
+          f"{summary['requests']} leave requests written to '{args.db}' in {summary['seconds']}s.")
+
+
+if __name__ == "__main__":
+    main()
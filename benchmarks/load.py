@@ -0,0 +1,174 @@
+# benchmarks/load.py
+# End-to-end latency and throughput of /api/auth/login and /api/chat, with
+# no external services: the scripted fake LLM (app/agents/fake_llm.py) and,
+# unless --mongo-uri is given, an in-process mongomock database filled by
+# benchmarks/dataset.py. Requests go through the Flask test client, so the
+# numbers cover the whole app but not a WSGI server or the network.
+#
+#   python -m benchmarks.load --concurrency 8 --requests 200
+#   python -m benchmarks.load --scenarios chat_list,chat_balance --llm-latency-ms 300
+#   python -m benchmarks.load --mongo-uri mongodb://localhost:27017 --no-generate
+#
+# Reports per scenario: p50/p95/p99 latency, requests per second and Mongo
+# operations per request.
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# (role, chat message) per scenario; a None message means a login.
+SCENARIOS = {
+    "login": ("employee", None),
+    # Answered by the rule-based router, no LLM call.
+    "chat_list": ("employee", "show my leave requests"),
+    "chat_pending": ("supervisor", "show pending requests"),
+    # LLM -> tool -> LLM.
+    "chat_balance": ("employee", "what is my leave balance?"),
+    "chat_calendar": ("supervisor", "who else is on leave this week? show the team calendar"),
+    # LLM -> write tool -> LLM.
+    "chat_create": ("employee", "please create a leave request for next month"),
+}
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    index = max(0, math.ceil(p / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def _usernames(role, count, args):
+    from benchmarks import dataset
+    if role == "employee":
+        return [dataset.employee_username(i) for i in range(min(count, args.employees))]
+    if role == "supervisor":
+        return [dataset.supervisor_username(i) for i in range(min(count, args.supervisors))]
+    return [dataset.hr_username(i) for i in range(min(count, args.hr_users))]
+
+
+def _login_all(flask_app, roles, args) -> dict:
+    """Logs the pool of benchmark users in once; returns {role: [tokens]}."""
+    from benchmarks.dataset import BENCH_PASSWORD
+    client = flask_app.test_client()
+    tokens = {}
+    for role in roles:
+        tokens[role] = []
+        for username in _usernames(role, args.users, args):
+            res = client.post("/api/auth/login", json={"username": username, "password": BENCH_PASSWORD})
+            if res.status_code != 200:
+                raise SystemExit(f"Login failed for {username}: {res.status_code} {res.get_data(as_text=True)}")
+            tokens[role].append(res.get_json()["token"])
+    return tokens
+
+
+def run_scenario(flask_app, name, tokens, args) -> dict:
+    from benchmarks.dataset import BENCH_PASSWORD
+    from benchmarks.mongo import OPS
+
+    role, message = SCENARIOS[name]
+    usernames = _usernames(role, args.users, args)
+    local = threading.local()
+
+    def one(i):
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = flask_app.test_client()
+        started = time.perf_counter()
+        if message is None:
+            res = client.post("/api/auth/login", json={"username": usernames[i % len(usernames)], "password": BENCH_PASSWORD})
+        else:
+            token = tokens[role][i % len(tokens[role])]
+            # A new thread per request, so concurrent requests never share a conversation.
+            res = client.post("/api/chat/", json={"message": message, "thread_id": f"bench-{name}-{i}"},
+                              headers={"Authorization": f"Bearer {token}"})
+        return time.perf_counter() - started, res.status_code
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        list(executor.map(one, range(-args.warmup, 0)))
+
+        ops_before = OPS.total()
+        started = time.perf_counter()
+        results = list(executor.map(one, range(args.requests)))
+        wall = time.perf_counter() - started
+        ops = OPS.total() - ops_before
+
+    latencies = sorted(latency for latency, _ in results)
+    errors = sum(1 for _, status in results if status >= 400)
+    return {
+        "scenario": name,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "errors": errors,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "rps": args.requests / wall if wall else 0.0,
+        "mongo_ops_per_request": ops / args.requests,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test of the HR agent backend.")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma-separated, from: {', '.join(SCENARIOS)}.")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="Timed requests per scenario.")
+    parser.add_argument("--warmup", type=int, default=5, help="Untimed requests per scenario.")
+    parser.add_argument("--users", type=int, default=50, help="Distinct users per role sending requests.")
+    parser.add_argument("--llm-latency-ms", type=float, default=0, help="Simulated LLM response time per call.")
+    parser.add_argument("--checkpointer", default="mongo", choices=["mongo", "memory", "sqlite"])
+    parser.add_argument("--mongo-uri", help="Use this MongoDB instead of the in-process stand-in.")
+    parser.add_argument("--db", default="hr_bench")
+    parser.add_argument("--no-generate", action="store_true", help="Use the data already in --mongo-uri.")
+    parser.add_argument("--employees", type=int, default=2000)
+    parser.add_argument("--supervisors", type=int, default=100)
+    parser.add_argument("--hr-users", type=int, default=2)
+    parser.add_argument("--requests-in-db", type=int, default=20000, help="Leave requests to generate.")
+    parser.add_argument("--json", help="Also write the results to this file.")
+    parser.add_argument("--verbose", action="store_true", help="Show the app's own output.")
+    args = parser.parse_args()
+
+    names = [name for name in args.scenarios.split(",") if name]
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenario(s): {', '.join(sorted(unknown))}")
+
+    # Must be set before the app modules read them.
+    os.environ["LLM_PROVIDER"] = "fake"
+    os.environ["FAKE_LLM_LATENCY_MS"] = str(args.llm_latency_ms)
+    os.environ["CHECKPOINTER"] = args.checkpointer
+    os.environ["MONGO_DB_NAME"] = args.db
+    if not args.verbose:
+        # Only errors, so the app's logs do not land in the table below.
+        os.environ.setdefault("LOG_LEVEL", "ERROR")
+
+    from benchmarks import mongo, dataset
+    from app import create_app
+    from app.utils.log import setup_logging
+
+    # Before stdout is redirected: the log writer keeps the stream it starts with.
+    setup_logging()
+    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with output:
+        client = mongo.install(args.mongo_uri)
+        if not (args.mongo_uri and args.no_generate):
+            dataset.generate(client[args.db], args.employees, args.supervisors, args.requests_in_db, args.hr_users)
+        flask_app = create_app()
+        tokens = _login_all(flask_app, {SCENARIOS[name][0] for name in names}, args)
+        results = [run_scenario(flask_app, name, tokens, args) for name in names]
+
+    print(f"{'scenario':<15}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}{'mongo ops':>11}{'errors':>8}")
+    for r in results:
+        print(f"{r['scenario']:<15}{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}"
+              f"{r['rps']:>10.1f}{r['mongo_ops_per_request']:>11.1f}{r['errors']:>8}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
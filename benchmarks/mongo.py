@@ -0,0 +1,105 @@
+# benchmarks/mongo.py
+# The database for benchmark runs: an in-process mongomock stand-in by
+# default, or a real MongoDB (--mongo-uri). Either way every database
+# operation is counted in OPS, so runners can report Mongo ops per request.
+import threading
+from collections import Counter
+
+from app.utils.db import set_client
+
+
+class OpCounter:
+    """Thread-safe count of database operations, by command name."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = Counter()
+
+    def add(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def total(self) -> int:
+        with self._lock:
+            return sum(self.counts.values())
+
+    def snapshot(self) -> Counter:
+        with self._lock:
+            return Counter(self.counts)
+
+
+OPS = OpCounter()
+
+# The mongomock Collection methods that correspond to one server command.
+_MONGOMOCK_OPS = [
+    "find", "find_one", "find_one_and_update", "find_one_and_replace", "find_one_and_delete",
+    "insert_one", "insert_many", "update_one", "update_many", "replace_one",
+    "delete_one", "delete_many", "aggregate", "bulk_write", "count_documents",
+    "distinct", "create_index", "create_indexes",
+]
+
+_depth = threading.local()
+
+
+def _counted(name, method):
+    def wrapper(self, *args, **kwargs):
+        # mongomock implements some methods on top of others (find_one calls
+        # find); only the outermost call is one operation.
+        depth = getattr(_depth, "value", 0)
+        if depth == 0:
+            OPS.add(name)
+        _depth.value = depth + 1
+        # mongomock edits the projection dict it is given, which breaks when
+        # threads share one (like LIST_PROJECTION); give it its own copies.
+        args = tuple(dict(arg) if isinstance(arg, dict) else arg for arg in args)
+        kwargs = {key: dict(value) if isinstance(value, dict) else value for key, value in kwargs.items()}
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            _depth.value = depth
+    wrapper.__name__ = method.__name__
+    return wrapper
+
+
+def _mongomock_client():
+    try:
+        import mongomock
+    except ImportError:
+        raise SystemExit("The in-process database needs mongomock: pip install -r benchmarks/requirements.txt")
+    from mongomock.collection import Collection
+    for name in _MONGOMOCK_OPS:
+        method = getattr(Collection, name, None)
+        if method is not None and not getattr(method, "_counted", False):
+            wrapper = _counted(name, method)
+            wrapper._counted = True
+            setattr(Collection, name, wrapper)
+    return mongomock.MongoClient()
+
+
+class _CommandListener:
+    """Counts the commands a real MongoDB receives (pymongo command monitoring)."""
+
+    def started(self, event):
+        OPS.add(event.command_name)
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def install(mongo_uri=None):
+    """Creates the benchmark client and makes the app use it. Returns the client."""
+    if mongo_uri:
+        from pymongo import MongoClient
+        from pymongo.monitoring import CommandListener
+
+        from app.utils.metrics import mongo_listener
+
+        listener = type("BenchmarkCommandListener", (_CommandListener, CommandListener), {})()
+        client = MongoClient(mongo_uri, event_listeners=[listener, mongo_listener()])
+    else:
+        client = _mongomock_client()
+    set_client(client)
+    return client
@@ -0,0 +1,93 @@
+# benchmarks/startup.py
+# Measures cold-start cost: every run is a fresh Python process, like a new
+# serverless instance.
+#
+#   python -m benchmarks.startup --runs 5
+#   python -m benchmarks.startup --username employee_kamal --password emp_password --chat "hello"
+#
+# Reports (median over runs):
+#   import_s       import of the `app` package
+#   create_app_s   create_app()
+#   first_login_s  first POST /api/auth/login (needs MongoDB)
+#   first_chat_s   first POST /api/chat (needs MongoDB and the LLM provider)
+# and which heavy SDKs were already imported after login, which should be none.
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ["langchain_core", "langgraph", "langchain_groq", "langchain_openai"]
+
+CHILD_SCRIPT = r'''
+import json, sys, time
+args = json.loads(sys.argv[1])
+timings = {}
+
+t = time.perf_counter()
+import app
+timings["import_s"] = time.perf_counter() - t
+
+t = time.perf_counter()
+flask_app = app.create_app()
+timings["create_app_s"] = time.perf_counter() - t
+
+client = flask_app.test_client()
+if args["username"]:
+    t = time.perf_counter()
+    res = client.post("/api/auth/login", json={"username": args["username"], "password": args["password"]})
+    timings["first_login_s"] = time.perf_counter() - t
+    timings["login_status"] = res.status_code
+    timings["heavy_modules_after_login"] = [m for m in args["heavy"] if m in sys.modules]
+
+    if args["chat"] and res.status_code == 200:
+        headers = {"Authorization": "Bearer " + res.get_json()["token"]}
+        t = time.perf_counter()
+        res = client.post("/api/chat/", json={"message": args["chat"]}, headers=headers)
+        timings["first_chat_s"] = time.perf_counter() - t
+        timings["chat_status"] = res.status_code
+
+print("__RESULT__" + json.dumps(timings))
+'''
+
+
+def run_once(args) -> dict:
+    child_args = json.dumps({
+        "username": args.username,
+        "password": args.password,
+        "chat": args.chat,
+        "heavy": HEAVY_MODULES,
+    })
+    proc = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT, child_args],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    )
+    for line in proc.stdout.splitlines():
+        if line.startswith("__RESULT__"):
+            return json.loads(line[len("__RESULT__"):])
+    raise RuntimeError(f"Benchmark run failed:\n{proc.stderr}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold-start time of the HR agent backend.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--username")
+    parser.add_argument("--password")
+    parser.add_argument("--chat", help="Message to send as the first chat turn (requires --username).")
+    args = parser.parse_args()
+
+    results = [run_once(args) for _ in range(args.runs)]
+
+    print(f"Cold start over {args.runs} runs (median):")
+    for key in ("import_s", "create_app_s", "first_login_s", "first_chat_s"):
+        values = [r[key] for r in results if key in r]
+        if values:
+            print(f"  {key:<15} {statistics.median(values) * 1000:8.1f} ms")
+    heavy = results[-1].get("heavy_modules_after_login")
+    if heavy is not None:
+        print(f"  SDKs loaded after login: {', '.join(heavy) if heavy else 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,12 @@
 # frontend/chat_ui.py
+import json
 import streamlit as st
 import requests
 
 FLASK_API_URL = "http://127.0.0.1:5000"
+# Only the display is kept here (the conversation itself lives on the
+# server), so trim it to keep reruns fast in long sessions.
+MAX_DISPLAYED_MESSAGES = 50
 
 def login_user(username, password):
     try:
@@ -12,6 +16,7 @@ def login_user(username, password):
         st.session_state.token = data['token']
         st.session_state.role = data['role']
         st.session_state.username = data['username']
+        st.session_state.thread_id = data.get('thread_id')
         st.session_state.logged_in = True
         st.session_state.messages = [{"role": "assistant", "content": f"ආයුබෝවන් {st.session_state.username}! ඔබගේ `{st.session_state.role}` ගිණුමෙන් මා හා සම්බන්ධ විය හැක."}]
         st.rerun()
@@ -20,6 +25,34 @@ def login_user(username, password):
     except Exception as e:
         st.error(f"An error occurred: {e}")
 
+def read_sse(response):
+    """Yields (event, data) pairs from a Server-Sent Events response."""
+    event = "message"
+    for line in response.iter_lines(decode_unicode=True):
+        if not line:
+            continue
+        if line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            yield event, json.loads(line[len("data:"):].strip())
+
+def stream_agent_reply(response, tool_status):
+    """Yields answer tokens for st.write_stream and shows tool activity as it happens."""
+    for event, data in read_sse(response):
+        if event == "thread":
+            st.session_state.thread_id = data["thread_id"]
+        elif event == "token":
+            yield data["content"]
+        elif event == "tool_start":
+            tool_status.caption(f"⚙️ {data['name']} ...")
+        elif event == "tool_end":
+            tool_status.caption(f"✅ {data['name']}")
+        elif event == "done":
+            tool_status.empty()
+            st.session_state.last_response = data.get("response", "")
+        elif event == "error":
+            raise RuntimeError(data["error"])
+
 def logout():
     for key in list(st.session_state.keys()):
         if key not in ['theme']:
@@ -61,14 +94,21 @@ else:
 
         # Call the backend with the token
         headers = {"Authorization": f"Bearer {st.session_state.token}"}
-        api_payload = {"message": prompt, "history": st.session_state.messages}
+        # Only the new message is sent; the backend keeps the conversation
+        # under thread_id.
+        api_payload = {"message": prompt, "thread_id": st.session_state.get("thread_id")}
         
         try:
-            with st.spinner("..."):
-                response = requests.post(f"{FLASK_API_URL}/api/chat", json=api_payload, headers=headers)
-                response.raise_for_status()
-                assistant_message = response.json().get("response")
-                st.session_state.messages.append({"role": "assistant", "content": assistant_message})
-                st.rerun()
+            with st.chat_message("assistant"):
+                tool_status = st.empty()
+                with requests.post(f"{FLASK_API_URL}/api/chat/stream", json=api_payload, headers=headers, stream=True) as response:
+                    response.raise_for_status()
+                    streamed = st.write_stream(stream_agent_reply(response, tool_status))
+            # Some providers do not stream tool-enabled calls token by token;
+            # fall back to the final answer from the 'done' event.
+            assistant_message = st.session_state.pop("last_response", None) or streamed
+            st.session_state.messages.append({"role": "assistant", "content": assistant_message})
+            st.session_state.messages = st.session_state.messages[-MAX_DISPLAYED_MESSAGES:]
+            st.rerun()
         except Exception as e:
             st.error(f"Error communicating with the agent: {e}")
\ No newline at end of file
@@ -0,0 +1,388 @@
+# import_data.py
+# Bulk import of users (with their supervisor hierarchy) and historical leave
+# requests from CSV or JSON-lines files, for onboarding a whole organization.
+#
+#   python import_data.py users staff.csv
+#   python import_data.py leave leave_history.jsonl --batch-size 2000
+#
+# users columns:  username, password (or password_hash), role (employee |
+#                 supervisor | hr), employee_id, supervisor_id (employees),
+#                 department (optional)
+# leave columns:  employee_id, leave_type, start_date, end_date (at most
+#                 MAX_LEAVE_DAYS apart), and optionally
+#                 id, supervisor_id (looked up from users when missing),
+#                 status (default approved_by_hr), reason, rejection_reason,
+#                 requested_at (default start_date)
+#
+# Rows are streamed, validated and upserted in unordered bulk_writes: users by
+# username, leave requests by an import key (the id column, or the employee,
+# type and dates). Nothing is deleted, so re-running an import is safe. Progress
+# is saved after each batch to <file>.import-state.json and an interrupted run
+# resumes from there (--restart to start over). Invalid rows are written to
+# <file>.rejects.jsonl. Passwords are hashed in a process pool, only for users
+# that do not exist yet (unless --update-passwords), while the previous batch
+# is being written.
+import os
+import csv
+import sys
+import json
+import time
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from dateutil.parser import parse
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+ROLES = {"employee", "supervisor", "hr"}
+STATUSES = {"pending_supervisor_approval", "approved_by_supervisor", "approved_by_hr", "rejected"}
+USER_FIELDS = ("role", "employee_id", "supervisor_id", "department")
+
+
+def _hash_password(password):
+    # Runs in the pool processes; same method as setup_initial_data.py.
+    from werkzeug.security import generate_password_hash
+    return generate_password_hash(password, method='pbkdf2:sha256')
+
+
+def read_rows(path, file_format=None):
+    """Yields (raw row, row dict) from a CSV or JSON-lines file, one at a time.
+    The row dict is None for a line that is not a JSON object."""
+    file_format = file_format or ("csv" if path.lower().endswith(".csv") else "jsonl")
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        if file_format == "csv":
+            for row in csv.DictReader(f):
+                # Empty CSV cells mean "not given".
+                yield row, {key: (value.strip() or None) if isinstance(value, str) else value
+                            for key, value in row.items() if key}
+        else:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        row = json.loads(line)
+                    except ValueError:
+                        row = None
+                    yield line, row if isinstance(row, dict) else None
+
+
+def _required(row, *fields):
+    missing = [field for field in fields if not row.get(field)]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+
+
+def user_update(row):
+    """Validates a users row. Returns (username, $set fields, password, password_hash)."""
+    _required(row, "username", "role", "employee_id")
+    role = str(row["role"]).lower()
+    if role not in ROLES:
+        raise ValueError(f"role must be one of {', '.join(sorted(ROLES))}")
+    if role == "employee" and not row.get("supervisor_id"):
+        raise ValueError("employees need a supervisor_id")
+    if not row.get("password") and not row.get("password_hash"):
+        raise ValueError("missing password (or password_hash)")
+    password, password_hash = row.get("password"), row.get("password_hash")
+    # JSONL may give a numeric password (1234); it is hashed as its digits.
+    if isinstance(password, int) and not isinstance(password, bool):
+        password = str(password)
+    if (password and not isinstance(password, str)) or (password_hash and not isinstance(password_hash, str)):
+        raise ValueError("password and password_hash must be strings")
+    fields = {field: str(row[field]) for field in USER_FIELDS if row.get(field)}
+    fields["role"] = role
+    return str(row["username"]), fields, password, password_hash
+
+
+def leave_update(row, source):
+    """Validates a leave row. Returns (import key, $set fields)."""
+    _required(row, "employee_id", "leave_type", "start_date", "end_date")
+    try:
+        start, end = parse(str(row["start_date"])), parse(str(row["end_date"]))
+        requested_at = parse(str(row["requested_at"])) if row.get("requested_at") else start
+    except (ValueError, OverflowError) as e:
+        raise ValueError(f"bad date: {e}")
+    if end < start:
+        raise ValueError("end_date is before start_date")
+    # The overlap queries (app/tools/leave_tools.py) only look MAX_LEAVE_DAYS
+    # back for a leave's start, so a longer one would never show up there.
+    max_days = int(os.getenv("MAX_LEAVE_DAYS", "90"))
+    if (end - start).days + 1 > max_days:
+        raise ValueError(f"longer than MAX_LEAVE_DAYS ({max_days} days); split it into several rows")
+    status = row.get("status") or "approved_by_hr"
+    if status not in STATUSES:
+        raise ValueError(f"status must be one of {', '.join(sorted(STATUSES))}")
+    fields = {
+        "employee_id": str(row["employee_id"]),
+        "leave_type": str(row["leave_type"]),
+        "start_date": start,
+        "end_date": end,
+        "status": status,
+        "reason": row.get("reason"),
+        "requested_at": requested_at,
+    }
+    if row.get("supervisor_id"):
+        fields["supervisor_id"] = str(row["supervisor_id"])
+    if row.get("rejection_reason"):
+        fields["rejection_reason"] = row["rejection_reason"]
+    if row.get("id"):
+        key = f"{source}:{row['id']}"
+    else:
+        natural = f"{fields['employee_id']}|{fields['leave_type']}|{start.isoformat()}|{end.isoformat()}"
+        key = f"{source}:{hashlib.sha1(natural.encode()).hexdigest()}"
+    return key, fields
+
+
+class Importer:
+    def __init__(self, db, kind, path, file_format=None, batch_size=1000, workers=None,
+                 update_passwords=False, source="import", restart=False):
+        self.db = db
+        self.kind = kind
+        self.path = path
+        self.file_format = file_format
+        self.batch_size = batch_size
+        self.workers = workers or os.cpu_count() or 1
+        self.update_passwords = update_passwords
+        self.source = source
+        self.state_path = path + ".import-state.json"
+        self.rejects_path = path + ".rejects.jsonl"
+        self.counts = {"rows": 0, "skipped": 0, "upserted": 0, "modified": 0, "unchanged": 0,
+                       "rejected": 0, "hashed": 0}
+        self.start_row = 0 if restart else self._saved_rows()
+        self._pool = None
+        self._rejects = None
+
+    # --- resume state ---
+
+    def _file_id(self):
+        stat = os.stat(self.path)
+        return {"kind": self.kind, "size": stat.st_size, "mtime": stat.st_mtime}
+
+    def _saved_rows(self) -> int:
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        if {key: state.get(key) for key in ("kind", "size", "mtime")} != self._file_id():
+            print("⚠️ The input file changed since the last run; starting from the first row.")
+            return 0
+        return state.get("rows_done", 0)
+
+    def _save_rows(self, rows_done):
+        temp_path = self.state_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({**self._file_id(), "rows_done": rows_done}, f)
+        os.replace(temp_path, self.state_path)
+
+    # --- batches ---
+
+    def _reject(self, row_no, error, raw):
+        self.counts["rejected"] += 1
+        if self._rejects is None:
+            # A resumed run adds to the rejects of the run it continues.
+            self._rejects = open(self.rejects_path, "a" if self.start_row else "w", encoding="utf-8")
+        self._rejects.write(json.dumps({"row": row_no, "error": error, "input": raw}, default=str) + "\n")
+
+    def _prepare(self, batch):
+        """Validates a batch and starts hashing its new passwords. Returns the
+        pending operations; _write finishes them."""
+        prepared = []
+        for row_no, raw, row in batch:
+            try:
+                if row is None:
+                    raise ValueError("not a JSON object")
+                if self.kind == "users":
+                    prepared.append((row_no, raw, user_update(row)))
+                else:
+                    prepared.append((row_no, raw, leave_update(row, self.source)))
+            except ValueError as e:
+                self._reject(row_no, str(e), raw)
+        if self.kind == "users":
+            return self._start_hashing(prepared)
+        return self._fill_supervisors(prepared)
+
+    def _start_hashing(self, prepared):
+        if self.update_passwords:
+            existing = set()
+        else:
+            usernames = [update[0] for _, _, update in prepared]
+            existing = {user["username"] for user in self.db["users"].find(
+                {"username": {"$in": usernames}}, {"username": 1})}
+        to_hash = [(i, update[2]) for i, (_, _, update) in enumerate(prepared)
+                   if update[0] not in existing and not update[3]]
+        if to_hash:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            chunksize = max(1, len(to_hash) // (self.workers * 4))
+            hashes = self._pool.map(_hash_password, [password for _, password in to_hash], chunksize=chunksize)
+        else:
+            hashes = iter(())
+        return prepared, existing, [i for i, _ in to_hash], hashes
+
+    def _fill_supervisors(self, prepared):
+        # One lookup per batch for the rows that do not name a supervisor.
+        missing = {fields["employee_id"] for _, _, (_, fields) in prepared if "supervisor_id" not in fields}
+        if missing:
+            supervisors = {user["employee_id"]: user.get("supervisor_id") for user in self.db["users"].find(
+                {"employee_id": {"$in": list(missing)}}, {"employee_id": 1, "supervisor_id": 1})}
+            for _, _, (_, fields) in prepared:
+                if "supervisor_id" not in fields and supervisors.get(fields["employee_id"]):
+                    fields["supervisor_id"] = supervisors[fields["employee_id"]]
+        return prepared
+
+    def _user_operations(self, pending):
+        prepared, existing, hashed_rows, hashes = pending
+        new_hashes = dict(zip(hashed_rows, hashes))
+        self.counts["hashed"] += len(new_hashes)
+        operations = []
+        for i, (_, _, (username, fields, _, password_hash)) in enumerate(prepared):
+            password_hash = password_hash or new_hashes.get(i)
+            update = {"$set": {"username": username, **fields}}
+            if password_hash and self.update_passwords:
+                update["$set"]["password"] = password_hash
+            elif password_hash:
+                # Re-imports keep the passwords users have since changed.
+                update["$setOnInsert"] = {"password": password_hash}
+            operations.append(UpdateOne({"username": username}, update, upsert=True))
+        return prepared, operations
+
+    def _leave_operations(self, prepared):
+        operations = [UpdateOne({"import_key": key}, {"$set": {"import_key": key, **fields}}, upsert=True)
+                      for _, _, (key, fields) in prepared]
+        return prepared, operations
+
+    def _write(self, pending):
+        if self.kind == "users":
+            prepared, operations = self._user_operations(pending)
+        else:
+            prepared, operations = self._leave_operations(pending)
+        if not operations:
+            return
+        collection = self.db["users" if self.kind == "users" else "leave_requests"]
+        try:
+            result = collection.bulk_write(operations, ordered=False).bulk_api_result
+        except BulkWriteError as e:
+            # Unordered: everything else in the batch was still written.
+            result = e.details
+            for error in result.get("writeErrors", []):
+                row_no, raw, _ = prepared[error["index"]]
+                self._reject(row_no, error.get("errmsg", "write error"), raw)
+        self.counts["upserted"] += result.get("nUpserted", 0)
+        self.counts["modified"] += result.get("nModified", 0)
+        self.counts["unchanged"] += result.get("nMatched", 0) - result.get("nModified", 0)
+        if self.kind == "users":
+            from app.models.user import User
+            # Another process (the web app) picks the change up after USER_CACHE_TTL.
+            for _, _, (_, fields, _, _) in prepared:
+                User.invalidate(fields["employee_id"])
+        if self.kind == "leave":
+            from app.models.data_version import DataVersion
+            # Cached chat answers about these employees and teams are stale now.
+            DataVersion.bump([fields for _, _, (_, fields) in prepared])
+
+    def _batches(self):
+        batch = []
+        for row_no, (raw, row) in enumerate(read_rows(self.path, self.file_format), start=1):
+            if row_no <= self.start_row:
+                self.counts["skipped"] += 1
+                continue
+            batch.append((row_no, raw, row))
+            if len(batch) == self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def run(self) -> dict:
+        from app.utils.indexes import ensure_indexes
+
+        ensure_indexes(self.db)
+        if self.start_row:
+            print(f"⏩ Resuming after row {self.start_row} (--restart to start over).")
+        started = time.perf_counter()
+        rows_done = self.start_row
+        pending = None
+        try:
+            for batch in self._batches():
+                # Hash (in the pool) this batch while the previous one is written.
+                prepared = self._prepare(batch)
+                if pending is not None:
+                    self._write(pending[0])
+                    self._save_rows(pending[1])
+                    self._progress(pending[1], started)
+                rows_done = batch[-1][0]
+                self.counts["rows"] += len(batch)
+                pending = (prepared, rows_done)
+            if pending is not None:
+                self._write(pending[0])
+                self._save_rows(pending[1])
+                self._progress(pending[1], started)
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown()
+            if self._rejects is not None:
+                self._rejects.close()
+        self.counts["seconds"] = round(time.perf_counter() - started, 2)
+        if os.path.exists(self.state_path):
+            os.remove(self.state_path)
+        return self.counts
+
+    def _progress(self, rows_done, started):
+        elapsed = time.perf_counter() - started
+        rows = rows_done - self.start_row
+        print(f"⏳ {rows_done} rows ({rows / elapsed:.0f} rows/s), "
+              f"{self.counts['upserted']} new, {self.counts['modified']} updated, {self.counts['rejected']} rejected")
+
+
+def check_hierarchy(db) -> list:
+    """Supervisor IDs that employees report to but that no supervisor user has."""
+    known = set(db["users"].distinct("employee_id", {"role": "supervisor"}))
+    return sorted(set(db["users"].distinct("supervisor_id", {"role": "employee"})) - known)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import users or historical leave requests.")
+    parser.add_argument("kind", choices=["users", "leave"])
+    parser.add_argument("path", help="CSV (.csv) or JSON-lines file.")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="Input format (default: from the file name).")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Rows per bulk_write.")
+    parser.add_argument("--workers", type=int, default=None, help="Password hashing processes (default: CPU count).")
+    parser.add_argument("--update-passwords", action="store_true",
+                        help="Also reset the password of users that already exist.")
+    parser.add_argument("--source", default="import",
+                        help="Prefix of leave import keys; use one per source system so their ids cannot clash.")
+    parser.add_argument("--restart", action="store_true", help="Ignore saved progress and start from the first row.")
+    parser.add_argument("--no-reconcile", action="store_true", help="Do not rebuild leave balances after a leave import.")
+    args = parser.parse_args()
+
+    from app.utils.db import get_db
+    db = get_db()
+    importer = Importer(db, args.kind, args.path, args.format, args.batch_size, args.workers,
+                        args.update_passwords, args.source, args.restart)
+    counts = importer.run()
+
+    print(f"\n✅ Imported {args.kind} from {args.path} in {counts['seconds']}s "
+          f"({counts['rows'] / counts['seconds'] if counts['seconds'] else 0:.0f} rows/s)")
+    print(f"   rows read:   {counts['rows']}" + (f" (+{counts['skipped']} done in an earlier run)" if counts["skipped"] else ""))
+    print(f"   new:         {counts['upserted']}")
+    print(f"   updated:     {counts['modified']}")
+    print(f"   unchanged:   {counts['unchanged']}")
+    if args.kind == "users":
+        print(f"   passwords hashed: {counts['hashed']} ({importer.workers} processes)")
+    print(f"   rejected:    {counts['rejected']}" + (f" (see {importer.rejects_path})" if counts["rejected"] else ""))
+
+    if args.kind == "users":
+        unknown = check_hierarchy(db)
+        if unknown:
+            print(f"⚠️ {len(unknown)} supervisor IDs have no supervisor user yet: {', '.join(unknown[:10])}"
+                  + (" ..." if len(unknown) > 10 else ""))
+    elif not args.no_reconcile:
+        from app.models.leave_balance import LeaveBalance
+        summary = LeaveBalance.reconcile(fix=True)
+        print(f"✅ Leave balances rebuilt ({len(summary['drift'])} of {summary['checked']} changed).")
+    return 1 if counts["rejected"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
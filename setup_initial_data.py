@@ -1,8 +1,10 @@
 # setup_initial_data.py
-from app.utils.db import db
+from app.utils.db import get_db
+from app.utils.indexes import ensure_indexes
 from werkzeug.security import generate_password_hash
 
 def setup_data():
+    db = get_db()
     users_collection = db["users"]
     
     # Clear existing users to avoid duplicates on re-run
@@ -35,6 +37,9 @@ def setup_data():
 
     users_collection.insert_many([hr_user, supervisor_user, employee_user])
     print("✅ Initial users created successfully!")
+
+    ensure_indexes(db)
+    print("✅ Database indexes are in place.")
     print("\n--- Test Users ---")
     print("HR:       username='hr_manager', password='hr_password'")
     print("Supervisor: username='supervisor_john', password='sup_password'")
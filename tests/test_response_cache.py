@@ -0,0 +1,77 @@
+# tests/test_response_cache.py
+# Run with: python -m pytest -q tests
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from app.agents import response_cache
+from app.models.data_version import DataVersion
+
+
+class FakeGraph:
+    """Threads kept in a dict. The answer to a follow-up depends on what the
+    thread was about, like the real agent answering from its history."""
+
+    def __init__(self):
+        self.threads = {}
+        self.runs = 0
+
+    def get_state(self, config):
+        return SimpleNamespace(values={"messages": list(self.threads.get(config["configurable"]["thread_id"], []))})
+
+    def update_state(self, config, values, as_node=None):
+        self.threads[config["configurable"]["thread_id"]] = list(values["messages"])
+
+    def invoke(self, agent_input, config):
+        self.runs += 1
+        history = self.threads.setdefault(config["configurable"]["thread_id"], [])
+        topic = history[0].content if history else agent_input["messages"][-1].content
+        tool = "get_team_leave_calendar" if "calendar" in topic else "get_my_leave_balance"
+        call_id = uuid.uuid4().hex
+        history += agent_input["messages"] + [
+            AIMessage(content="", tool_calls=[{"name": tool, "args": {}, "id": call_id}]),
+            ToolMessage(content=f"{tool} rows", tool_call_id=call_id),
+            AIMessage(content=f"answer from {tool}"),
+        ]
+        return {"messages": list(history)}
+
+
+@pytest.fixture
+def graph(monkeypatch):
+    monkeypatch.setenv("RESPONSE_CACHE_BACKEND", "memory")
+    monkeypatch.setattr(response_cache, "_response_cache", None)
+    monkeypatch.setattr(response_cache, "register_cache", lambda name, cache: None)
+    monkeypatch.setattr(DataVersion, "get", staticmethod(lambda scopes: [1] * len(scopes)))
+    return FakeGraph()
+
+
+def chat(graph, thread_id, message, new_thread=False):
+    """What the chat route does for one turn."""
+    agent_input = {"messages": [HumanMessage(content=message)],
+                   "user_info": {"role": "employee", "user_id": "E1"}}
+    config = {"configurable": {"thread_id": thread_id}}
+    key, cached = response_cache.lookup(agent_input, graph, config, new_thread)
+    if cached:
+        response_cache.replay(graph, config, agent_input, cached)
+        return cached[-1].content
+    response = graph.invoke(agent_input, config)
+    response_cache.store(key, response["messages"])
+    return response["messages"][-1].content
+
+
+def test_follow_up_is_answered_from_its_own_thread(graph):
+    assert chat(graph, "a", "show the team calendar", new_thread=True) == "answer from get_team_leave_calendar"
+    assert chat(graph, "b", "show my balance", new_thread=True) == "answer from get_my_leave_balance"
+
+    assert chat(graph, "a", "what about next month?") == "answer from get_team_leave_calendar"
+    assert chat(graph, "b", "what about next month?") == "answer from get_my_leave_balance"
+    assert graph.runs == 4
+
+
+def test_first_turn_is_shared_across_threads(graph):
+    first = chat(graph, "a", "show my balance", new_thread=True)
+    assert chat(graph, "b", "Show my balance?", new_thread=True) == first
+    assert graph.runs == 1
+    assert [type(m) for m in graph.threads["b"]] == [HumanMessage, AIMessage, ToolMessage, AIMessage]
@@ -0,0 +1,77 @@
+# tests/test_streaming.py
+# Run with: python -m pytest -q tests
+import asyncio
+import datetime
+
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.tools import tool
+
+import app.agents.leave_agent_graph as agent_graph
+from app.agents import history
+from app.agents.profiles import build_profiles
+from app.agents.streaming import astream_chat_events
+
+
+class FakeLLM(GenericFakeChatModel):
+    """Streams its scripted answers word by word."""
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+@tool
+def get_my_leave_requests(employee_id: str) -> dict:
+    """The employee's leave requests."""
+    return {"requests": [{"_id": "r1", "employee_id": employee_id, "leave_type": "annual",
+                          "start_date": datetime.date(2026, 1, 5), "end_date": datetime.date(2026, 1, 6),
+                          "status": "approved"}]}
+
+
+@pytest.fixture
+def graph(monkeypatch):
+    monkeypatch.setenv("CHECKPOINTER", "memory")
+    answers = iter([AIMessage(content="You have 14 days of annual leave left."),
+                    AIMessage(content="The user asked about their leave balance."),
+                    AIMessage(content="Your request for tomorrow has been submitted.")])
+    llm = FakeLLM(messages=answers)
+    profiles = build_profiles(llm)
+    profiles["employee"].tool_map = {**profiles["employee"].tool_map, "get_my_leave_requests": get_my_leave_requests}
+    monkeypatch.setattr(agent_graph, "_llm", llm)
+    monkeypatch.setattr(agent_graph, "_profiles", profiles)
+    return agent_graph._build_graph()
+
+
+def stream(graph, message):
+    graph_input = {"messages": [HumanMessage(content=message)],
+                   "user_info": {"role": "employee", "user_id": "E1"}}
+
+    async def collect():
+        return [item async for item in astream_chat_events(graph, graph_input, agent_graph.thread_config("E1", "t1"))]
+
+    events = asyncio.run(collect())
+    tokens = "".join(data["content"] for event, data in events if event == "token")
+    return tokens, events[-1]
+
+
+def test_router_answer_is_streamed_once(graph):
+    tokens, (event, data) = stream(graph, "show my leave requests")
+    assert event == "done"
+    assert "ID: `r1`" in data["response"]
+    assert tokens == data["response"]
+
+
+def test_llm_answer_is_streamed_once(graph):
+    tokens, (event, data) = stream(graph, "what is my leave balance?")
+    assert event == "done"
+    assert data["response"] == "You have 14 days of annual leave left."
+    assert tokens == data["response"]
+
+
+def test_history_summary_is_not_streamed(graph, monkeypatch):
+    monkeypatch.setattr(history, "WINDOW_TURNS", 1)
+    stream(graph, "what is my leave balance?")
+    tokens, (event, data) = stream(graph, "I want leave tomorrow")
+    assert data["response"] == "Your request for tomorrow has been submitted."
+    assert tokens == data["response"]
@@ -0,0 +1,38 @@
+# tests/test_tool_executor.py
+# Run with: python -m pytest -q tests
+import asyncio
+import logging
+
+import pytest
+from langchain_core.tools import tool
+
+from app.agents import tool_executor
+
+
+@tool
+def get_my_leave_balance(employee_id: str) -> str:
+    """Leave balance of an employee."""
+    return f"balance of {employee_id}"
+
+
+TOOL_MAP = {"get_my_leave_balance": get_my_leave_balance}
+TOOL_CALLS = [{"name": "get_my_leave_balance", "args": {"employee_id": "E1"}, "id": "call-1"}]
+
+
+@pytest.fixture
+def debug_log(caplog):
+    caplog.set_level(logging.DEBUG, logger=tool_executor.log.name)
+    return caplog
+
+
+def test_tool_call_with_debug_logging(debug_log):
+    messages = tool_executor.run_tool_calls(TOOL_MAP, TOOL_CALLS)
+    assert [m.content for m in messages] == ["balance of E1"]
+    record = next(r for r in debug_log.records if r.getMessage() == "Calling tool")
+    assert record.tool_args == {"employee_id": "E1"}
+
+
+def test_async_tool_call_with_debug_logging(debug_log):
+    messages = asyncio.run(tool_executor.arun_tool_calls(TOOL_MAP, TOOL_CALLS))
+    assert [m.content for m in messages] == ["balance of E1"]
+    assert any(r.getMessage() == "Calling tool" for r in debug_log.records)